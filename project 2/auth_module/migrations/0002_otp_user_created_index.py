@@ -0,0 +1,17 @@
+# Generated by Django 5.2.7 on 2026-10-17 04:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth_module', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='otpverification',
+            index=models.Index(fields=['user', '-created_at'], name='otp_user_created_idx'),
+        ),
+    ]
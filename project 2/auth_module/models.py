@@ -33,6 +33,12 @@ class OTPVerification(models.Model):
     def __str__(self):
         return f'{self.user.email} - {self.otp_code}'
     
+    class Meta:
+        indexes = [
+            # The latest code for a user is read on every verification attempt
+            models.Index(fields=['user', '-created_at'], name='otp_user_created_idx'),
+        ]
+    
     def is_expired(self):
         """Check if OTP has expired (after 10 minutes)"""
         return timezone.now() > self.created_at + timedelta(minutes=10)
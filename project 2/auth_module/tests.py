@@ -1,3 +1,42 @@
+import unittest
+
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .models import CustomUser, OTPVerification
+
+
+@unittest.skipUnless(connection.vendor == 'sqlite', 'Query plans are checked with SQLite EXPLAIN QUERY PLAN')
+class OTPQueryPlanTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        users = [
+            CustomUser.objects.create_user(email=f'user{i}@example.com', username=f'user{i}', password='password')
+            for i in range(20)
+        ]
+        cls.user = users[0]
+        OTPVerification.objects.bulk_create(
+            OTPVerification(user=user, otp_code=f'{100000 + i * 5 + n}')
+            for i, user in enumerate(users)
+            for n in range(5)
+        )
+
+    def test_latest_otp_uses_user_created_index(self):
+        plan = OTPVerification.objects.filter(user=self.user).order_by('-created_at')[:1].explain()
+        self.assertIn('USING INDEX otp_user_created_idx', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_verify_otp_does_not_scan_codes(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.post(reverse('auth_module:verify_otp', args=[self.user.id]), {'otp': '000000'})
 
-# Create your tests here.
+        otp_queries = [query['sql'] for query in queries.captured_queries if 'auth_module_otpverification' in query['sql']]
+        self.assertTrue(otp_queries)
+        with connection.cursor() as cursor:
+            for sql in otp_queries:
+                cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+                plan = ' | '.join(row[-1] for row in cursor.fetchall())
+                self.assertNotIn('SCAN auth_module_otpverification', plan)
+                self.assertNotIn('TEMP B-TREE', plan)
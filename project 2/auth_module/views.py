@@ -85,7 +85,7 @@ def verify_otp(request, user_id):
         user = User.objects.get(id=user_id)
         if user.is_verified:
             messages.info(request, 'Your account is already verified.')
-            return redirect('dashboard')
+            return redirect('dashboard:dashboard')
     except User.DoesNotExist:
         messages.error(request, 'Invalid user.')
         return redirect('auth_module:signup')
@@ -110,7 +110,7 @@ def verify_otp(request, user_id):
                 # Log the user in
                 login(request, user)
                 messages.success(request, 'Your account has been verified successfully!')
-                return redirect('dashboard')
+                return redirect('dashboard:dashboard')
             else:
                 messages.error(request, 'Invalid OTP. Please try again.')
         except OTPVerification.DoesNotExist:
@@ -1,3 +1,32 @@
 from django.contrib import admin
 
-# Register your models here.
+from .grading import regrade
+from .models import GradeThreshold, GradingScheme
+
+
+class GradeThresholdInline(admin.TabularInline):
+    model = GradeThreshold
+    extra = 1
+
+
+@admin.register(GradingScheme)
+class GradingSchemeAdmin(admin.ModelAdmin):
+    """
+    Progress sheet grades are rewritten once a scheme and all its thresholds are
+    saved, and when schemes are deleted.
+    """
+    list_display = ('name', 'class_batch', 'subject', 'failing_grade')
+    list_filter = ('class_batch', 'subject')
+    inlines = [GradeThresholdInline]
+
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        regrade()
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        regrade()
+
+    def delete_queryset(self, request, queryset):
+        super().delete_queryset(request, queryset)
+        regrade()
@@ -1,6 +1,12 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
 
 
 class DashboardConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'dashboard'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        from .database import apply_sqlite_profile
+        connection_created.connect(apply_sqlite_profile, dispatch_uid='dashboard.apply_sqlite_profile')
@@ -0,0 +1,170 @@
+import datetime
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.utils import timezone
+
+from .database import delete_rows
+from .models import ArchivedExamResult, ArchivedProgressSheet, ExamResult, ProgressSheet, RankHistory
+from .ranking import average_percentage_expression, rebuild_rankings
+
+
+# Students whose old marks are moved per transaction, so mark entry is only
+# held up for one short batch at a time
+ARCHIVE_BATCH_SIZE = 200
+
+
+def academic_year(date):
+    """
+    The academic year a date falls in, as the calendar year it starts in.
+    """
+    start_month = getattr(settings, 'ACADEMIC_YEAR_START_MONTH', 6)
+    return date.year if date.month >= start_month else date.year - 1
+
+
+def academic_year_start(year):
+    return datetime.date(year, getattr(settings, 'ACADEMIC_YEAR_START_MONTH', 6), 1)
+
+
+def academic_year_label(year):
+    return f'{year}-{(year + 1) % 100:02d}'
+
+
+def default_archive_before(today=None):
+    """
+    The oldest academic year archival keeps in the live tables: the current one
+    and the ARCHIVE_KEEP_ACADEMIC_YEARS - 1 before it stay.
+    """
+    keep = max(1, getattr(settings, 'ARCHIVE_KEEP_ACADEMIC_YEARS', 2))
+    return academic_year(today or timezone.localdate()) - keep + 1
+
+
+def archived_academic_years(student_id=None):
+    """
+    The academic years with archived results, newest first, optionally only
+    those of one student.
+    """
+    results = ArchivedExamResult.objects.all()
+    if student_id is not None:
+        results = results.filter(student_id=student_id)
+    return list(results.values_list('academic_year', flat=True).distinct().order_by('-academic_year'))
+
+
+def _archive_students(student_ids, cutoff):
+    """
+    Move the progress sheets, exam results and rank history of some students
+    dated before cutoff into the archive tables. Returns (sheets, results, exam types).
+    """
+    old = {'student_id__in': student_ids, 'exam_date__lt': cutoff}
+    sheets = list(ProgressSheet.objects.filter(**old).select_related('subject'))
+    if not sheets:
+        return 0, 0, set()
+    sittings = {(sheet.student_id, sheet.exam_type, sheet.exam_date) for sheet in sheets}
+
+    # Marks entered again for a sitting archived earlier replace the archived ones
+    ArchivedProgressSheet.objects.bulk_create(
+        [
+            ArchivedProgressSheet(
+                student_id=sheet.student_id,
+                subject_id=sheet.subject_id,
+                subject_name=sheet.subject.name,
+                subject_code=sheet.subject.code,
+                academic_year=academic_year(sheet.exam_date),
+                exam_type=sheet.exam_type,
+                exam_date=sheet.exam_date,
+                marks_obtained=sheet.marks_obtained,
+                max_marks=sheet.max_marks,
+                percentage=sheet.percentage,
+                grade=sheet.grade,
+            )
+            for sheet in sheets
+        ],
+        batch_size=500,
+        update_conflicts=True,
+        unique_fields=['student', 'subject', 'exam_type', 'exam_date'],
+        update_fields=[
+            'subject_name', 'subject_code', 'marks_obtained', 'max_marks', 'percentage', 'grade', 'archived_at'
+        ],
+    )
+
+    # Totals come from the archived sheets, so a sitting archived in two runs
+    # still adds up; the rank is the one the sitting last had in RankHistory
+    ranks = dict(
+        ((row.student_id, row.exam_type, row.exam_date), row.rank)
+        for row in ArchivedExamResult.objects.filter(**old).only('student_id', 'exam_type', 'exam_date', 'rank')
+    )
+    ranks.update(
+        ((student_id, exam_type, exam_date), rank)
+        for student_id, exam_type, exam_date, rank in RankHistory.objects.filter(**old).values_list(
+            'student_id', 'exam_type', 'exam_date', 'rank'
+        )
+    )
+    totals = (
+        ArchivedProgressSheet.objects.filter(**old)
+        .values('student_id', 'exam_type', 'exam_date')
+        .annotate(
+            total_marks=Sum('marks_obtained'),
+            max_possible_marks=Sum('max_marks'),
+            subject_count=Count('id'),
+            average_percentage=average_percentage_expression('marks_obtained', 'max_marks'),
+        )
+        .order_by()
+    )
+    results = [
+        ArchivedExamResult(
+            student_id=row['student_id'],
+            academic_year=academic_year(row['exam_date']),
+            exam_type=row['exam_type'],
+            exam_date=row['exam_date'],
+            total_marks=row['total_marks'],
+            max_possible_marks=row['max_possible_marks'],
+            subject_count=row['subject_count'],
+            average_percentage=row['average_percentage'],
+            rank=ranks.get((row['student_id'], row['exam_type'], row['exam_date'])),
+        )
+        for row in totals
+        if (row['student_id'], row['exam_type'], row['exam_date']) in sittings
+    ]
+    ArchivedExamResult.objects.bulk_create(
+        results,
+        batch_size=500,
+        update_conflicts=True,
+        unique_fields=['student', 'exam_type', 'exam_date'],
+        update_fields=[
+            'total_marks', 'max_possible_marks', 'subject_count', 'average_percentage', 'rank', 'archived_at'
+        ],
+    )
+
+    for model in (ProgressSheet, ExamResult, RankHistory):
+        delete_rows(model.objects.filter(**old))
+    return len(sheets), len(results), {exam_type for _, exam_type, _ in sittings}
+
+
+def archive_academic_years(before, batch_size=ARCHIVE_BATCH_SIZE, report_progress=None):
+    """
+    Move every progress sheet, exam result and rank history row from academic
+    years before `before` into the archive tables, batch_size students per
+    transaction, then rebuild the rankings of the exam types that lost rows.
+
+    report_progress(done, total), if given, is called after each batch of
+    students. Returns counts of what was archived.
+    """
+    cutoff = academic_year_start(before)
+    student_ids = sorted(
+        set(ProgressSheet.objects.filter(exam_date__lt=cutoff).values_list('student_id', flat=True).distinct())
+    )
+    archived = {'students': len(student_ids), 'progress_sheets': 0, 'exam_results': 0}
+    exam_types = set()
+    for start in range(0, len(student_ids), batch_size):
+        with transaction.atomic():
+            sheets, results, types = _archive_students(student_ids[start:start + batch_size], cutoff)
+        archived['progress_sheets'] += sheets
+        archived['exam_results'] += results
+        exam_types |= types
+        if report_progress:
+            report_progress(min(start + batch_size, len(student_ids)), len(student_ids))
+
+    if exam_types:
+        rebuild_rankings(sorted(exam_types))
+    return archived
@@ -0,0 +1,61 @@
+from django.db import transaction
+
+from .grading import assign_grades
+from .models import ProgressSheet
+from .ranking import refresh_cohort_rankings, refresh_rankings
+from .results import recompute_exam_result, refresh_exam_results
+
+
+# Above this many students, derived tables are refreshed set-based instead of
+# one student at a time
+INCREMENTAL_REFRESH_LIMIT = 20
+
+UPSERT_FIELDS = ['marks_obtained', 'max_marks', 'grade', 'updated_at']
+
+
+def refresh_derived_tables(keys):
+    """
+    Bring ExamResult, StudentRanking and RankHistory in line after progress
+    sheets for the given (student_id, exam_type, exam_date) sittings were
+    written without going through ProgressSheet.save().
+
+    Either way only the given sittings' students are re-summed, so the cost
+    follows the size of the write rather than of the tables.
+    """
+    keys = set(keys)
+    student_ids = {student_id for student_id, _, _ in keys}
+    if len(student_ids) <= INCREMENTAL_REFRESH_LIMIT:
+        for key in keys:
+            recompute_exam_result(*key)
+        refresh_rankings(keys)
+    else:
+        refresh_exam_results(keys)
+        refresh_cohort_rankings(keys)
+
+
+def upsert_progress_sheets(sheets, refresh=True):
+    """
+    Insert or update progress sheets on their (student, subject, exam_type,
+    exam_date) key as one atomic, batched INSERT ... ON CONFLICT DO UPDATE,
+    then refresh the derived tables once for the affected sittings.
+
+    Callers writing several batches can pass refresh=False and call
+    refresh_derived_tables() themselves once all batches are in.
+    Percentage is a generated column; grades are looked up from the grading schemes.
+    Returns the number of sheets written.
+    """
+    sheets = list(sheets)
+    if not sheets:
+        return 0
+    assign_grades(sheets)
+
+    with transaction.atomic():
+        ProgressSheet.objects.bulk_create(
+            sheets,
+            update_conflicts=True,
+            unique_fields=['student', 'subject', 'exam_type', 'exam_date'],
+            update_fields=UPSERT_FIELDS,
+        )
+        if refresh:
+            refresh_derived_tables((sheet.student_id, sheet.exam_type, sheet.exam_date) for sheet in sheets)
+    return len(sheets)
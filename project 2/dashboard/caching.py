@@ -0,0 +1,120 @@
+import hashlib
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+
+RANKING_CACHE_TIMEOUT = 60 * 15
+# How long a recompute may hold the lock before another worker is allowed to try
+RANKING_LOCK_TIMEOUT = 30
+# How long a worker waits for another worker's recompute before doing it itself
+RANKING_LOCK_WAIT = 5
+RANKING_LOCK_POLL_INTERVAL = 0.05
+
+GRADING_VERSION_KEY = 'grading:version'
+
+_MISSING = object()
+
+
+def _version_key(exam_type):
+    return f'ranking:version:{exam_type}'
+
+
+def _current_version(key):
+    """
+    A missing version (first use, eviction, cache flush) is started from the
+    current time rather than 1, so entries cached under an earlier version can
+    never be mistaken for current ones.
+    """
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def _bump_version(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        _current_version(key)
+
+
+def ranking_version(exam_type):
+    """
+    Current data version of the rankings for an exam type.
+    """
+    return _current_version(_version_key(exam_type))
+
+
+def bump_ranking_version(exam_type):
+    """
+    Invalidate every cached ranking for an exam type by moving it to a new version.
+    """
+    _bump_version(_version_key(exam_type))
+
+
+def bump_ranking_version_on_commit(*exam_types):
+    """
+    Bump the versions once the current transaction commits, so no request can
+    cache pre-commit data under the new version.
+    """
+    def bump():
+        for exam_type in set(exam_types):
+            bump_ranking_version(exam_type)
+    transaction.on_commit(bump)
+
+
+def grading_version():
+    """
+    Current data version of the grading schemes, for in-process grade tables.
+    """
+    return _current_version(GRADING_VERSION_KEY)
+
+
+def bump_grading_version_on_commit():
+    transaction.on_commit(lambda: _bump_version(GRADING_VERSION_KEY))
+
+
+def ranking_cache_key(exam_type, variant):
+    """
+    Cache key for a variant of an exam type's ranking. Variants can carry request
+    input such as a page cursor, so they are hashed: keys stay short and free of
+    characters that memcached-style backends reject.
+    """
+    digest = hashlib.sha256(variant.encode()).hexdigest()[:32]
+    return f'ranking:{exam_type}:{ranking_version(exam_type)}:{digest}'
+
+
+def cached_ranking(exam_type, variant, compute, timeout=RANKING_CACHE_TIMEOUT):
+    """
+    Return compute() for (exam_type, variant), cached under the exam type's
+    current data version.
+
+    On a miss only the worker that wins the lock recomputes; the others poll for
+    its result for up to RANKING_LOCK_WAIT seconds before falling back to
+    computing it themselves. Stampede protection spans processes only when the
+    default cache is shared between them.
+    """
+    key = ranking_cache_key(exam_type, variant)
+    value = cache.get(key, _MISSING)
+    if value is not _MISSING:
+        return value
+
+    lock_key = f'{key}:lock'
+    if cache.add(lock_key, True, RANKING_LOCK_TIMEOUT):
+        try:
+            value = compute()
+            cache.set(key, value, timeout)
+        finally:
+            cache.delete(lock_key)
+        return value
+
+    deadline = time.monotonic() + RANKING_LOCK_WAIT
+    while time.monotonic() < deadline:
+        time.sleep(RANKING_LOCK_POLL_INTERVAL)
+        value = cache.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+    return compute()
@@ -0,0 +1,104 @@
+from django.db import transaction
+from django.db.models import Q
+
+from .bulk import INCREMENTAL_REFRESH_LIMIT
+from .caching import bump_grading_version_on_commit, bump_ranking_version_on_commit
+from .database import delete_rows
+from .models import (
+    ArchivedExamResult, ArchivedProgressSheet, ExamResult, GradeThreshold, GradingScheme, ProgressSheet, RankHistory,
+    Student, StudentRanking, Subject,
+)
+from .ranking import rebuild_rankings, remove_ranked_row
+from .results import remove_from_exam_results
+
+
+# Ids per DELETE statement, well under SQLite's limit on query parameters
+DELETE_BATCH_SIZE = 500
+
+EXAM_TYPES = [choice[0] for choice in ProgressSheet.EXAM_TYPE_CHOICES]
+
+
+def _batches(ids):
+    ids = list(ids)
+    for start in range(0, len(ids), DELETE_BATCH_SIZE):
+        yield ids[start:start + DELETE_BATCH_SIZE]
+
+
+def delete_students(students):
+    """
+    Delete the students in a queryset together with their progress sheets, exam
+    results, rankings, rank history and archived marks, one set-based DELETE per
+    table, instead of Student.delete(), whose collector loads and signals every
+    dependent row.
+
+    The remaining students' ranks are closed up: row by row for a handful of
+    students, otherwise by rebuilding the affected exam types. Returns the number
+    of students deleted.
+    """
+    with transaction.atomic():
+        student_ids = list(students.values_list('pk', flat=True))
+        if not student_ids:
+            return 0
+
+        exam_types = set()
+        incremental = len(student_ids) <= INCREMENTAL_REFRESH_LIMIT
+        for batch in _batches(student_ids):
+            if incremental:
+                rows = [
+                    *StudentRanking.objects.filter(student_id__in=batch),
+                    *RankHistory.objects.filter(student_id__in=batch),
+                ]
+                for row in rows:
+                    remove_ranked_row(row)
+                exam_types.update(row.exam_type for row in rows)
+            else:
+                for model in (StudentRanking, RankHistory):
+                    exam_types.update(
+                        model.objects.filter(student_id__in=batch).values_list('exam_type', flat=True).distinct()
+                    )
+                    delete_rows(model.objects.filter(student_id__in=batch))
+            delete_rows(ProgressSheet.objects.filter(student_id__in=batch))
+            delete_rows(ExamResult.objects.filter(student_id__in=batch))
+            delete_rows(ArchivedProgressSheet.objects.filter(student_id__in=batch))
+            delete_rows(ArchivedExamResult.objects.filter(student_id__in=batch))
+
+        deleted = sum(delete_rows(Student.objects.filter(pk__in=batch)) for batch in _batches(student_ids))
+
+        if not incremental and exam_types:
+            rebuild_rankings(sorted(exam_types))
+        bump_ranking_version_on_commit(*EXAM_TYPES)
+    return deleted
+
+
+def delete_subjects(subjects):
+    """
+    Delete the subjects in a queryset together with their progress sheets and
+    grading schemes, one set-based DELETE per table. Exam results of the sittings
+    that lose marks are re-summed in one UPDATE and the rankings of the affected
+    exam types rebuilt. Returns the number of subjects deleted.
+    """
+    with transaction.atomic():
+        subject_ids = list(subjects.values_list('pk', flat=True))
+        if not subject_ids:
+            return 0
+
+        exam_types = set()
+        schemes_deleted = 0
+        for batch in _batches(subject_ids):
+            sheets = ProgressSheet.objects.filter(subject_id__in=batch)
+            exam_types.update(sheets.values_list('exam_type', flat=True).distinct().order_by())
+            remove_from_exam_results(Q(subject_id__in=batch))
+            delete_rows(sheets)
+            # Archived marks keep the subject's name and code
+            ArchivedProgressSheet.objects.filter(subject_id__in=batch).update(subject=None)
+            delete_rows(GradeThreshold.objects.filter(scheme__subject_id__in=batch))
+            schemes_deleted += delete_rows(GradingScheme.objects.filter(subject_id__in=batch))
+        deleted = sum(delete_rows(Subject.objects.filter(pk__in=batch)) for batch in _batches(subject_ids))
+
+        if exam_types:
+            rebuild_rankings(sorted(exam_types))
+        # Leaderboards are labelled by subject name
+        bump_ranking_version_on_commit(*EXAM_TYPES)
+        if schemes_deleted:
+            bump_grading_version_on_commit()
+    return deleted
@@ -0,0 +1,96 @@
+import csv
+import json
+
+from .models import ProgressSheet, Student, StudentRanking
+
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'jsonl': 'application/x-ndjson',
+}
+
+# Rows fetched from the database per round trip
+EXPORT_CHUNK_SIZE = 2000
+
+# Rows encoded into each piece of output, so the response is not written a line at a time
+EXPORT_ROWS_PER_WRITE = 500
+
+
+def _students():
+    return Student.objects.order_by('pk').values_list(
+        'id', 'roll_number', 'full_name', 'email', 'class_batch', 'date_of_birth'
+    )
+
+
+def _progress_sheets():
+    return ProgressSheet.objects.order_by('pk').values_list(
+        'id', 'student__roll_number', 'student__full_name', 'subject__code', 'subject__name',
+        'exam_type', 'exam_date', 'marks_obtained', 'max_marks', 'percentage', 'grade'
+    )
+
+
+def _rankings():
+    return StudentRanking.objects.order_by('exam_type', 'rank', 'student_id').values_list(
+        'exam_type', 'rank', 'student__roll_number', 'student__full_name',
+        'total_marks', 'max_marks', 'subject_count', 'average_percentage'
+    )
+
+
+# Dataset name -> (column names, queryset of matching value tuples)
+EXPORTS = {
+    'students': (
+        ['id', 'roll_number', 'full_name', 'email', 'class_batch', 'date_of_birth'],
+        _students,
+    ),
+    'progress_sheets': (
+        ['id', 'roll_number', 'student_name', 'subject_code', 'subject_name',
+         'exam_type', 'exam_date', 'marks_obtained', 'max_marks', 'percentage', 'grade'],
+        _progress_sheets,
+    ),
+    'rankings': (
+        ['exam_type', 'rank', 'roll_number', 'student_name',
+         'total_marks', 'max_marks', 'subject_count', 'average_percentage'],
+        _rankings,
+    ),
+}
+
+
+class _Buffer:
+    """
+    File-like object whose write() hands back what was written, so csv.writer
+    can format rows without accumulating them.
+    """
+
+    def write(self, value):
+        return value
+
+
+def _csv_lines(columns, rows):
+    writer = csv.writer(_Buffer())
+    yield writer.writerow(columns)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def _jsonl_lines(columns, rows):
+    for row in rows:
+        yield json.dumps(dict(zip(columns, row)), default=str) + '\n'
+
+
+def export_chunks(dataset, export_format):
+    """
+    Yield an export of a dataset as text chunks in the given format, reading the
+    rows with a chunked iterator so memory use does not depend on the table size.
+    """
+    columns, queryset = EXPORTS[dataset]
+    rows = queryset().iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    lines = _csv_lines(columns, rows) if export_format == 'csv' else _jsonl_lines(columns, rows)
+
+    pending = []
+    for line in lines:
+        pending.append(line)
+        if len(pending) >= EXPORT_ROWS_PER_WRITE:
+            yield ''.join(pending)
+            pending = []
+    if pending:
+        yield ''.join(pending)
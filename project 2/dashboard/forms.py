@@ -1,9 +1,66 @@
+from decimal import Decimal
+
 from django import forms
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.core.exceptions import ValidationError
+from django.urls import reverse_lazy
 from .models import Student, ProgressSheet, Subject
 
 
+def validate_marks_obtained(marks_obtained):
+    """
+    Validation shared by every way of entering marks obtained.
+    """
+    if marks_obtained is None:
+        raise ValidationError('Marks obtained is required.')
+    if marks_obtained < 0:
+        raise ValidationError('Marks obtained cannot be negative.')
+    if marks_obtained > 100:
+        raise ValidationError('Marks obtained cannot exceed 100.')
+    return marks_obtained
+
+
+def validate_max_marks(max_marks):
+    """
+    Validation shared by every way of entering max marks.
+    """
+    if max_marks is None:
+        raise ValidationError('Max marks is required.')
+    if max_marks <= 0:
+        raise ValidationError('Max marks must be greater than 0.')
+    if max_marks > 100:
+        raise ValidationError('Max marks cannot exceed 100.')
+    return max_marks
+
+
+def validate_marks_within_max(marks_obtained, max_marks):
+    if marks_obtained > max_marks:
+        raise ValidationError('Marks obtained cannot be greater than max marks.')
+
+
+class StudentAutocompleteWidget(forms.Widget):
+    """
+    Search-as-you-type student picker. Unlike a select it renders only the chosen
+    student, so the roster is never loaded into the page.
+    """
+    template_name = 'dashboard/widgets/student_autocomplete.html'
+    search_url = reverse_lazy('dashboard:student_autocomplete')
+
+    def get_context(self, name, value, attrs):
+        context = super().get_context(name, value, attrs)
+        label = ''
+        if value not in (None, ''):
+            try:
+                student = Student.objects.only('full_name', 'roll_number').filter(pk=value).first()
+            except (TypeError, ValueError):
+                student = None
+            if student is not None:
+                label = str(student)
+        context['widget']['label'] = label
+        context['widget']['search_url'] = self.search_url
+        return context
+
+
 class StudentForm(forms.ModelForm):
     """
     Form for creating and updating student records.
@@ -72,7 +129,7 @@ class ProgressSheetForm(forms.ModelForm):
         model = ProgressSheet
         fields = ['student', 'subject', 'exam_type', 'exam_date', 'marks_obtained', 'max_marks']
         widgets = {
-            'student': forms.Select(attrs={'class': 'form-control', 'required': True}),
+            'student': StudentAutocompleteWidget(),
             'subject': forms.Select(attrs={'class': 'form-control', 'required': True}),
             'exam_type': forms.Select(attrs={'class': 'form-control', 'required': True}),
             'exam_date': forms.DateInput(attrs={'class': 'form-control', 'type': 'date', 'required': True}),
@@ -81,24 +138,10 @@ class ProgressSheetForm(forms.ModelForm):
         }
     
     def clean_marks_obtained(self):
-        marks_obtained = self.cleaned_data.get('marks_obtained')
-        if marks_obtained is None:
-            raise ValidationError('Marks obtained is required.')
-        if marks_obtained < 0:
-            raise ValidationError('Marks obtained cannot be negative.')
-        if marks_obtained > 100:
-            raise ValidationError('Marks obtained cannot exceed 100.')
-        return marks_obtained
+        return validate_marks_obtained(self.cleaned_data.get('marks_obtained'))
     
     def clean_max_marks(self):
-        max_marks = self.cleaned_data.get('max_marks')
-        if max_marks is None:
-            raise ValidationError('Max marks is required.')
-        if max_marks <= 0:
-            raise ValidationError('Max marks must be greater than 0.')
-        if max_marks > 100:
-            raise ValidationError('Max marks cannot exceed 100.')
-        return max_marks
+        return validate_max_marks(self.cleaned_data.get('max_marks'))
     
     def clean(self):
         cleaned_data = super().clean()
@@ -106,8 +149,7 @@ class ProgressSheetForm(forms.ModelForm):
         max_marks = cleaned_data.get('max_marks')
         
         if marks_obtained is not None and max_marks is not None:
-            if marks_obtained > max_marks:
-                raise ValidationError('Marks obtained cannot be greater than max marks.')
+            validate_marks_within_max(marks_obtained, max_marks)
         
         return cleaned_data
 
@@ -118,7 +160,7 @@ class BulkProgressSheetForm(forms.Form):
     """
     student = forms.ModelChoiceField(
         queryset=Student.objects.all(), 
-        widget=forms.Select(attrs={'class': 'form-control', 'required': True})
+        widget=StudentAutocompleteWidget()
     )
     exam_type = forms.ChoiceField(
         choices=ProgressSheet.EXAM_TYPE_CHOICES, 
@@ -128,12 +170,19 @@ class BulkProgressSheetForm(forms.Form):
         widget=forms.DateInput(attrs={'class': 'form-control', 'type': 'date', 'required': True})
     )
     
-    def __init__(self, *args, **kwargs):
+    def __init__(self, *args, subjects=None, **kwargs):
         super().__init__(*args, **kwargs)
         
-        # Dynamically add fields for each subject
-        for subject in Subject.objects.all():
-            self.fields[f'marks_{subject.id}'] = forms.DecimalField(
+        if subjects is None:
+            subjects = Subject.objects.only('id', 'name')
+        
+        # Dynamically add a marks and a max marks field for each subject, keeping
+        # the pair together so validation and rendering never search for it
+        self.subject_fields = []
+        for subject in subjects:
+            marks_name = f'marks_{subject.id}'
+            max_marks_name = f'max_marks_{subject.id}'
+            self.fields[marks_name] = forms.DecimalField(
                 label=subject.name,
                 max_digits=5,
                 decimal_places=2,
@@ -141,7 +190,7 @@ class BulkProgressSheetForm(forms.Form):
                 required=False,
                 widget=forms.NumberInput(attrs={'class': 'form-control', 'step': '0.01', 'min': '0', 'max': '100'})
             )
-            self.fields[f'max_marks_{subject.id}'] = forms.DecimalField(
+            self.fields[max_marks_name] = forms.DecimalField(
                 label=f'Max Marks for {subject.name}',
                 max_digits=5,
                 decimal_places=2,
@@ -150,26 +199,156 @@ class BulkProgressSheetForm(forms.Form):
                 required=False,
                 widget=forms.NumberInput(attrs={'class': 'form-control', 'step': '0.01', 'min': '1', 'max': '100'})
             )
+            self.subject_fields.append((subject, marks_name, max_marks_name))
+        self.subject_marks = []
+    
+    def subject_groups(self):
+        """
+        (subject, marks field, max marks field) for each subject, for rendering.
+        """
+        return [(subject, self[marks_name], self[max_marks_name]) for subject, marks_name, max_marks_name in self.subject_fields]
     
     def clean(self):
         cleaned_data = super().clean()
         
-        # Validate marks and max marks for each subject
-        for field_name, value in cleaned_data.items():
-            if field_name.startswith('marks_'):
-                subject_id = field_name.split('_')[1]  # Extract subject ID from field name
-                marks_field = f'marks_{subject_id}'
-                max_marks_field = f'max_marks_{subject_id}'
-                
-                marks = cleaned_data.get(marks_field)
-                max_marks = cleaned_data.get(max_marks_field)
-                
-                if marks is not None and max_marks is not None:
-                    if marks > max_marks:
-                        raise ValidationError(f'Marks for subject cannot be greater than max marks for that subject.')
-                    if marks < 0:
-                        raise ValidationError(f'Marks for subject cannot be negative.')
-                    if marks > 100:
-                        raise ValidationError(f'Marks for subject cannot exceed 100.')
+        # Validate marks and max marks for each subject, collecting the pairs to save
+        self.subject_marks = []
+        for subject, marks_name, max_marks_name in self.subject_fields:
+            marks = cleaned_data.get(marks_name)
+            max_marks = cleaned_data.get(max_marks_name)
+            
+            if marks is not None and max_marks is not None:
+                if marks > max_marks:
+                    raise ValidationError(f'Marks for subject cannot be greater than max marks for that subject.')
+                if marks < 0:
+                    raise ValidationError(f'Marks for subject cannot be negative.')
+                if marks > 100:
+                    raise ValidationError(f'Marks for subject cannot exceed 100.')
+                self.subject_marks.append((subject, marks, max_marks))
         
-        return cleaned_data
\ No newline at end of file
+        return cleaned_data
+
+
+class MarkGridForm(forms.Form):
+    """
+    Form for entering one exam's marks for every student of a class/batch
+    against every subject at once.
+
+    The grid cells are not individual form fields: they are read straight from
+    the submitted data as marks_<student id>_<subject id> and, per subject,
+    max_marks_<subject id>, and validated in a single pass in clean().
+    """
+    class_batch = forms.ChoiceField(
+        choices=Student.CLASS_CHOICES,
+        widget=forms.Select(attrs={'class': 'form-control', 'required': True})
+    )
+    exam_type = forms.ChoiceField(
+        choices=ProgressSheet.EXAM_TYPE_CHOICES,
+        widget=forms.Select(attrs={'class': 'form-control', 'required': True})
+    )
+    exam_date = forms.DateField(
+        widget=forms.DateInput(attrs={'class': 'form-control', 'type': 'date', 'required': True})
+    )
+
+    def __init__(self, *args, students=(), subjects=(), initial_marks=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.students = list(students)
+        self.subjects = list(subjects)
+        # (student_id, subject_id) -> (marks, max_marks) already stored for this exam
+        self.initial_marks = initial_marks or {}
+        self.initial_max_marks = {
+            subject_id: max_marks for (_, subject_id), (_, max_marks) in self.initial_marks.items()
+        }
+        self.cell_errors = {}
+        self.cells = []
+
+    @staticmethod
+    def _parse_decimal(raw):
+        try:
+            value = Decimal(raw)
+        except ArithmeticError:
+            raise ValidationError('Enter a number.')
+        if not value.is_finite() or value.as_tuple().exponent < -2:
+            raise ValidationError('Enter a number with at most 2 decimal places.')
+        return value
+
+    def clean(self):
+        cleaned_data = super().clean()
+
+        max_marks_by_subject = {}
+        for subject in self.subjects:
+            raw = (self.data.get(f'max_marks_{subject.id}') or '100').strip()
+            try:
+                max_marks = validate_max_marks(self._parse_decimal(raw))
+            except ValidationError as e:
+                self.cell_errors[('max', subject.id)] = e.messages[0]
+                continue
+            max_marks_by_subject[subject.id] = max_marks
+
+        for student in self.students:
+            for subject in self.subjects:
+                raw = (self.data.get(f'marks_{student.id}_{subject.id}') or '').strip()
+                if not raw:
+                    continue
+                max_marks = max_marks_by_subject.get(subject.id)
+                try:
+                    marks = validate_marks_obtained(self._parse_decimal(raw))
+                    if max_marks is not None:
+                        validate_marks_within_max(marks, max_marks)
+                except ValidationError as e:
+                    self.cell_errors[(student.id, subject.id)] = e.messages[0]
+                    continue
+                if max_marks is not None:
+                    self.cells.append((student, subject, marks, max_marks))
+
+        if self.cell_errors:
+            raise ValidationError(f'{len(self.cell_errors)} cells have invalid marks. Fix the highlighted cells.')
+        return cleaned_data
+
+    def grid_rows(self):
+        """
+        (student, [(input name, value, error), ...]) rows for rendering, with
+        submitted values taking precedence over stored ones.
+        """
+        rows = []
+        for student in self.students:
+            cells = []
+            for subject in self.subjects:
+                name = f'marks_{student.id}_{subject.id}'
+                if self.is_bound:
+                    value = self.data.get(name, '')
+                else:
+                    stored = self.initial_marks.get((student.id, subject.id))
+                    value = stored[0] if stored else ''
+                cells.append((name, value, self.cell_errors.get((student.id, subject.id))))
+            rows.append((student, cells))
+        return rows
+
+    def max_marks_row(self):
+        """
+        (subject, input name, value, error) for each subject's max marks input.
+        """
+        row = []
+        for subject in self.subjects:
+            name = f'max_marks_{subject.id}'
+            if self.is_bound:
+                value = self.data.get(name, '')
+            else:
+                value = self.initial_max_marks.get(subject.id, 100)
+            row.append((subject, name, value, self.cell_errors.get(('max', subject.id))))
+        return row
+
+
+class MarksImportForm(forms.Form):
+    """
+    Form for uploading a CSV file of marks.
+    """
+    file = forms.FileField(
+        label='CSV file',
+        widget=forms.ClearableFileInput(attrs={'class': 'form-control', 'accept': '.csv,text/csv', 'required': True})
+    )
+    background = forms.BooleanField(
+        label='Run in the background (recommended for large files)',
+        required=False,
+        widget=forms.CheckboxInput(attrs={'class': 'form-check-input'})
+    )
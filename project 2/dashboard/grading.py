@@ -0,0 +1,173 @@
+from bisect import bisect_right
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Q, Value, When
+from django.db.models.functions import Cast, Round
+from django.db.models.lookups import GreaterThanOrEqual
+
+from .caching import bump_ranking_version_on_commit, grading_version
+from .models import FAILING_GRADE, GRADE_THRESHOLDS, GradingScheme, ProgressSheet, Student
+
+
+DEFAULT_SCOPE = ('', None)
+
+
+def _hundredths(expression):
+    # Marks have two decimal places; as whole hundredths they compare exactly,
+    # where SQLite's floating point puts values like 0.99 * 100 just below 99
+    return Cast(Round(expression * 100), output_field=IntegerField())
+
+
+class GradeTable:
+    """
+    One grading scheme's thresholds, sorted so a percentage is graded by bisection.
+    """
+
+    def __init__(self, thresholds, failing_grade=FAILING_GRADE, scheme=None):
+        thresholds = sorted((Decimal(minimum), grade) for minimum, grade in thresholds)
+        self.minimums = [minimum for minimum, _ in thresholds]
+        self.grades = [grade for _, grade in thresholds]
+        self.failing_grade = failing_grade
+        self.scheme = scheme
+
+    def grade(self, marks_obtained, max_marks):
+        """
+        Grade for the marks, or '' when there are no max marks to grade against.
+        """
+        if not max_marks or max_marks <= 0 or marks_obtained is None:
+            return ''
+        position = bisect_right(self.minimums, Decimal(marks_obtained) * 100 / Decimal(max_marks))
+        return self.grades[position - 1] if position else self.failing_grade
+
+    def expression(self):
+        """
+        The same grading as a SQL CASE over a progress sheet's marks. Compared as
+        marks * 100 >= minimum * max_marks in integer hundredths, which needs no
+        division or rounding and so grades a result exactly on a boundary the same
+        way as grade().
+        """
+        marks = _hundredths(F('marks_obtained')) * 10000
+        max_marks = _hundredths(F('max_marks'))
+        return Case(
+            When(max_marks__lte=0, then=Value('')),
+            *[
+                When(GreaterThanOrEqual(marks, max_marks * int(minimum * 100)), then=Value(grade))
+                for minimum, grade in zip(reversed(self.minimums), reversed(self.grades))
+            ],
+            default=Value(self.failing_grade)
+        )
+
+
+def _overlaps(scope, other):
+    return all(not a or not b or a == b for a, b in zip(scope, other))
+
+
+def _scope_filter(scope):
+    class_batch, subject_id = scope
+    condition = Q()
+    if class_batch:
+        condition &= Q(student__class_batch=class_batch)
+    if subject_id:
+        condition &= Q(subject_id=subject_id)
+    return condition
+
+
+class GradingSchemes:
+    """
+    Every grading scheme's GradeTable keyed by its (class_batch, subject_id)
+    scope, '' and None standing for "any". The default ladder fills in for a
+    missing catch-all scheme.
+    """
+
+    def __init__(self, schemes):
+        self.tables = {DEFAULT_SCOPE: GradeTable(GRADE_THRESHOLDS)}
+        for scheme in schemes:
+            self.tables[(scheme.class_batch, scheme.subject_id)] = GradeTable(
+                ((threshold.min_percentage, threshold.grade) for threshold in scheme.thresholds.all()),
+                scheme.failing_grade,
+                scheme
+            )
+        # Most specific scope first: class/batch and subject, subject, class/batch, any
+        self.scopes = sorted(self.tables, key=lambda scope: (scope[1] is None, not scope[0]))
+        # Only then does grading need each student's class/batch
+        self.by_class_batch = any(class_batch for class_batch, _ in self.tables)
+
+    @classmethod
+    def load(cls):
+        return cls(GradingScheme.objects.prefetch_related('thresholds'))
+
+    def table(self, class_batch, subject_id):
+        for scope in ((class_batch, subject_id), ('', subject_id), (class_batch, None), DEFAULT_SCOPE):
+            if scope in self.tables:
+                return self.tables[scope]
+
+    def regrade_filters(self):
+        """
+        (table, filter) for each scheme, the filter matching the progress sheets
+        the scheme grades: those in its scope and in no more specific one.
+        """
+        for position, scope in enumerate(self.scopes):
+            condition = _scope_filter(scope)
+            for narrower in self.scopes[:position]:
+                if _overlaps(scope, narrower):
+                    condition &= ~_scope_filter(narrower)
+            yield self.tables[scope], condition
+
+
+# (grading version, schemes) for this process
+_grading_schemes = (None, None)
+
+
+def grading_schemes():
+    """
+    The process's GradingSchemes, reloaded from the database only after a scheme
+    has changed. Changes made by other processes are seen only when the default
+    cache is shared between them.
+    """
+    global _grading_schemes
+    version = grading_version()
+    loaded_for, schemes = _grading_schemes
+    if loaded_for != version or schemes is None:
+        schemes = GradingSchemes.load()
+        _grading_schemes = (version, schemes)
+    return schemes
+
+
+def assign_grades(sheets, schemes=None):
+    """
+    Set the grade of each unsaved or changed ProgressSheet from its grading scheme.
+    Costs one query for the students' class/batches when a scheme depends on them.
+    """
+    schemes = schemes or grading_schemes()
+    class_batches = {}
+    if schemes.by_class_batch:
+        class_batches = dict(
+            Student.objects.filter(pk__in={sheet.student_id for sheet in sheets}).values_list('id', 'class_batch')
+        )
+    for sheet in sheets:
+        table = schemes.table(class_batches.get(sheet.student_id, ''), sheet.subject_id)
+        sheet.grade = table.grade(sheet.marks_obtained, sheet.max_marks)
+
+
+def regrade(student_ids=None):
+    """
+    Rewrite ProgressSheet.grade from the current grading schemes with one UPDATE
+    per scheme, optionally only for some students' sheets. Sheets that already
+    have the right grade are left alone. Returns the number of sheets changed.
+    """
+    # Read straight from the database: schemes edited in the current transaction
+    # are not in the cached copy yet
+    schemes = GradingSchemes.load()
+    sheets = ProgressSheet.objects.all()
+    if student_ids is not None:
+        sheets = sheets.filter(student_id__in=student_ids)
+    changed = 0
+    with transaction.atomic():
+        for table, condition in schemes.regrade_filters():
+            expression = table.expression()
+            changed += sheets.filter(condition).exclude(grade=expression).update(grade=expression)
+        if changed:
+            # Grade distributions are cached with the rankings
+            bump_ranking_version_on_commit(*(choice[0] for choice in ProgressSheet.EXAM_TYPE_CHOICES))
+    return changed
@@ -0,0 +1,138 @@
+import csv
+from itertools import islice
+
+from django import forms
+from django.core.exceptions import ValidationError
+
+from .bulk import upsert_progress_sheets
+from .forms import validate_marks_obtained, validate_marks_within_max, validate_max_marks
+from .models import ProgressSheet, Student, Subject
+
+
+IMPORT_COLUMNS = ['roll_number', 'subject_code', 'exam_type', 'exam_date', 'marks', 'max_marks']
+
+IMPORT_CHUNK_SIZE = 1000
+
+# Only this many row errors are kept for the report; the rest are just counted
+# so a badly broken file cannot grow the report without bound
+MAX_REPORTED_ERRORS = 1000
+
+EXAM_TYPES = {choice[0] for choice in ProgressSheet.EXAM_TYPE_CHOICES}
+
+# Reuse the form fields' parsing so file rows accept exactly what the forms do
+_date_field = forms.DateField()
+_marks_field = forms.DecimalField(max_digits=5, decimal_places=2)
+
+
+class MarksImport:
+    """
+    Outcome of a CSV marks import: counts plus a per-row error report of
+    (line number, message) pairs.
+    """
+
+    def __init__(self):
+        self.rows = 0
+        self.saved = 0
+        self.error_count = 0
+        self.errors = []
+
+    def add_error(self, line, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((line, message))
+
+    @property
+    def truncated(self):
+        return self.error_count > len(self.errors)
+
+
+def _clean_row(row, students, subjects):
+    """
+    Validate one CSV row the same way ProgressSheetForm does and return an
+    unsaved ProgressSheet, raising ValidationError on the first problem.
+    """
+    roll_number = (row.get('roll_number') or '').strip()
+    student_id = students.get(roll_number)
+    if student_id is None:
+        raise ValidationError(f'Unknown roll number "{roll_number}".')
+
+    subject_code = (row.get('subject_code') or '').strip()
+    subject_id = subjects.get(subject_code)
+    if subject_id is None:
+        raise ValidationError(f'Unknown subject code "{subject_code}".')
+
+    exam_type = (row.get('exam_type') or '').strip()
+    if exam_type not in EXAM_TYPES:
+        raise ValidationError(f'Unknown exam type "{exam_type}".')
+
+    exam_date = _date_field.clean((row.get('exam_date') or '').strip())
+    marks_obtained = validate_marks_obtained(_marks_field.clean((row.get('marks') or '').strip() or None))
+    max_marks = validate_max_marks(_marks_field.clean((row.get('max_marks') or '').strip() or None))
+    validate_marks_within_max(marks_obtained, max_marks)
+
+    return ProgressSheet(
+        student_id=student_id,
+        subject_id=subject_id,
+        exam_type=exam_type,
+        exam_date=exam_date,
+        marks_obtained=marks_obtained,
+        max_marks=max_marks
+    )
+
+
+def import_progress_sheets(lines, chunk_size=IMPORT_CHUNK_SIZE, progress=None):
+    """
+    Stream-parse CSV marks from an iterable of text lines and upsert them in
+    fixed-size batches.
+
+    Only one chunk of rows is held in memory at a time, and roll numbers and
+    subject codes are resolved with a single lookup query each per chunk.
+    Invalid rows are skipped and reported; valid rows are written even when
+    others fail. Each chunk is written and its exam results and rankings
+    refreshed in one transaction, so memory stays bounded by the chunk size and
+    a failure part-way leaves the derived tables matching the chunks written.
+
+    If given, progress is called with the result after each chunk is written.
+    """
+    result = MarksImport()
+    reader = csv.DictReader(lines)
+    missing = [column for column in IMPORT_COLUMNS if column not in (reader.fieldnames or [])]
+    if missing:
+        result.add_error(1, f'Missing columns: {", ".join(missing)}.')
+        return result
+
+    readable = True
+    while readable:
+        chunk = []
+        try:
+            for row in islice(reader, chunk_size):
+                chunk.append((reader.line_num, row))
+        except (csv.Error, UnicodeDecodeError) as e:
+            # The rest of the file cannot be read reliably; keep the rows read so far
+            result.add_error(reader.line_num + 1, f'Could not read the file past this line: {e}')
+            readable = False
+        if not chunk:
+            break
+        result.rows += len(chunk)
+
+        students = dict(Student.objects.filter(
+            roll_number__in={(row.get('roll_number') or '').strip() for _, row in chunk}
+        ).values_list('roll_number', 'id'))
+        subjects = dict(Subject.objects.filter(
+            code__in={(row.get('subject_code') or '').strip() for _, row in chunk}
+        ).values_list('code', 'id'))
+
+        # Keyed on the upsert key so a sheet repeated within a chunk keeps its last value
+        sheets = {}
+        for line, row in chunk:
+            try:
+                sheet = _clean_row(row, students, subjects)
+            except ValidationError as e:
+                result.add_error(line, ' '.join(e.messages))
+                continue
+            sheets[(sheet.student_id, sheet.subject_id, sheet.exam_type, sheet.exam_date)] = sheet
+
+        result.saved += upsert_progress_sheets(sheets.values())
+        if progress is not None:
+            progress(result)
+    return result
@@ -0,0 +1,279 @@
+import io
+import tempfile
+import time
+import traceback
+from datetime import timedelta
+
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import OperationalError, close_old_connections
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .archive import archive_academic_years, default_archive_before
+from .grading import regrade
+from .importers import import_progress_sheets
+from .models import Job, ProgressSheet, Student
+from .ranking import rebuild_rankings
+from .reports import report_card_archive
+from .results import find_exam_result_drift, repair_exam_results
+
+
+# A job that keeps hitting "database is locked" is requeued this many times,
+# backing off exponentially from JOB_RETRY_DELAY seconds, before it fails
+JOB_MAX_ATTEMPTS = 5
+JOB_RETRY_DELAY = 2
+
+# A running job's worker heartbeats it every JOB_HEARTBEAT_INTERVAL seconds.
+# One not heard from for JOB_LEASE_TIMEOUT seconds is taken to have lost its
+# worker (killed, crashed machine) and is requeued, within JOB_MAX_ATTEMPTS.
+JOB_HEARTBEAT_INTERVAL = 30
+JOB_LEASE_TIMEOUT = 5 * 60
+
+# Short bookkeeping writes (claiming, progress, status) retry in place instead
+LOCK_RETRY_ATTEMPTS = 5
+LOCK_RETRY_DELAY = 0.2
+
+JOB_HANDLERS = {}
+
+
+def job_handler(kind):
+    """
+    Register a function as the handler for a job kind. Handlers are called as
+    handler(job, report_progress) in a worker process and return a
+    JSON-serializable result; report_progress(progress, total) records how far
+    along they are.
+    """
+    def register(handler):
+        JOB_HANDLERS[kind] = handler
+        return handler
+    return register
+
+
+def is_database_locked(error):
+    return isinstance(error, OperationalError) and 'database is locked' in str(error)
+
+
+def retry_on_locked(func, *args, attempts=LOCK_RETRY_ATTEMPTS, delay=LOCK_RETRY_DELAY, **kwargs):
+    """
+    Call func, retrying with exponential backoff while SQLite reports the
+    database as locked by another writer.
+    """
+    for attempt in range(attempts):
+        try:
+            return func(*args, **kwargs)
+        except OperationalError as e:
+            if not is_database_locked(e) or attempt == attempts - 1:
+                raise
+            time.sleep(delay * 2 ** attempt)
+
+
+def _update_job(job_id, **fields):
+    return retry_on_locked(Job.objects.filter(pk=job_id).update, **fields)
+
+
+def _update_claimed_job(job, **fields):
+    """
+    Update a job only while it is still held by the claim `job` came from, so a
+    worker whose lease expired cannot overwrite a later attempt.
+    """
+    return retry_on_locked(
+        Job.objects.filter(pk=job.pk, status=Job.STATUS_RUNNING, started_at=job.started_at).update, **fields
+    )
+
+
+def fail_job(job_id, error):
+    _update_job(job_id, status=Job.STATUS_FAILED, error=error, finished_at=timezone.now())
+
+
+def discard_job_upload(job):
+    """
+    Delete the upload a job was handed in payload['path'], once no attempt of the
+    job will read it again.
+    """
+    path = (job.payload or {}).get('path')
+    if path:
+        default_storage.delete(path)
+
+
+def heartbeat_jobs(job_ids):
+    """
+    Extend the lease of running jobs whose worker is still alive.
+    """
+    return retry_on_locked(
+        Job.objects.filter(pk__in=job_ids, status=Job.STATUS_RUNNING).update, heartbeat_at=timezone.now()
+    )
+
+
+def requeue_stale_jobs():
+    """
+    Put running jobs whose lease has expired back in the queue, or fail them once
+    they have used up their attempts. Returns (requeued, failed).
+    """
+    now = timezone.now()
+    stale = Q(status=Job.STATUS_RUNNING) & (
+        Q(heartbeat_at__lt=now - timedelta(seconds=JOB_LEASE_TIMEOUT))
+        | Q(heartbeat_at__isnull=True, started_at__lt=now - timedelta(seconds=JOB_LEASE_TIMEOUT))
+    )
+    error = f'The worker running this job stopped responding for over {JOB_LEASE_TIMEOUT} seconds.'
+    failed = 0
+    for job in Job.objects.filter(stale, attempts__gte=JOB_MAX_ATTEMPTS).only('pk', 'payload'):
+        # Abandoned for good, so nothing will read its upload again
+        if Job.objects.filter(stale, pk=job.pk).update(status=Job.STATUS_FAILED, error=error, finished_at=now):
+            discard_job_upload(job)
+            failed += 1
+    requeued = Job.objects.filter(stale).update(status=Job.STATUS_QUEUED, run_after=now, error=error)
+    return requeued, failed
+
+
+def enqueue_job(kind, payload=None, user=None):
+    """
+    Queue a job for the run_jobs worker and return it.
+    """
+    if kind not in JOB_HANDLERS:
+        raise ValueError(f'Unknown job kind: {kind}')
+    return retry_on_locked(Job.objects.create, kind=kind, payload=payload or {}, created_by=user)
+
+
+def claim_next_job():
+    """
+    Mark the oldest runnable queued job as running and return it, or None when
+    there is nothing to do. The claim is a conditional UPDATE, so two workers
+    can never take the same job. Jobs whose lease has expired are requeued first.
+    """
+    def claim():
+        requeue_stale_jobs()
+        now = timezone.now()
+        candidates = Job.objects.filter(
+            status=Job.STATUS_QUEUED,
+            run_after__lte=now
+        ).order_by('run_after', 'pk').values_list('pk', flat=True)[:10]
+        for job_id in candidates:
+            claimed = Job.objects.filter(pk=job_id, status=Job.STATUS_QUEUED).update(
+                status=Job.STATUS_RUNNING,
+                started_at=now,
+                heartbeat_at=now,
+                attempts=F('attempts') + 1
+            )
+            if claimed:
+                return Job.objects.get(pk=job_id)
+        return None
+    return retry_on_locked(claim)
+
+
+def run_job(job_id):
+    """
+    Run a claimed job to completion and record the outcome. Called in a worker
+    process; returns the job's final status.
+    """
+    close_old_connections()
+    job = retry_on_locked(Job.objects.get, pk=job_id)
+
+    def report_progress(progress, total=None):
+        _update_claimed_job(job, progress=progress, total=total)
+
+    # The upload stays for a retry, or for a later attempt that took the job over
+    keep_upload = False
+    try:
+        try:
+            handler = JOB_HANDLERS.get(job.kind)
+            if handler is None:
+                raise ValueError(f'Unknown job kind: {job.kind}')
+            result = handler(job, report_progress)
+        except Exception as e:
+            if is_database_locked(e) and job.attempts < JOB_MAX_ATTEMPTS:
+                # Handlers are safe to re-run, so put the job back for a later attempt
+                keep_upload = True
+                _update_claimed_job(
+                    job,
+                    status=Job.STATUS_QUEUED,
+                    run_after=timezone.now() + timedelta(seconds=JOB_RETRY_DELAY * 2 ** (job.attempts - 1)),
+                    error=str(e)
+                )
+                return Job.STATUS_QUEUED
+            keep_upload = not _update_claimed_job(
+                job, status=Job.STATUS_FAILED, error=traceback.format_exc(), finished_at=timezone.now()
+            )
+            return Job.STATUS_FAILED
+
+        keep_upload = not _update_claimed_job(
+            job, status=Job.STATUS_SUCCEEDED, result=result, error='', finished_at=timezone.now()
+        )
+    finally:
+        if not keep_upload:
+            discard_job_upload(job)
+    return Job.STATUS_SUCCEEDED
+
+
+@job_handler('import_marks')
+def import_marks_job(job, report_progress):
+    """
+    Import a CSV upload saved to default storage under payload['path']. run_job
+    deletes the upload once the job has finished.
+    """
+    path = job.payload['path']
+    with default_storage.open(path, 'rb') as raw:
+        size = default_storage.size(path)
+        lines = io.TextIOWrapper(raw, encoding='utf-8-sig', newline='')
+        # Progress is measured in bytes read, which is known up front unlike the row count
+        result = import_progress_sheets(lines, progress=lambda _: report_progress(raw.tell(), size))
+    return {
+        'rows': result.rows,
+        'saved': result.saved,
+        'error_count': result.error_count,
+        'errors': result.errors,
+    }
+
+
+@job_handler('rebuild_rankings')
+def rebuild_rankings_job(job, report_progress):
+    exam_types = job.payload.get('exam_types') or [choice[0] for choice in ProgressSheet.EXAM_TYPE_CHOICES]
+    written = 0
+    for done, exam_type in enumerate(exam_types):
+        report_progress(done, len(exam_types))
+        written += rebuild_rankings([exam_type])
+    return {'rows': written}
+
+
+@job_handler('repair_exam_results')
+def repair_exam_results_job(job, report_progress):
+    created, updated, deleted = repair_exam_results(find_exam_result_drift())
+    return {'created': created, 'updated': updated, 'deleted': deleted}
+
+
+@job_handler('regrade')
+def regrade_job(job, report_progress):
+    return {'changed': regrade()}
+
+
+@job_handler('archive_academic_years')
+def archive_academic_years_job(job, report_progress):
+    before = job.payload.get('before') or default_archive_before()
+    return {'before': before, **archive_academic_years(before, report_progress=report_progress)}
+
+
+@job_handler('report_cards')
+def report_cards_job(job, report_progress):
+    """
+    Render report cards into a zip archive kept in default storage.
+    """
+    class_batch = job.payload.get('class_batch')
+    students = Student.objects.filter(class_batch=class_batch) if class_batch else Student.objects.all()
+    total = students.count()
+    stats = {'cards': 0, 'seconds': 0.0}
+
+    def progress(cards, seconds):
+        stats.update(cards=cards, seconds=seconds)
+        report_progress(cards, total)
+
+    with tempfile.TemporaryFile() as archive:
+        for chunk in report_card_archive(class_batch, job.payload.get('workers'), progress):
+            archive.write(chunk)
+        archive.seek(0)
+        path = default_storage.save(f'reports/report-cards-{job.pk}.zip', File(archive))
+    return {
+        'path': path,
+        'cards': stats['cards'],
+        'seconds': round(stats['seconds'], 1),
+        'cards_per_second': round(stats['cards'] / stats['seconds']) if stats['seconds'] else None,
+    }
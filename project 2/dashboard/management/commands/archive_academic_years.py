@@ -0,0 +1,55 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from dashboard.archive import (
+    ARCHIVE_BATCH_SIZE, academic_year_label, academic_year_start, archive_academic_years, default_archive_before,
+)
+from dashboard.models import ProgressSheet
+
+
+class Command(BaseCommand):
+    help = (
+        'Move progress sheets, exam results and rank history from old academic years '
+        'into the archive tables, a batch of students at a time, and rebuild the rankings.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--before',
+            type=int,
+            help=(
+                'Archive academic years starting before this calendar year. Defaults to '
+                'keeping the last settings.ARCHIVE_KEEP_ACADEMIC_YEARS years.'
+            ),
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=ARCHIVE_BATCH_SIZE,
+            help='Students whose marks are moved per transaction.',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report how many progress sheets would be archived.',
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be positive.')
+        before = options['before'] or default_archive_before()
+        self.stdout.write(f'Archiving academic years before {academic_year_label(before)}.')
+
+        if options['dry_run']:
+            count = ProgressSheet.objects.filter(exam_date__lt=academic_year_start(before)).count()
+            self.stdout.write(f'{count} progress sheets would be archived.')
+            return
+
+        archived = archive_academic_years(
+            before,
+            batch_size=options['batch_size'],
+            report_progress=lambda done, total: self.stdout.write(f'  {done}/{total} students'),
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Archived {archived['progress_sheets']} progress sheets and {archived['exam_results']} "
+            f"exam results of {archived['students']} students."
+        ))
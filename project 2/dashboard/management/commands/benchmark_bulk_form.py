@@ -0,0 +1,61 @@
+from time import perf_counter
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand, CommandError
+from django.template.loader import render_to_string
+from django.test import RequestFactory
+
+from dashboard.forms import BulkProgressSheetForm
+from dashboard.models import Student, Subject
+
+
+class Command(BaseCommand):
+    help = (
+        'Time building, validating and rendering BulkProgressSheetForm for growing '
+        'numbers of subjects. Uses unsaved subjects, so no data is written.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--subjects',
+            type=int,
+            action='append',
+            help='Number of subjects to benchmark (may be given more than once). Defaults to 50, 100, 200 and 400.',
+        )
+        parser.add_argument('--repeat', type=int, default=5, help='Runs per size; the best run is reported.')
+
+    def handle(self, *args, **options):
+        sizes = options['subjects'] or [50, 100, 200, 400]
+        if min(sizes) < 1 or options['repeat'] < 1:
+            raise CommandError('--subjects and --repeat must be at least 1.')
+
+        request = RequestFactory().get('/')
+        request.user = AnonymousUser()
+
+        self.stdout.write(f"{'subjects':>8} {'build ms':>10} {'clean ms':>10} {'render ms':>10} {'render us/subject':>18}")
+        for size in sizes:
+            subjects = [Subject(id=i, name=f'Subject {i}', code=f'B{i}') for i in range(1, size + 1)]
+            data = {'exam_type': 'quarterly', 'exam_date': '2025-01-01'}
+            for subject in subjects:
+                data[f'marks_{subject.id}'] = '40'
+                data[f'max_marks_{subject.id}'] = '50'
+
+            best = None
+            for _ in range(options['repeat']):
+                start = perf_counter()
+                form = BulkProgressSheetForm(data, subjects=subjects)
+                form.fields['student'].queryset = Student.objects.none()
+                built = perf_counter()
+                form.is_valid()
+                cleaned = perf_counter()
+                render_to_string('dashboard/bulk_progress_sheet_form.html', {
+                    'form': form,
+                    'title': 'Bulk Progress Sheet Entry'
+                }, request=request)
+                rendered = perf_counter()
+                timings = (built - start, cleaned - built, rendered - cleaned)
+                if best is None or sum(timings) < sum(best):
+                    best = timings
+
+            build, clean, render = (seconds * 1000 for seconds in best)
+            self.stdout.write(f'{size:>8} {build:>10.1f} {clean:>10.1f} {render:>10.1f} {render * 1000 / size:>18.1f}')
@@ -0,0 +1,183 @@
+import datetime
+import multiprocessing
+import random
+import shutil
+import statistics
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from decimal import Decimal
+from pathlib import Path
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connections
+
+from dashboard import database
+from dashboard.bulk import upsert_progress_sheets
+from dashboard.models import ProgressSheet, Student, Subject
+from dashboard.ranking import ranking_page
+
+
+EXAM_TYPES = [choice[0] for choice in ProgressSheet.EXAM_TYPE_CHOICES]
+EXAM_DATE = datetime.date(2025, 1, 10)
+
+
+def _random_sheets(student_id, subject_ids, exam_type, rng):
+    return [
+        ProgressSheet(
+            student_id=student_id,
+            subject_id=subject_id,
+            exam_type=exam_type,
+            exam_date=EXAM_DATE,
+            marks_obtained=Decimal(rng.randint(0, 100)),
+            max_marks=Decimal(100)
+        )
+        for subject_id in subject_ids
+    ]
+
+
+def _run_worker(role, seconds, persistent, seed):
+    """
+    Enter marks (writer) or read rankings and progress sheets (reader) for the
+    given number of seconds. Returns (role, latencies in seconds, lock errors).
+    """
+    rng = random.Random(seed)
+    student_ids = list(Student.objects.values_list('id', flat=True))
+    subject_ids = list(Subject.objects.values_list('id', flat=True))
+    latencies = []
+    errors = 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        student_id = rng.choice(student_ids)
+        exam_type = rng.choice(EXAM_TYPES)
+        start = time.perf_counter()
+        try:
+            if role == 'write':
+                upsert_progress_sheets(_random_sheets(student_id, subject_ids, exam_type, rng))
+            else:
+                ranking_page(exam_type)
+                list(ProgressSheet.objects.filter(student_id=student_id).select_related('subject'))
+        except OperationalError:
+            errors += 1
+        else:
+            latencies.append(time.perf_counter() - start)
+        if not persistent:
+            # As with CONN_MAX_AGE = 0, every request opens a new connection
+            connections.close_all()
+    connections.close_all()
+    return role, latencies, errors
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare concurrent mark entry and ranking reads on a scratch copy of the '
+        'schema under SQLite defaults (rollback journal, deferred transactions, a '
+        'new connection per request) and under the configured SQLITE_PROFILE, '
+        'transaction mode and persistent connections. The project database is not touched.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seconds', type=float, default=5.0, help='How long each configuration runs.')
+        parser.add_argument('--readers', type=int, default=4, help='Reader processes.')
+        parser.add_argument('--writers', type=int, default=2, help='Writer processes.')
+        parser.add_argument('--students', type=int, default=500, help='Students in the scratch database.')
+        parser.add_argument('--subjects', type=int, default=6, help='Subjects in the scratch database.')
+
+    def handle(self, *args, **options):
+        if options['readers'] < 0 or options['writers'] < 0 or options['readers'] + options['writers'] < 1:
+            raise CommandError('Need at least one reader or writer.')
+        if options['students'] < 1 or options['subjects'] < 1 or options['seconds'] <= 0:
+            raise CommandError('--students, --subjects and --seconds must be positive.')
+
+        connection = connections['default']
+        if connection.vendor != 'sqlite':
+            raise CommandError('This benchmark is for SQLite databases.')
+
+        connections.close_all()
+        original = {
+            'NAME': connection.settings_dict['NAME'],
+            'OPTIONS': dict(connection.settings_dict['OPTIONS']),
+        }
+        baseline_options = {
+            key: value for key, value in original['OPTIONS'].items() if key != 'transaction_mode'
+        }
+        configurations = [
+            ('baseline', 'default', baseline_options, False),
+            ('configured', None, original['OPTIONS'], True),
+        ]
+        try:
+            with tempfile.TemporaryDirectory() as directory:
+                template = Path(directory) / 'template.sqlite3'
+                self.stdout.write('Building the scratch database...')
+                self.build_template(connection, template, baseline_options, options)
+
+                self.stdout.write(
+                    f"{'configuration':<14} {'role':<6} {'ops/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'max ms':>8} {'locked':>7}"
+                )
+                for label, profile, connection_options, persistent in configurations:
+                    path = Path(directory) / f'{label}.sqlite3'
+                    shutil.copyfile(template, path)
+                    connection.settings_dict['NAME'] = str(path)
+                    connection.settings_dict['OPTIONS'] = connection_options
+                    database.active_profile = profile
+                    results = self.run_configuration(options, persistent)
+                    for role in ('write', 'read'):
+                        self.report(label, role, results, options['seconds'])
+        finally:
+            connections.close_all()
+            connection.settings_dict.update(original)
+            database.active_profile = None
+
+    def build_template(self, connection, path, connection_options, options):
+        connection.settings_dict['NAME'] = str(path)
+        connection.settings_dict['OPTIONS'] = connection_options
+        database.active_profile = 'default'
+        call_command('migrate', verbosity=0)
+        subjects = Subject.objects.bulk_create(
+            Subject(name=f'Subject {i}', code=f'BENCH{i}') for i in range(options['subjects'])
+        )
+        students = Student.objects.bulk_create(
+            Student(
+                full_name=f'Student {i}',
+                email=f'student{i}@bench.invalid',
+                roll_number=f'B{i:06d}',
+                class_batch=Student.CLASS_CHOICES[i % len(Student.CLASS_CHOICES)][0],
+                date_of_birth=datetime.date(2005, 1, 1)
+            )
+            for i in range(options['students'])
+        )
+        rng = random.Random(0)
+        subject_ids = [subject.id for subject in subjects]
+        upsert_progress_sheets(
+            sheet
+            for student in students
+            for exam_type in EXAM_TYPES
+            for sheet in _random_sheets(student.id, subject_ids, exam_type, rng)
+        )
+        connections.close_all()
+
+    def run_configuration(self, options, persistent):
+        roles = ['write'] * options['writers'] + ['read'] * options['readers']
+        # Workers are forked and must each open their own connection
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=len(roles), mp_context=multiprocessing.get_context('fork')) as pool:
+            futures = [
+                pool.submit(_run_worker, role, options['seconds'], persistent, seed)
+                for seed, role in enumerate(roles)
+            ]
+            return [future.result() for future in futures]
+
+    def report(self, label, role, results, seconds):
+        latencies = sorted(latency for result_role, times, _ in results if result_role == role for latency in times)
+        errors = sum(count for result_role, _, count in results if result_role == role)
+        if not latencies:
+            if errors:
+                self.stdout.write(f'{label:<14} {role:<6} {0:>8.1f} {"-":>8} {"-":>8} {"-":>8} {errors:>7}')
+            return
+        p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+        self.stdout.write(
+            f'{label:<14} {role:<6} {len(latencies) / seconds:>8.1f} '
+            f'{statistics.median(latencies) * 1000:>8.1f} {p95 * 1000:>8.1f} '
+            f'{latencies[-1] * 1000:>8.1f} {errors:>7}'
+        )
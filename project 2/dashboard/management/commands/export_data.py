@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from dashboard.exports import EXPORT_FORMATS, EXPORTS, export_chunks
+
+
+class Command(BaseCommand):
+    help = 'Export students, progress sheets or rankings as CSV or JSON lines, streamed in constant memory.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('dataset', choices=sorted(EXPORTS))
+        parser.add_argument('--format', choices=sorted(EXPORT_FORMATS), default='csv')
+        parser.add_argument('--output', help='File to write to. Defaults to standard output.')
+
+    def handle(self, *args, **options):
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8', newline='') as output:
+                for chunk in export_chunks(options['dataset'], options['format']):
+                    output.write(chunk)
+            self.stderr.write(self.style.SUCCESS(f"Exported {options['dataset']} to {options['output']}."))
+        else:
+            for chunk in export_chunks(options['dataset'], options['format']):
+                self.stdout.write(chunk, ending='')
@@ -0,0 +1,42 @@
+
+from django.core.management.base import BaseCommand, CommandError
+
+from dashboard.models import Student
+from dashboard.reports import report_card_archive
+
+
+class Command(BaseCommand):
+    help = 'Render an HTML report card for every student into a zip archive, in parallel.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', help='Path of the zip archive to write.')
+        parser.add_argument(
+            '--class-batch',
+            choices=[choice[0] for choice in Student.CLASS_CHOICES],
+            help='Only generate report cards for this class/batch.',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            help='Number of rendering processes, at most REPORT_CARD_WORKERS (the default).',
+        )
+
+    def handle(self, *args, **options):
+        if options['workers'] is not None and options['workers'] < 1:
+            raise CommandError('--workers must be at least 1.')
+
+        stats = {'cards': 0, 'seconds': 0.0}
+
+        def progress(cards, seconds):
+            stats.update(cards=cards, seconds=seconds)
+            self.stderr.write(f'{cards} report cards rendered ({cards / seconds:.0f} cards/sec)')
+
+        with open(options['output'], 'wb') as output:
+            for chunk in report_card_archive(options['class_batch'], options['workers'], progress):
+                output.write(chunk)
+
+        rate = stats['cards'] / stats['seconds'] if stats['seconds'] else 0
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {stats['cards']} report cards to {options['output']} "
+            f"in {stats['seconds']:.1f}s ({rate:.0f} cards/sec)."
+        ))
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from dashboard.importers import IMPORT_CHUNK_SIZE, import_progress_sheets
+
+
+class Command(BaseCommand):
+    help = 'Import marks from a CSV file of roll_number, subject_code, exam_type, exam_date, marks, max_marks rows.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV file to import.')
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=IMPORT_CHUNK_SIZE,
+            help='Rows to validate and upsert per batch.',
+        )
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size must be at least 1.')
+        try:
+            with open(options['path'], encoding='utf-8-sig', newline='') as lines:
+                result = import_progress_sheets(lines, chunk_size=options['chunk_size'])
+        except OSError as e:
+            raise CommandError(f'Could not open {options["path"]}: {e}')
+
+        for line, message in result.errors:
+            self.stderr.write(f'line {line}: {message}')
+        if result.truncated:
+            self.stderr.write(f'... {result.error_count - len(result.errors)} more errors not shown.')
+
+        summary = f'Imported {result.saved} of {result.rows} rows, {result.error_count} rejected.'
+        if result.error_count:
+            self.stdout.write(self.style.WARNING(summary))
+        else:
+            self.stdout.write(self.style.SUCCESS(summary))
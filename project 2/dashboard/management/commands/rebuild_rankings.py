@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from dashboard.models import ProgressSheet
+from dashboard.ranking import rebuild_rankings
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the StudentRanking and RankHistory tables from the progress sheets.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--exam-type',
+            action='append',
+            choices=[choice[0] for choice in ProgressSheet.EXAM_TYPE_CHOICES],
+            help='Only rebuild this exam type (may be given more than once).',
+        )
+
+    def handle(self, *args, **options):
+        written = rebuild_rankings(options['exam_type'])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {written} ranking rows.'))
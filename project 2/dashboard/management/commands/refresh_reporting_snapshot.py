@@ -0,0 +1,40 @@
+import time
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from dashboard.replica import refresh_snapshot, snapshot_path
+
+
+class Command(BaseCommand):
+    help = (
+        'Copy the default database into the read-only reporting snapshot used by '
+        'the ranking, progress sheet and export views, once or periodically.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--every',
+            type=float,
+            help='Keep running, refreshing the snapshot every this many seconds.',
+        )
+
+    def handle(self, *args, **options):
+        if connections['default'].vendor != 'sqlite':
+            raise CommandError('Reporting snapshots are copies of a SQLite default database.')
+        if not snapshot_path():
+            raise CommandError('settings.REPORTING_SNAPSHOT_PATH is not set.')
+        if options['every'] is not None and options['every'] <= 0:
+            raise CommandError('--every must be positive.')
+
+        while True:
+            start = time.monotonic()
+            taken_at = refresh_snapshot()
+            self.stdout.write(
+                f'Snapshot as of {datetime.fromtimestamp(taken_at):%Y-%m-%d %H:%M:%S} '
+                f'written in {time.monotonic() - start:.2f}s.'
+            )
+            if options['every'] is None:
+                break
+            time.sleep(max(0, options['every'] - (time.monotonic() - start)))
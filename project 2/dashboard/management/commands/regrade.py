@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from dashboard.grading import regrade
+
+
+class Command(BaseCommand):
+    help = 'Rewrite every progress sheet grade from the current grading schemes.'
+
+    def handle(self, *args, **options):
+        changed = regrade()
+        self.stdout.write(self.style.SUCCESS(f'Regraded {changed} progress sheets.'))
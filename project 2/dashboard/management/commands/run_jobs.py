@@ -0,0 +1,84 @@
+import multiprocessing
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connections
+
+from dashboard.jobs import JOB_HEARTBEAT_INTERVAL, claim_next_job, fail_job, heartbeat_jobs, run_job
+
+
+class Command(BaseCommand):
+    help = 'Run queued background jobs (imports, ranking rebuilds, reports) in a pool of worker processes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=min(4, os.cpu_count() or 1),
+            help='Number of worker processes.',
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=1.0,
+            help='Seconds to wait between checks for new jobs.',
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Exit once the queue is empty instead of waiting for more jobs.',
+        )
+
+    def handle(self, *args, **options):
+        workers = options['workers']
+        if workers < 1:
+            raise CommandError('--workers must be at least 1.')
+
+        # Workers are forked from this process, so they must not inherit its open
+        # database connection; each one opens its own
+        connections.close_all()
+        running = {}
+        last_heartbeat = time.monotonic()
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('fork')) as pool:
+            while True:
+                while len(running) < workers:
+                    job = claim_next_job()
+                    if job is None:
+                        break
+                    connections.close_all()
+                    running[pool.submit(run_job, job.pk)] = job
+                    self.stdout.write(f'Started {job.kind} job #{job.pk} (attempt {job.attempts}).')
+
+                if not running:
+                    if options['once']:
+                        break
+                    time.sleep(options['poll_interval'])
+                    continue
+
+                # Keep the leases of this process's jobs; if it dies they expire and
+                # another run_jobs requeues them
+                if time.monotonic() - last_heartbeat >= JOB_HEARTBEAT_INTERVAL:
+                    try:
+                        heartbeat_jobs([job.pk for job in running.values()])
+                    except OperationalError as e:
+                        # The lease outlasts several heartbeats, so try again next time
+                        # round rather than stop supervising the running jobs
+                        self.stderr.write(self.style.WARNING(f'Could not heartbeat running jobs: {e}'))
+                    else:
+                        last_heartbeat = time.monotonic()
+
+                done, _ = wait(running, timeout=options['poll_interval'], return_when=FIRST_COMPLETED)
+                for future in done:
+                    job = running.pop(future)
+                    try:
+                        status = future.result()
+                    except BrokenProcessPool:
+                        # A worker died without recording an outcome; fail its jobs
+                        # so they are not left running forever
+                        for stuck in [job, *running.values()]:
+                            fail_job(stuck.pk, 'The worker process running this job exited unexpectedly.')
+                        raise CommandError('A worker process exited unexpectedly; restart run_jobs.')
+                    self.stdout.write(f'{job.kind} job #{job.pk}: {status}.')
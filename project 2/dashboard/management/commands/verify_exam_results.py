@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+
+from dashboard.results import find_exam_result_drift, repair_exam_results
+
+
+class Command(BaseCommand):
+    help = 'Check ExamResult rows against their progress sheets and optionally repair any drift.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--repair',
+            action='store_true',
+            help='Create, update and delete ExamResult rows so they match the progress sheets.',
+        )
+
+    def handle(self, *args, **options):
+        drift = list(find_exam_result_drift())
+        if not drift:
+            self.stdout.write(self.style.SUCCESS('All exam results match their progress sheets.'))
+            return
+
+        for expected, stored in drift:
+            row = expected or stored
+            key = f"student {row['student_id']} {row['exam_type']} {row['exam_date']}"
+            if expected is None:
+                self.stdout.write(f'{key}: has no progress sheets left')
+            elif stored is None:
+                self.stdout.write(f'{key}: missing')
+            else:
+                self.stdout.write(
+                    f"{key}: stored {stored['total_marks']}/{stored['max_possible_marks']}, "
+                    f"expected {expected['total_marks']}/{expected['max_possible_marks']}"
+                )
+
+        if not options['repair']:
+            self.stdout.write(self.style.WARNING(f'{len(drift)} exam results have drifted. Run with --repair to fix them.'))
+            return
+
+        created, updated, deleted = repair_exam_results(drift)
+        self.stdout.write(self.style.SUCCESS(f'Repaired exam results: {created} created, {updated} updated, {deleted} deleted.'))
@@ -0,0 +1,22 @@
+from .replica import record_write
+
+
+class ReadYourWritesMiddleware:
+    """
+    Remember when a signed-in user last submitted a change, so reporting views
+    read from the live database until a snapshot includes that change.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if (
+            request.method not in ('GET', 'HEAD', 'OPTIONS', 'TRACE')
+            and response.status_code < 400
+            and getattr(request, 'user', None) is not None
+            and request.user.is_authenticated
+        ):
+            record_write(request)
+        return response
@@ -0,0 +1,80 @@
+# Generated by Django 5.2.7 on 2026-10-17 04:20
+
+import django.core.validators
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Student',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('full_name', models.CharField(max_length=200)),
+                ('email', models.EmailField(max_length=254, unique=True)),
+                ('roll_number', models.CharField(max_length=20, unique=True, validators=[django.core.validators.RegexValidator(message='Roll number must contain alphanumeric characters and hyphens only.', regex='^[A-Za-z0-9]+[A-Za-z0-9\\-]*[A-Za-z0-9]+$')])),
+                ('class_batch', models.CharField(choices=[('FY', 'First Year'), ('SY', 'Second Year'), ('TY', 'Third Year'), ('FYJC', 'First Year Junior College'), ('SYJC', 'Second Year Junior College')], max_length=10)),
+                ('date_of_birth', models.DateField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['roll_number'],
+            },
+        ),
+        migrations.CreateModel(
+            name='Subject',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('code', models.CharField(max_length=20, unique=True)),
+                ('description', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ExamResult',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('exam_type', models.CharField(choices=[('quarterly', 'Quarterly'), ('midterm', 'Midterm'), ('model', 'Model'), ('end_term', 'End Term')], max_length=10)),
+                ('total_marks', models.DecimalField(decimal_places=2, default=0, max_digits=7)),
+                ('max_possible_marks', models.DecimalField(decimal_places=2, default=0, max_digits=7)),
+                ('average_percentage', models.DecimalField(blank=True, decimal_places=2, max_digits=5, null=True, validators=[django.core.validators.MinValueValidator(0), django.core.validators.MaxValueValidator(100)])),
+                ('exam_date', models.DateField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='exam_results', to='dashboard.student')),
+            ],
+            options={
+                'ordering': ['student', 'exam_date', 'exam_type'],
+                'unique_together': {('student', 'exam_type', 'exam_date')},
+            },
+        ),
+        migrations.CreateModel(
+            name='ProgressSheet',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('exam_type', models.CharField(choices=[('quarterly', 'Quarterly'), ('midterm', 'Midterm'), ('model', 'Model'), ('end_term', 'End Term')], max_length=10)),
+                ('exam_date', models.DateField()),
+                ('marks_obtained', models.DecimalField(decimal_places=2, max_digits=5, validators=[django.core.validators.MinValueValidator(0)])),
+                ('max_marks', models.DecimalField(decimal_places=2, max_digits=5, validators=[django.core.validators.MinValueValidator(1)])),
+                ('percentage', models.DecimalField(blank=True, decimal_places=2, max_digits=5, null=True, validators=[django.core.validators.MinValueValidator(0), django.core.validators.MaxValueValidator(100)])),
+                ('grade', models.CharField(blank=True, max_length=3)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='progress_sheets', to='dashboard.student')),
+                ('subject', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='progress_sheets', to='dashboard.subject')),
+            ],
+            options={
+                'ordering': ['student', 'subject', 'exam_date', 'exam_type'],
+                'unique_together': {('student', 'subject', 'exam_type', 'exam_date')},
+            },
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.7 on 2026-10-17 04:20
+
+import django.core.validators
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StudentRanking',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('exam_type', models.CharField(choices=[('quarterly', 'Quarterly'), ('midterm', 'Midterm'), ('model', 'Model'), ('end_term', 'End Term')], max_length=10)),
+                ('total_marks', models.DecimalField(decimal_places=2, default=0, max_digits=9)),
+                ('max_marks', models.DecimalField(decimal_places=2, default=0, max_digits=9)),
+                ('subject_count', models.PositiveIntegerField(default=0)),
+                ('average_percentage', models.DecimalField(decimal_places=2, max_digits=5, validators=[django.core.validators.MinValueValidator(0), django.core.validators.MaxValueValidator(100)])),
+                ('rank', models.PositiveIntegerField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rankings', to='dashboard.student')),
+            ],
+            options={
+                'ordering': ['exam_type', 'rank'],
+                'indexes': [models.Index(fields=['exam_type', 'rank'], name='ranking_exam_type_rank_idx'), models.Index(fields=['exam_type', 'average_percentage'], name='ranking_exam_type_avg_idx')],
+                'unique_together': {('student', 'exam_type')},
+            },
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.7 on 2026-10-17 04:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0002_studentranking'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='studentranking',
+            name='ranking_exam_type_avg_idx',
+        ),
+        migrations.AddIndex(
+            model_name='studentranking',
+            index=models.Index(fields=['exam_type', '-average_percentage', 'student'], name='ranking_exam_type_avg_idx'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.7 on 2026-10-17 04:25
+
+import django.core.validators
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0003_ranking_keyset_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RankHistory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_marks', models.DecimalField(decimal_places=2, default=0, max_digits=9)),
+                ('max_marks', models.DecimalField(decimal_places=2, default=0, max_digits=9)),
+                ('subject_count', models.PositiveIntegerField(default=0)),
+                ('average_percentage', models.DecimalField(decimal_places=2, max_digits=5, validators=[django.core.validators.MinValueValidator(0), django.core.validators.MaxValueValidator(100)])),
+                ('rank', models.PositiveIntegerField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('exam_type', models.CharField(choices=[('quarterly', 'Quarterly'), ('midterm', 'Midterm'), ('model', 'Model'), ('end_term', 'End Term')], max_length=10)),
+                ('exam_date', models.DateField()),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rank_history', to='dashboard.student')),
+            ],
+            options={
+                'verbose_name_plural': 'rank history',
+                'ordering': ['student', 'exam_date', 'exam_type'],
+                'indexes': [models.Index(fields=['exam_type', 'exam_date', '-average_percentage', 'student'], name='rank_history_cohort_avg_idx')],
+                'unique_together': {('student', 'exam_type', 'exam_date')},
+            },
+        ),
+    ]
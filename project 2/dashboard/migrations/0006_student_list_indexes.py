@@ -0,0 +1,22 @@
+# Generated by Django 5.2.7 on 2026-10-17 04:39
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0005_job'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['class_batch', 'roll_number'], name='student_class_roll_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(django.db.models.functions.text.Lower('full_name'), models.F('roll_number'), name='student_name_lower_idx'),
+        ),
+    ]
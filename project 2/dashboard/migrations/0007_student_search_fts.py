@@ -0,0 +1,80 @@
+from django.db import migrations
+
+
+# FTS5 index over the searchable student columns. It is an external-content
+# table, so it stores only the index; the triggers keep it in step with every
+# insert, update and delete, including bulk writes that skip model signals.
+CREATE_SEARCH_INDEX = [
+    """
+    CREATE VIRTUAL TABLE dashboard_student_fts USING fts5(
+        full_name, email, roll_number,
+        content='dashboard_student',
+        content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2',
+        prefix='2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER dashboard_student_fts_insert AFTER INSERT ON dashboard_student BEGIN
+        INSERT INTO dashboard_student_fts(rowid, full_name, email, roll_number)
+        VALUES (new.id, new.full_name, new.email, new.roll_number);
+    END
+    """,
+    """
+    CREATE TRIGGER dashboard_student_fts_delete AFTER DELETE ON dashboard_student BEGIN
+        INSERT INTO dashboard_student_fts(dashboard_student_fts, rowid, full_name, email, roll_number)
+        VALUES ('delete', old.id, old.full_name, old.email, old.roll_number);
+    END
+    """,
+    """
+    CREATE TRIGGER dashboard_student_fts_update AFTER UPDATE OF full_name, email, roll_number ON dashboard_student BEGIN
+        INSERT INTO dashboard_student_fts(dashboard_student_fts, rowid, full_name, email, roll_number)
+        VALUES ('delete', old.id, old.full_name, old.email, old.roll_number);
+        INSERT INTO dashboard_student_fts(rowid, full_name, email, roll_number)
+        VALUES (new.id, new.full_name, new.email, new.roll_number);
+    END
+    """,
+    # Index the students that already exist
+    "INSERT INTO dashboard_student_fts(dashboard_student_fts) VALUES ('rebuild')",
+]
+
+DROP_SEARCH_INDEX = [
+    'DROP TRIGGER IF EXISTS dashboard_student_fts_insert',
+    'DROP TRIGGER IF EXISTS dashboard_student_fts_delete',
+    'DROP TRIGGER IF EXISTS dashboard_student_fts_update',
+    'DROP TABLE IF EXISTS dashboard_student_fts',
+]
+
+
+def fts5_available(connection):
+    if connection.vendor != 'sqlite':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA compile_options')
+        return 'ENABLE_FTS5' in {row[0] for row in cursor.fetchall()}
+
+
+def create_search_index(apps, schema_editor):
+    # Other databases, or SQLite builds without FTS5, fall back to plain lookups
+    if not fts5_available(schema_editor.connection):
+        return
+    for statement in CREATE_SEARCH_INDEX:
+        schema_editor.execute(statement)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for statement in DROP_SEARCH_INDEX:
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0006_student_list_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.7 on 2026-10-17 04:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0007_student_search_fts'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='progresssheet',
+            index=models.Index(fields=['exam_type', 'student', 'marks_obtained', 'max_marks'], name='sheet_exam_student_marks_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='progresssheet',
+            index=models.Index(fields=['student', '-exam_date'], name='sheet_student_date_idx'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.7 on 2026-10-17 04:54
+
+import django.db.models.expressions
+import django.db.models.functions.comparison
+import django.db.models.functions.math
+import django.db.models.lookups
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0008_query_pattern_indexes'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='progresssheet',
+            name='percentage',
+        ),
+        migrations.RemoveField(
+            model_name='progresssheet',
+            name='grade',
+        ),
+        migrations.AddField(
+            model_name='progresssheet',
+            name='percentage',
+            field=models.GeneratedField(db_persist=True, expression=django.db.models.functions.math.Round(django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(django.db.models.functions.comparison.Cast('marks_obtained', models.FloatField()), '*', models.Value(100)), '/', models.F('max_marks')), 2), output_field=models.DecimalField(blank=True, decimal_places=2, max_digits=5, null=True)),
+        ),
+        migrations.AddField(
+            model_name='progresssheet',
+            name='grade',
+            field=models.GeneratedField(db_persist=True, expression=models.Case(models.When(max_marks__lte=0, then=models.Value('')), models.When(django.db.models.lookups.GreaterThanOrEqual(django.db.models.expressions.CombinedExpression(models.F('marks_obtained'), '*', models.Value(100)), django.db.models.expressions.CombinedExpression(models.F('max_marks'), '*', models.Value(90))), then=models.Value('A+')), models.When(django.db.models.lookups.GreaterThanOrEqual(django.db.models.expressions.CombinedExpression(models.F('marks_obtained'), '*', models.Value(100)), django.db.models.expressions.CombinedExpression(models.F('max_marks'), '*', models.Value(80))), then=models.Value('A')), models.When(django.db.models.lookups.GreaterThanOrEqual(django.db.models.expressions.CombinedExpression(models.F('marks_obtained'), '*', models.Value(100)), django.db.models.expressions.CombinedExpression(models.F('max_marks'), '*', models.Value(70))), then=models.Value('B+')), models.When(django.db.models.lookups.GreaterThanOrEqual(django.db.models.expressions.CombinedExpression(models.F('marks_obtained'), '*', models.Value(100)), django.db.models.expressions.CombinedExpression(models.F('max_marks'), '*', models.Value(60))), then=models.Value('B')), models.When(django.db.models.lookups.GreaterThanOrEqual(django.db.models.expressions.CombinedExpression(models.F('marks_obtained'), '*', models.Value(100)), django.db.models.expressions.CombinedExpression(models.F('max_marks'), '*', models.Value(50))), then=models.Value('C')), models.When(django.db.models.lookups.GreaterThanOrEqual(django.db.models.expressions.CombinedExpression(models.F('marks_obtained'), '*', models.Value(100)), django.db.models.expressions.CombinedExpression(models.F('max_marks'), '*', models.Value(40))), then=models.Value('D')), default=models.Value('F')), output_field=models.CharField(blank=True, max_length=3)),
+        ),
+        migrations.AddIndex(
+            model_name='progresssheet',
+            index=models.Index(fields=['exam_type', 'subject', 'grade'], name='sheet_exam_subject_grade_idx'),
+        ),
+    ]
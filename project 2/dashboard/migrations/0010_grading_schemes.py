@@ -0,0 +1,99 @@
+# Generated by Django 5.2.7 on 2026-10-17 05:01
+
+import django.core.validators
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Case, F, IntegerField, Value, When
+from django.db.models.functions import Cast, Round
+from django.db.models.lookups import GreaterThanOrEqual
+
+
+DEFAULT_THRESHOLDS = [(90, 'A+'), (80, 'A'), (70, 'B+'), (60, 'B'), (50, 'C'), (40, 'D')]
+
+
+def create_default_scheme(apps, schema_editor):
+    """
+    Store the grade ladder that used to be hard-coded as the catch-all scheme and
+    grade the existing progress sheets with it.
+    """
+    GradingScheme = apps.get_model('dashboard', 'GradingScheme')
+    GradeThreshold = apps.get_model('dashboard', 'GradeThreshold')
+    ProgressSheet = apps.get_model('dashboard', 'ProgressSheet')
+    scheme = GradingScheme.objects.create(name='Default')
+    GradeThreshold.objects.bulk_create(
+        GradeThreshold(scheme=scheme, grade=grade, min_percentage=minimum) for minimum, grade in DEFAULT_THRESHOLDS
+    )
+    # Compared in integer hundredths, like GradeTable.expression(); in floating
+    # point results exactly on a boundary can get the grade below
+    def hundredths(field):
+        return Cast(Round(F(field) * 100), output_field=IntegerField())
+
+    ProgressSheet.objects.update(grade=Case(
+        When(max_marks__lte=0, then=Value('')),
+        *[
+            When(
+                GreaterThanOrEqual(hundredths('marks_obtained') * 10000, hundredths('max_marks') * (minimum * 100)),
+                then=Value(grade)
+            )
+            for minimum, grade in DEFAULT_THRESHOLDS
+        ],
+        default=Value('F')
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0009_generated_percentage_and_grade'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='progresssheet',
+            name='sheet_exam_subject_grade_idx',
+        ),
+        migrations.RemoveField(
+            model_name='progresssheet',
+            name='grade',
+        ),
+        migrations.AddField(
+            model_name='progresssheet',
+            name='grade',
+            field=models.CharField(blank=True, default='', editable=False, max_length=3),
+            preserve_default=False,
+        ),
+        migrations.AddIndex(
+            model_name='progresssheet',
+            index=models.Index(fields=['exam_type', 'subject', 'grade'], name='sheet_exam_subject_grade_idx'),
+        ),
+        migrations.CreateModel(
+            name='GradingScheme',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('class_batch', models.CharField(blank=True, choices=[('FY', 'First Year'), ('SY', 'Second Year'), ('TY', 'Third Year'), ('FYJC', 'First Year Junior College'), ('SYJC', 'Second Year Junior College')], max_length=10)),
+                ('subject', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='grading_schemes', to='dashboard.subject')),
+                ('failing_grade', models.CharField(default='F', help_text='Grade for percentages below every threshold', max_length=3)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['name'],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('subject__isnull', False)), fields=('class_batch', 'subject'), name='grading_scheme_subject_scope'), models.UniqueConstraint(condition=models.Q(('subject__isnull', True)), fields=('class_batch',), name='grading_scheme_class_scope')],
+            },
+        ),
+        migrations.CreateModel(
+            name='GradeThreshold',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scheme', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='thresholds', to='dashboard.gradingscheme')),
+                ('grade', models.CharField(max_length=3)),
+                ('min_percentage', models.DecimalField(decimal_places=2, max_digits=5, validators=[django.core.validators.MinValueValidator(0), django.core.validators.MaxValueValidator(100)])),
+            ],
+            options={
+                'ordering': ['scheme', '-min_percentage'],
+                'unique_together': {('scheme', 'min_percentage')},
+            },
+        ),
+        migrations.RunPython(create_default_scheme, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 5.2.7 on 2026-10-17 05:27
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0010_grading_schemes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedExamResult',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('academic_year', models.PositiveSmallIntegerField(help_text='Calendar year the academic year starts in')),
+                ('exam_type', models.CharField(choices=[('quarterly', 'Quarterly'), ('midterm', 'Midterm'), ('model', 'Model'), ('end_term', 'End Term')], max_length=10)),
+                ('exam_date', models.DateField()),
+                ('total_marks', models.DecimalField(decimal_places=2, default=0, max_digits=7)),
+                ('max_possible_marks', models.DecimalField(decimal_places=2, default=0, max_digits=7)),
+                ('subject_count', models.PositiveIntegerField(default=0)),
+                ('average_percentage', models.DecimalField(blank=True, decimal_places=2, max_digits=5, null=True)),
+                ('rank', models.PositiveIntegerField(blank=True, null=True)),
+                ('archived_at', models.DateTimeField(auto_now=True)),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_exam_results', to='dashboard.student')),
+            ],
+            options={
+                'ordering': ['student', 'exam_date', 'exam_type'],
+                'indexes': [models.Index(fields=['student', 'academic_year'], name='archived_result_student_idx'), models.Index(fields=['academic_year'], name='archived_result_year_idx')],
+                'unique_together': {('student', 'exam_type', 'exam_date')},
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedProgressSheet',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('subject_name', models.CharField(max_length=100)),
+                ('subject_code', models.CharField(max_length=20)),
+                ('academic_year', models.PositiveSmallIntegerField(help_text='Calendar year the academic year starts in')),
+                ('exam_type', models.CharField(choices=[('quarterly', 'Quarterly'), ('midterm', 'Midterm'), ('model', 'Model'), ('end_term', 'End Term')], max_length=10)),
+                ('exam_date', models.DateField()),
+                ('marks_obtained', models.DecimalField(decimal_places=2, max_digits=5)),
+                ('max_marks', models.DecimalField(decimal_places=2, max_digits=5)),
+                ('percentage', models.DecimalField(blank=True, decimal_places=2, max_digits=5, null=True)),
+                ('grade', models.CharField(blank=True, max_length=3)),
+                ('archived_at', models.DateTimeField(auto_now=True)),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_progress_sheets', to='dashboard.student')),
+                ('subject', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='archived_progress_sheets', to='dashboard.subject')),
+            ],
+            options={
+                'ordering': ['student', 'exam_date', 'exam_type', 'subject_name'],
+                'indexes': [models.Index(fields=['student', 'academic_year'], name='archived_sheet_student_idx')],
+                'unique_together': {('student', 'subject', 'exam_type', 'exam_date')},
+            },
+        ),
+    ]
@@ -0,0 +1,94 @@
+from django.db import migrations
+
+
+DEFAULT_THRESHOLDS = [(90, 'A+'), (80, 'A'), (70, 'B+'), (60, 'B'), (50, 'C'), (40, 'D')]
+
+# Marks and max marks of the row `new` in whole hundredths, the marks scaled by
+# a further 100 * 100 to compare with a percentage times the max marks. In
+# floating point, results exactly on a boundary can get the grade below.
+MARKS = 'CAST(ROUND(new.marks_obtained * 100) AS INTEGER) * 10000'
+MAX_MARKS = 'CAST(ROUND(new.max_marks * 100) AS INTEGER)'
+
+DEFAULT_LADDER = '\n            '.join(
+    f"WHEN {MARKS} >= {minimum * 100} * {MAX_MARKS} THEN '{grade}'" for minimum, grade in DEFAULT_THRESHOLDS
+)
+
+# The grade of the row `new` from the most specific grading scheme, with the
+# built-in ladder when no scheme applies. It mirrors dashboard.grading: schemes
+# are tried subject and class/batch first, then subject, class/batch, catch-all,
+# and marks are compared as marks * 100 >= minimum * max_marks.
+GRADE_SQL = f"""
+    CASE WHEN new.max_marks <= 0 THEN '' ELSE COALESCE(
+        (
+            SELECT COALESCE(
+                (
+                    SELECT threshold.grade FROM dashboard_gradethreshold threshold
+                    WHERE threshold.scheme_id = scheme.id
+                      AND {MARKS} >= CAST(ROUND(threshold.min_percentage * 100) AS INTEGER) * {MAX_MARKS}
+                    ORDER BY threshold.min_percentage DESC LIMIT 1
+                ),
+                scheme.failing_grade
+            )
+            FROM dashboard_gradingscheme scheme
+            WHERE (scheme.subject_id = new.subject_id OR scheme.subject_id IS NULL)
+              AND (scheme.class_batch = '' OR scheme.class_batch = (
+                  SELECT class_batch FROM dashboard_student WHERE id = new.student_id
+              ))
+            ORDER BY scheme.subject_id IS NULL, scheme.class_batch = '' LIMIT 1
+        ),
+        CASE
+            {DEFAULT_LADDER}
+            ELSE 'F'
+        END
+    ) END
+"""
+
+# Every write of the marks, including queryset.update() and bulk upserts that
+# skip model signals, regrades the row. The triggers do not fire on writes of
+# grade itself, so regrade() and these updates do not recurse. Altering the
+# progress sheet table in a later migration rebuilds it without triggers; they
+# must then be created again.
+CREATE_GRADE_TRIGGERS = [
+    f"""
+    CREATE TRIGGER dashboard_progresssheet_grade_insert AFTER INSERT ON dashboard_progresssheet BEGIN
+        UPDATE dashboard_progresssheet SET grade = {GRADE_SQL} WHERE id = new.id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER dashboard_progresssheet_grade_update
+    AFTER UPDATE OF marks_obtained, max_marks, student_id, subject_id ON dashboard_progresssheet BEGIN
+        UPDATE dashboard_progresssheet SET grade = {GRADE_SQL} WHERE id = new.id;
+    END
+    """,
+]
+
+DROP_GRADE_TRIGGERS = [
+    'DROP TRIGGER IF EXISTS dashboard_progresssheet_grade_insert',
+    'DROP TRIGGER IF EXISTS dashboard_progresssheet_grade_update',
+]
+
+
+def create_grade_triggers(apps, schema_editor):
+    # Elsewhere grades are kept by the model signals and upserts alone
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for statement in CREATE_GRADE_TRIGGERS:
+        schema_editor.execute(statement)
+
+
+def drop_grade_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for statement in DROP_GRADE_TRIGGERS:
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0011_archive_tables'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_grade_triggers, drop_grade_triggers),
+    ]
@@ -0,0 +1,68 @@
+import unicodedata
+
+import dashboard.models
+from django.db import migrations, models
+
+
+def name_key_field(apps):
+    # The historical model at this point does not have the field yet
+    Student = apps.get_model('dashboard', 'Student')
+    field = models.CharField(default='', editable=False, max_length=400)
+    field.contribute_to_class(Student, 'name_key')
+    return Student, field
+
+
+def add_name_key_column(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        # AddField would rebuild the student table, which the progress sheet grade
+        # triggers refer to, and drop its search index triggers
+        schema_editor.execute(
+            "ALTER TABLE dashboard_student ADD COLUMN name_key varchar(400) NOT NULL DEFAULT ''"
+        )
+    else:
+        schema_editor.add_field(*name_key_field(apps))
+
+
+def remove_name_key_column(apps, schema_editor):
+    schema_editor.remove_field(*name_key_field(apps))
+
+
+def fold_existing_names(apps, schema_editor):
+    Student = apps.get_model('dashboard', 'Student')
+    students = list(Student.objects.only('full_name'))
+    for student in students:
+        student.name_key = unicodedata.normalize('NFKC', student.full_name).casefold()
+    Student.objects.bulk_update(students, ['name_key'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0012_progress_sheet_grade_triggers'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='student',
+            name='student_name_lower_idx',
+        ),
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddField(
+                    model_name='student',
+                    name='name_key',
+                    field=dashboard.models.FoldedCharField(
+                        default='', editable=False, max_length=400, source='full_name'
+                    ),
+                ),
+            ],
+            database_operations=[
+                migrations.RunPython(add_name_key_column, remove_name_key_column),
+            ],
+        ),
+        migrations.RunPython(fold_existing_names, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['name_key', 'roll_number'], name='student_name_key_idx'),
+        ),
+    ]
@@ -1,7 +1,59 @@
+import sys
+import unicodedata
+
+from django.conf import settings
 from django.db import models
+from django.db.models import F, Q
+from django.db.models.functions import Cast, Round
 from django.core.validators import RegexValidator, MinValueValidator, MaxValueValidator
 
 
+def fold_name(value):
+    """
+    Case-insensitive form of a name for prefix matching. Unicode-aware, unlike
+    SQLite's LOWER(), which only lowercases ASCII letters.
+    """
+    return unicodedata.normalize('NFKC', value).casefold()
+
+
+def prefix_upper_bound(prefix):
+    """
+    The smallest string above every string starting with prefix, for matching a
+    prefix as a range, or None when there is none: the prefix is made of U+10FFFF,
+    the last code point, alone.
+    """
+    stem = prefix.rstrip(chr(sys.maxunicode))
+    if not stem:
+        return None
+    following = ord(stem[-1]) + 1
+    if 0xD800 <= following <= 0xDFFF:
+        # Surrogates cannot be stored; the next code point that can follows them
+        following = 0xE000
+    return stem[:-1] + chr(following)
+
+
+class FoldedCharField(models.CharField):
+    """
+    Read-only copy of another field passed through fold_name(), recomputed on
+    every save() and bulk_create().
+    """
+
+    def __init__(self, *args, source=None, **kwargs):
+        self.source = source
+        kwargs.setdefault('editable', False)
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        kwargs['source'] = self.source
+        return name, path, args, kwargs
+
+    def pre_save(self, model_instance, add):
+        value = fold_name(getattr(model_instance, self.source) or '')
+        setattr(model_instance, self.attname, value)
+        return value
+
+
 class Student(models.Model):
     """
     Model representing a student in the system.
@@ -27,14 +79,36 @@ class Student(models.Model):
     ]
     class_batch = models.CharField(max_length=10, choices=CLASS_CHOICES)
     date_of_birth = models.DateField()
+    # full_name folded for case-insensitive prefix search; folding can lengthen it
+    name_key = FoldedCharField(max_length=400, source='full_name', default='')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self._loaded_class_batch = self.class_batch
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the class/batch so a move can be told apart from other edits
+        if 'class_batch' in field_names:
+            instance._loaded_class_batch = values[field_names.index('class_batch')]
+        return instance
+
     def __str__(self):
         return f"{self.full_name} ({self.roll_number})"
     
     class Meta:
         ordering = ['roll_number']
+        indexes = [
+            # Keyset pages of one class/batch in roll number order
+            models.Index(fields=['class_batch', 'roll_number'], name='student_class_roll_idx'),
+            # Case-insensitive name prefix search as a range scan
+            models.Index(fields=['name_key', 'roll_number'], name='student_name_key_idx'),
+            # The latest change, for rebuilding the autocomplete index
+            models.Index(fields=['updated_at'], name='student_updated_at_idx'),
+        ]
 
 
 class Subject(models.Model):
@@ -50,6 +124,73 @@ class Subject(models.Model):
         return self.name
 
 
+# The default grading scheme as (minimum percentage, grade), best grade first;
+# anything lower is an F. Used when no GradingScheme applies.
+GRADE_THRESHOLDS = [
+    (90, 'A+'),
+    (80, 'A'),
+    (70, 'B+'),
+    (60, 'B'),
+    (50, 'C'),
+    (40, 'D'),
+]
+FAILING_GRADE = 'F'
+
+
+class GradingScheme(models.Model):
+    """
+    A grade ladder applying to one class/batch, one subject, both, or (with
+    neither set) to every progress sheet not covered by a narrower scheme.
+    """
+    name = models.CharField(max_length=100)
+    class_batch = models.CharField(max_length=10, choices=Student.CLASS_CHOICES, blank=True)
+    subject = models.ForeignKey(
+        Subject, on_delete=models.CASCADE, related_name='grading_schemes', null=True, blank=True
+    )
+    failing_grade = models.CharField(
+        max_length=3, default=FAILING_GRADE, help_text='Grade for percentages below every threshold'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return self.name
+
+    class Meta:
+        ordering = ['name']
+        constraints = [
+            # One scheme per scope; a NULL subject would not collide in a plain unique index
+            models.UniqueConstraint(
+                fields=['class_batch', 'subject'], condition=Q(subject__isnull=False),
+                name='grading_scheme_subject_scope'
+            ),
+            models.UniqueConstraint(
+                fields=['class_batch'], condition=Q(subject__isnull=True),
+                name='grading_scheme_class_scope'
+            ),
+        ]
+
+
+class GradeThreshold(models.Model):
+    """
+    The lowest percentage that earns a grade within a grading scheme.
+    """
+    scheme = models.ForeignKey(GradingScheme, on_delete=models.CASCADE, related_name='thresholds')
+    grade = models.CharField(max_length=3)
+    min_percentage = models.DecimalField(
+        max_digits=5,
+        decimal_places=2,
+        validators=[MinValueValidator(0), MaxValueValidator(100)]
+    )
+
+    def __str__(self):
+        return f"{self.grade} (from {self.min_percentage}%)"
+
+    class Meta:
+        ordering = ['scheme', '-min_percentage']
+        unique_together = ('scheme', 'min_percentage')
+
+
 class ProgressSheet(models.Model):
     """
     Model representing a student's progress sheet with exam results.
@@ -76,37 +217,45 @@ class ProgressSheet(models.Model):
         decimal_places=2,
         validators=[MinValueValidator(1)]
     )
-    percentage = models.DecimalField(
-        max_digits=5, 
-        decimal_places=2,
-        validators=[MinValueValidator(0), MaxValueValidator(100)],
-        blank=True,
-        null=True
+    # Computed and stored by the database on every write, including bulk_create()
+    # and queryset.update(), so it is always in step with the marks and can be
+    # filtered, sorted and indexed
+    percentage = models.GeneratedField(
+        expression=Round(Cast('marks_obtained', models.FloatField()) * 100 / F('max_marks'), 2),
+        output_field=models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True),
+        db_persist=True
     )
-    grade = models.CharField(max_length=3, blank=True)
+    # Set from the applicable GradingScheme on every write of the marks by database
+    # triggers (migration 0012), so queryset.update() and bulk writes keep it
+    # correct too; see dashboard.grading
+    grade = models.CharField(max_length=3, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     def save(self, *args, **kwargs):
-        # Calculate percentage if marks are provided
-        if self.max_marks and self.marks_obtained is not None:
-            self.percentage = (self.marks_obtained / self.max_marks) * 100
-            # Calculate grade based on percentage
-            if self.percentage >= 90:
-                self.grade = 'A+'
-            elif self.percentage >= 80:
-                self.grade = 'A'
-            elif self.percentage >= 70:
-                self.grade = 'B+'
-            elif self.percentage >= 60:
-                self.grade = 'B'
-            elif self.percentage >= 50:
-                self.grade = 'C'
-            elif self.percentage >= 40:
-                self.grade = 'D'
-            else:
-                self.grade = 'F'
+        updating = not self._state.adding
         super().save(*args, **kwargs)
+        self._loaded_values = self._tracked_values()
+        if updating:
+            # An UPDATE does not return the regenerated percentage; drop the
+            # stale value so it is reloaded when next read
+            self.__dict__.pop('percentage', None)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember what was loaded so derived tables can be updated from the change
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    def _tracked_values(self):
+        return {
+            'student_id': self.student_id,
+            'exam_type': self.exam_type,
+            'exam_date': self.exam_date,
+            'marks_obtained': self.marks_obtained,
+            'max_marks': self.max_marks,
+        }
 
     def __str__(self):
         return f"{self.student.full_name} - {self.subject.name} - {self.get_exam_type_display()}"
@@ -114,6 +263,18 @@ class ProgressSheet(models.Model):
     class Meta:
         unique_together = ('student', 'subject', 'exam_type', 'exam_date')
         ordering = ['student', 'subject', 'exam_date', 'exam_type']
+        indexes = [
+            # Rankings aggregate one exam type per student; the marks columns make
+            # the index covering, so the table itself is never read
+            models.Index(
+                fields=['exam_type', 'student', 'marks_obtained', 'max_marks'],
+                name='sheet_exam_student_marks_idx'
+            ),
+            # A student's sheets, newest exam first
+            models.Index(fields=['student', '-exam_date'], name='sheet_student_date_idx'),
+            # Grade distributions count one exam type per subject and grade
+            models.Index(fields=['exam_type', 'subject', 'grade'], name='sheet_exam_subject_grade_idx'),
+        ]
 
 
 class ExamResult(models.Model):
@@ -148,4 +309,205 @@ class ExamResult(models.Model):
 
     class Meta:
         unique_together = ('student', 'exam_type', 'exam_date')
-        ordering = ['student', 'exam_date', 'exam_type']
\ No newline at end of file
+        ordering = ['student', 'exam_date', 'exam_type']
+
+
+class RankedResult(models.Model):
+    """
+    Abstract aggregate of a student's marks within a ranking cohort, with the
+    student's stored rank in that cohort. Subclasses list the fields that make up
+    the cohort in cohort_fields.
+    """
+    total_marks = models.DecimalField(max_digits=9, decimal_places=2, default=0)
+    max_marks = models.DecimalField(max_digits=9, decimal_places=2, default=0)
+    subject_count = models.PositiveIntegerField(default=0)
+    average_percentage = models.DecimalField(
+        max_digits=5,
+        decimal_places=2,
+        validators=[MinValueValidator(0), MaxValueValidator(100)]
+    )
+    rank = models.PositiveIntegerField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    cohort_fields = ()
+
+    class Meta:
+        abstract = True
+
+    def cohort(self):
+        return {field: getattr(self, field) for field in self.cohort_fields}
+
+
+class StudentRanking(RankedResult):
+    """
+    Materialized ranking of a student within an exam type, maintained incrementally
+    from ProgressSheet writes so the ranking page is a single indexed read.
+    """
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='rankings')
+    exam_type = models.CharField(max_length=10, choices=ProgressSheet.EXAM_TYPE_CHOICES)
+
+    cohort_fields = ('exam_type',)
+
+    def __str__(self):
+        return f"{self.student.full_name} - {self.get_exam_type_display()} - #{self.rank}"
+
+    class Meta:
+        unique_together = ('student', 'exam_type')
+        ordering = ['exam_type', 'rank']
+        indexes = [
+            models.Index(fields=['exam_type', 'rank'], name='ranking_exam_type_rank_idx'),
+            models.Index(
+                fields=['exam_type', '-average_percentage', 'student'],
+                name='ranking_exam_type_avg_idx'
+            ),
+        ]
+
+
+class RankHistory(RankedResult):
+    """
+    A student's rank among everyone who sat a given exam (exam type and exam date),
+    kept up to date alongside StudentRanking so rank movement across exams can be
+    read in one query.
+    """
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='rank_history')
+    exam_type = models.CharField(max_length=10, choices=ProgressSheet.EXAM_TYPE_CHOICES)
+    exam_date = models.DateField()
+
+    cohort_fields = ('exam_type', 'exam_date')
+
+    def __str__(self):
+        return f"{self.student.full_name} - {self.get_exam_type_display()} {self.exam_date} - #{self.rank}"
+
+    class Meta:
+        unique_together = ('student', 'exam_type', 'exam_date')
+        ordering = ['student', 'exam_date', 'exam_type']
+        verbose_name_plural = 'rank history'
+        indexes = [
+            models.Index(
+                fields=['exam_type', 'exam_date', '-average_percentage', 'student'],
+                name='rank_history_cohort_avg_idx'
+            ),
+        ]
+
+
+class ArchivedProgressSheet(models.Model):
+    """
+    A progress sheet moved out of ProgressSheet by academic-year archival. It is
+    kept as it was: the percentage and grade are no longer recomputed, and the
+    subject's name and code survive the subject being deleted.
+    """
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='archived_progress_sheets')
+    subject = models.ForeignKey(
+        Subject, on_delete=models.SET_NULL, related_name='archived_progress_sheets', null=True, blank=True
+    )
+    subject_name = models.CharField(max_length=100)
+    subject_code = models.CharField(max_length=20)
+    academic_year = models.PositiveSmallIntegerField(help_text='Calendar year the academic year starts in')
+    exam_type = models.CharField(max_length=10, choices=ProgressSheet.EXAM_TYPE_CHOICES)
+    exam_date = models.DateField()
+    marks_obtained = models.DecimalField(max_digits=5, decimal_places=2)
+    max_marks = models.DecimalField(max_digits=5, decimal_places=2)
+    percentage = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True)
+    grade = models.CharField(max_length=3, blank=True)
+    archived_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.student.full_name} - {self.subject_name} - {self.get_exam_type_display()} {self.exam_date}"
+
+    class Meta:
+        unique_together = ('student', 'subject', 'exam_type', 'exam_date')
+        ordering = ['student', 'exam_date', 'exam_type', 'subject_name']
+        indexes = [
+            # A student's sheets for one archived year
+            models.Index(fields=['student', 'academic_year'], name='archived_sheet_student_idx'),
+        ]
+
+
+class ArchivedExamResult(models.Model):
+    """
+    A student's totals for an archived exam sitting, with the rank they held
+    among everyone who sat it when it was archived.
+    """
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='archived_exam_results')
+    academic_year = models.PositiveSmallIntegerField(help_text='Calendar year the academic year starts in')
+    exam_type = models.CharField(max_length=10, choices=ProgressSheet.EXAM_TYPE_CHOICES)
+    exam_date = models.DateField()
+    total_marks = models.DecimalField(max_digits=7, decimal_places=2, default=0)
+    max_possible_marks = models.DecimalField(max_digits=7, decimal_places=2, default=0)
+    subject_count = models.PositiveIntegerField(default=0)
+    average_percentage = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True)
+    rank = models.PositiveIntegerField(null=True, blank=True)
+    archived_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.student.full_name} - {self.get_exam_type_display()} {self.exam_date} - {self.average_percentage}%"
+
+    class Meta:
+        unique_together = ('student', 'exam_type', 'exam_date')
+        ordering = ['student', 'exam_date', 'exam_type']
+        indexes = [
+            models.Index(fields=['student', 'academic_year'], name='archived_result_student_idx'),
+            # Which academic years have been archived
+            models.Index(fields=['academic_year'], name='archived_result_year_idx'),
+        ]
+
+
+class Job(models.Model):
+    """
+    A long-running task (import, ranking rebuild, report generation) queued in the
+    database and run by the run_jobs worker instead of inside a web request.
+    """
+    STATUS_QUEUED = 'queued'
+    STATUS_RUNNING = 'running'
+    STATUS_SUCCEEDED = 'succeeded'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, 'Queued'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_SUCCEEDED, 'Succeeded'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    kind = models.CharField(max_length=50)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_QUEUED)
+    payload = models.JSONField(default=dict, blank=True)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    progress = models.PositiveIntegerField(default=0)
+    total = models.PositiveIntegerField(null=True, blank=True)
+    attempts = models.PositiveIntegerField(default=0)
+    run_after = models.DateTimeField(auto_now_add=True)
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='jobs'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    # Last sign of life from the worker running the job; see jobs.requeue_stale_jobs
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    @property
+    def is_finished(self):
+        return self.status in (self.STATUS_SUCCEEDED, self.STATUS_FAILED)
+
+    @property
+    def percent(self):
+        if self.status == self.STATUS_SUCCEEDED:
+            return 100
+        if not self.total:
+            return None
+        return min(100, self.progress * 100 // self.total)
+
+    def __str__(self):
+        return f"{self.kind} #{self.pk} - {self.get_status_display()}"
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            # The worker claims the oldest runnable queued job
+            models.Index(fields=['status', 'run_after'], name='job_status_run_after_idx'),
+        ]
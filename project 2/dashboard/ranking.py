@@ -0,0 +1,510 @@
+from decimal import Decimal
+
+from django.db import connections, router, transaction
+from django.db.models import Case, Count, Exists, F, FloatField, IntegerField, OuterRef, Sum, When, Window
+from django.db.models.functions import Cast, DenseRank, Lag, Rank, Round
+
+from .caching import bump_ranking_version_on_commit
+from .database import delete_rows
+from .models import GRADE_THRESHOLDS, ProgressSheet, RankHistory, Student, StudentRanking
+
+
+RANKING_PAGE_SIZE = 50
+# Students whose ranking rows refresh_cohort_rankings() re-sums per statement
+COHORT_REFRESH_BATCH_SIZE = 500
+LEADERBOARD_SIZE = 10
+GRADES = [grade for _, grade in GRADE_THRESHOLDS] + ['F']
+
+
+def average_percentage_expression(marks='progress_sheets__marks_obtained', max_marks='progress_sheets__max_marks'):
+    """
+    Expression computing sum(marks) / sum(max_marks) * 100, rounded to 2 places.
+    """
+    return Round(
+        Cast(Sum(marks), FloatField()) * 100 / Cast(Sum(max_marks), FloatField()),
+        2
+    )
+
+
+def ranked_students(exam_type):
+    """
+    Queryset of students who have marks for the given exam type, annotated with
+    total_marks, max_marks, subject_count, average_percentage and rank.
+
+    Everything is computed by the database in a single aggregated query, with
+    RANK() applied over the aggregates, so tied students share a rank.
+    """
+    average = average_percentage_expression()
+    return (
+        Student.objects
+        .filter(progress_sheets__exam_type=exam_type)
+        .annotate(
+            total_marks=Sum('progress_sheets__marks_obtained'),
+            max_marks=Sum('progress_sheets__max_marks'),
+            subject_count=Count('progress_sheets'),
+            average_percentage=average,
+        )
+        .filter(max_marks__gt=0)
+        .annotate(
+            rank=Window(expression=Rank(), order_by=F('average_percentage').desc()),
+        )
+        .order_by('rank', 'roll_number')
+    )
+
+
+def student_rankings(exam_type):
+    """
+    Return the ranking rows for an exam type in the shape the ranking template uses.
+
+    Query count: exactly one query, regardless of how many students or progress
+    sheets exist.
+    """
+    return [
+        {
+            'student': student,
+            'total_marks': student.total_marks,
+            'max_marks': student.max_marks,
+            'average_percentage': student.average_percentage,
+            'subject_count': student.subject_count,
+            'rank': student.rank,
+        }
+        for student in ranked_students(exam_type)
+    ]
+
+
+def _as_percentage(value):
+    return Decimal(str(value)).quantize(Decimal('0.01'))
+
+
+def refresh_ranked_row(model, student_id, **cohort):
+    """
+    Bring a student's RankedResult row (StudentRanking or RankHistory) for one
+    cohort in line with the progress sheets in that cohort.
+
+    Only the changed student's own progress sheets are aggregated, and only the
+    students it overtakes or falls behind have their stored rank shifted, found
+    through the cohort's average_percentage index. That saves re-aggregating the
+    whole cohort, but a write is still O(cohort) in the worst case: the rank is
+    a count of the rows scored above the student, and a new student shifts every
+    row scored below it.
+    """
+    with transaction.atomic():
+        totals = ProgressSheet.objects.filter(student_id=student_id, **cohort).aggregate(
+            marks_total=Sum('marks_obtained'),
+            max_marks_total=Sum('max_marks'),
+            sheet_count=Count('id'),
+            average=average_percentage_expression('marks_obtained', 'max_marks'),
+        )
+        rows = model.objects.filter(**cohort)
+        row = rows.filter(student_id=student_id).first()
+
+        if not totals['max_marks_total']:
+            if row is not None:
+                remove_ranked_row(row)
+            return None
+
+        new = _as_percentage(totals['average'])
+        others = rows.exclude(student_id=student_id)
+        if row is None:
+            others.filter(average_percentage__lt=new).update(rank=F('rank') + 1)
+            row = model(student_id=student_id, **cohort)
+        elif new > row.average_percentage:
+            others.filter(
+                average_percentage__gte=row.average_percentage,
+                average_percentage__lt=new
+            ).update(rank=F('rank') + 1)
+        elif new < row.average_percentage:
+            others.filter(
+                average_percentage__gte=new,
+                average_percentage__lt=row.average_percentage
+            ).update(rank=F('rank') - 1)
+
+        row.total_marks = totals['marks_total']
+        row.max_marks = totals['max_marks_total']
+        row.subject_count = totals['sheet_count']
+        row.average_percentage = new
+        row.rank = others.filter(average_percentage__gt=new).count() + 1
+        row.save()
+        return row
+
+
+def remove_ranked_row(row):
+    """
+    Delete a RankedResult row and move every student ranked below it in the
+    same cohort up by one place.
+    """
+    model = type(row)
+    with transaction.atomic():
+        deleted, _ = model.objects.filter(pk=row.pk).delete()
+        if deleted:
+            model.objects.filter(
+                average_percentage__lt=row.average_percentage,
+                **row.cohort()
+            ).update(rank=F('rank') - 1)
+
+
+def refresh_student_ranking(student_id, exam_type):
+    """
+    Refresh a student's StudentRanking row for an exam type.
+    """
+    return refresh_ranked_row(StudentRanking, student_id, exam_type=exam_type)
+
+
+def refresh_rank_history(student_id, exam_type, exam_date):
+    """
+    Refresh a student's RankHistory row for one sitting of an exam.
+    """
+    return refresh_ranked_row(RankHistory, student_id, exam_type=exam_type, exam_date=exam_date)
+
+
+def refresh_rankings(keys):
+    """
+    Incrementally refresh StudentRanking and RankHistory for an iterable of
+    (student_id, exam_type, exam_date) sittings, and invalidate the cached
+    rankings of their exam types.
+    """
+    keys = set(keys)
+    for student_id, exam_type in {(student_id, exam_type) for student_id, exam_type, _ in keys}:
+        refresh_student_ranking(student_id, exam_type)
+    for student_id, exam_type, exam_date in keys:
+        refresh_rank_history(student_id, exam_type, exam_date)
+    bump_ranking_version_on_commit(*(exam_type for _, exam_type, _ in keys))
+
+
+def _resum_ranked_rows(model, student_ids, **scope):
+    """
+    Re-sum the `model` rows (StudentRanking or RankHistory) of some students
+    within `scope` from their progress sheets with one upsert, and delete the
+    rows left without marks. Ranks are left for _rerank() to fix.
+    """
+    group_by = [field for field in model.cohort_fields if field != 'exam_type']
+    sheets = ProgressSheet.objects.filter(student_id__in=student_ids, **scope)
+    totals = (
+        sheets.values('student_id', 'exam_type', *group_by)
+        .annotate(
+            marks_total=Sum('marks_obtained'),
+            max_marks_total=Sum('max_marks'),
+            sheet_count=Count('id'),
+            average=average_percentage_expression('marks_obtained', 'max_marks'),
+        )
+        .filter(max_marks_total__gt=0)
+        .order_by()
+    )
+    model.objects.bulk_create(
+        [
+            model(
+                student_id=row['student_id'],
+                **{field: row[field] for field in model.cohort_fields},
+                total_marks=row['marks_total'],
+                max_marks=row['max_marks_total'],
+                subject_count=row['sheet_count'],
+                average_percentage=_as_percentage(row['average']),
+                rank=0,
+            )
+            for row in totals
+        ],
+        batch_size=500,
+        update_conflicts=True,
+        unique_fields=['student', *model.cohort_fields],
+        update_fields=['total_marks', 'max_marks', 'subject_count', 'average_percentage', 'updated_at'],
+    )
+    marked = ProgressSheet.objects.filter(
+        max_marks__gt=0, student_id=OuterRef('student_id'), **{field: OuterRef(field) for field in model.cohort_fields}
+    )
+    delete_rows(model.objects.filter(student_id__in=student_ids, **scope).filter(~Exists(marked)))
+
+
+def _rerank(model, partition_by=(), **cohort):
+    """
+    Recompute the stored ranks of a cohort of `model` rows with one
+    UPDATE ... FROM over a RANK() window of their stored averages. Only rows
+    whose rank changed are written.
+    """
+    database = router.db_for_write(model)
+    connection = connections[database]
+    ranked = model.objects.filter(**cohort).annotate(
+        new_rank=Window(
+            expression=Rank(),
+            partition_by=[F(field) for field in partition_by] or None,
+            order_by=F('average_percentage').desc(),
+        )
+    ).values('new_rank', ranked_id=F('pk'))
+    select, params = ranked.query.get_compiler(database).as_sql()
+    quote = connection.ops.quote_name
+    table, pk, rank = quote(model._meta.db_table), quote(model._meta.pk.column), quote('rank')
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'UPDATE {table} SET {rank} = ranked.new_rank FROM ({select}) AS ranked '
+            f'WHERE {table}.{pk} = ranked.ranked_id AND {table}.{rank} <> ranked.new_rank',
+            params
+        )
+
+
+def refresh_cohort_rankings(keys, batch_size=COHORT_REFRESH_BATCH_SIZE):
+    """
+    Set-based counterpart of refresh_rankings() for writes touching many
+    students: re-sum the affected students' StudentRanking and RankHistory rows
+    batch_size students at a time, then re-rank each affected cohort with one
+    windowed UPDATE. Progress sheets of students the write did not touch are
+    never read, unlike rebuild_rankings().
+    """
+    exam_dates = {}
+    for _, exam_type, exam_date in keys:
+        exam_dates.setdefault(exam_type, set()).add(exam_date)
+    student_ids = sorted({student_id for student_id, _, _ in keys})
+
+    with transaction.atomic():
+        for exam_type, dates in exam_dates.items():
+            for start in range(0, len(student_ids), batch_size):
+                batch = student_ids[start:start + batch_size]
+                _resum_ranked_rows(StudentRanking, batch, exam_type=exam_type)
+                _resum_ranked_rows(RankHistory, batch, exam_type=exam_type, exam_date__in=dates)
+            _rerank(StudentRanking, exam_type=exam_type)
+            _rerank(RankHistory, ['exam_date'], exam_type=exam_type, exam_date__in=dates)
+        bump_ranking_version_on_commit(*exam_dates)
+
+
+def ranked_exam_sittings(exam_type):
+    """
+    Per (student, exam_date) aggregates for an exam type, ranked within each
+    exam_date. One query; rows are dicts.
+    """
+    return (
+        ProgressSheet.objects
+        .filter(exam_type=exam_type)
+        .values('student_id', 'exam_date')
+        .annotate(
+            total_marks=Sum('marks_obtained'),
+            max_possible_marks=Sum('max_marks'),
+            subject_count=Count('id'),
+            average_percentage=average_percentage_expression('marks_obtained', 'max_marks'),
+        )
+        .filter(max_possible_marks__gt=0)
+        .annotate(
+            rank=Window(expression=Rank(), partition_by=F('exam_date'), order_by=F('average_percentage').desc()),
+        )
+        .order_by('exam_date', 'rank')
+    )
+
+
+def rebuild_rankings(exam_types=None):
+    """
+    Recompute the StudentRanking and RankHistory tables from scratch for the
+    given exam types (all of them by default). Returns the number of rows written.
+    """
+    if exam_types is None:
+        exam_types = [choice[0] for choice in ProgressSheet.EXAM_TYPE_CHOICES]
+
+    written = 0
+    with transaction.atomic():
+        for exam_type in exam_types:
+            StudentRanking.objects.filter(exam_type=exam_type).delete()
+            rows = [
+                StudentRanking(
+                    student=student,
+                    exam_type=exam_type,
+                    total_marks=student.total_marks,
+                    max_marks=student.max_marks,
+                    subject_count=student.subject_count,
+                    average_percentage=_as_percentage(student.average_percentage),
+                    rank=student.rank,
+                )
+                for student in ranked_students(exam_type).iterator(chunk_size=2000)
+            ]
+            StudentRanking.objects.bulk_create(rows, batch_size=500)
+            written += len(rows)
+
+            RankHistory.objects.filter(exam_type=exam_type).delete()
+            rows = [
+                RankHistory(
+                    student_id=sitting['student_id'],
+                    exam_type=exam_type,
+                    exam_date=sitting['exam_date'],
+                    total_marks=sitting['total_marks'],
+                    max_marks=sitting['max_possible_marks'],
+                    subject_count=sitting['subject_count'],
+                    average_percentage=_as_percentage(sitting['average_percentage']),
+                    rank=sitting['rank'],
+                )
+                for sitting in ranked_exam_sittings(exam_type).iterator(chunk_size=2000)
+            ]
+            RankHistory.objects.bulk_create(rows, batch_size=500)
+            written += len(rows)
+        bump_ranking_version_on_commit(*exam_types)
+    return written
+
+
+def rank_movement(student_id):
+    """
+    A student's RankHistory in exam order, each row annotated with
+    previous_rank (the rank in the student's preceding exam, or None).
+
+    The delta is computed by a LAG() window in the same single query.
+    """
+    exam_order = Case(
+        *[When(exam_type=value, then=position) for position, (value, _) in enumerate(ProgressSheet.EXAM_TYPE_CHOICES)],
+        output_field=IntegerField()
+    )
+    return (
+        RankHistory.objects
+        .filter(student_id=student_id)
+        .annotate(
+            exam_order=exam_order,
+            previous_rank=Window(expression=Lag('rank'), order_by=[F('exam_date').asc(), exam_order.asc()]),
+        )
+        .order_by('exam_date', 'exam_order')
+    )
+
+
+def encode_ranking_cursor(row):
+    """
+    Cursor pointing just past a ranking row in (average_percentage desc, student id) order.
+    """
+    return f'{row.average_percentage}_{row.student_id}'
+
+
+def decode_ranking_cursor(cursor):
+    """
+    Inverse of encode_ranking_cursor. Raises ValueError for malformed cursors.
+    """
+    average, _, student_id = cursor.partition('_')
+    try:
+        average = Decimal(average)
+    except ArithmeticError:
+        raise ValueError(f'Invalid ranking cursor: {cursor!r}')
+    # NaN, sNaN and Infinity parse but cannot be compared with a percentage
+    if not average.is_finite():
+        raise ValueError(f'Invalid ranking cursor: {cursor!r}')
+    student_id = int(student_id)
+    # Ids beyond a signed 64-bit integer cannot be passed to the database
+    if not -2 ** 63 <= student_id < 2 ** 63:
+        raise ValueError(f'Invalid ranking cursor: {cursor!r}')
+    return average, student_id
+
+
+def ranking_page(exam_type, cursor=None, page_size=RANKING_PAGE_SIZE):
+    """
+    Return (rows, next_cursor) for one page of the ranking of an exam type.
+
+    Pages are addressed by a keyset cursor over (average_percentage, student id)
+    rather than an offset, so every page is an index range scan of page_size + 1
+    rows no matter how deep into the ranking it is. next_cursor is None on the
+    last page.
+    """
+    rows = StudentRanking.objects.filter(exam_type=exam_type).select_related('student').order_by(
+        '-average_percentage', 'student_id'
+    )
+    if cursor:
+        average, student_id = decode_ranking_cursor(cursor)
+        rows = rows.filter(average_percentage__lte=average).exclude(
+            average_percentage=average,
+            student_id__lte=student_id
+        )
+
+    rows = list(rows[:page_size + 1])
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        return rows, encode_ranking_cursor(rows[-1])
+    return rows, None
+
+
+def top_rankings(exam_type, k=10):
+    """
+    The k best ranked students for an exam type, read straight off the index.
+    """
+    rows, _ = ranking_page(exam_type, page_size=k)
+    return rows
+
+
+def _partitioned_ranks(partition_by, order_by):
+    """
+    Competition (1, 2, 2, 4) and dense (1, 2, 2, 3) rank within each partition.
+    """
+    return {
+        'competition_rank': Window(expression=Rank(), partition_by=partition_by, order_by=order_by),
+        'dense_rank': Window(expression=DenseRank(), partition_by=partition_by, order_by=order_by),
+    }
+
+
+def class_batch_leaderboard(exam_type, class_batch=None, limit=LEADERBOARD_SIZE):
+    """
+    StudentRanking rows for an exam type ranked within each Student.class_batch,
+    keeping the top `limit` places of every batch (ties can make a batch longer).
+
+    Each row is annotated with class_batch, competition_rank and dense_rank. One query.
+    """
+    rows = StudentRanking.objects.filter(exam_type=exam_type)
+    if class_batch:
+        rows = rows.filter(student__class_batch=class_batch)
+    return (
+        rows
+        .select_related('student')
+        .annotate(
+            class_batch=F('student__class_batch'),
+            **_partitioned_ranks(F('student__class_batch'), F('average_percentage').desc())
+        )
+        .filter(competition_rank__lte=limit)
+        .order_by('class_batch', 'competition_rank', 'student__roll_number')
+    )
+
+
+def subject_leaderboard(exam_type, subject_id=None, limit=LEADERBOARD_SIZE):
+    """
+    Per-subject results for an exam type ranked within each Subject, keeping the
+    top `limit` places of every subject (ties can make a subject longer).
+
+    Marks from several exam dates of the same exam type are combined. Rows are
+    dicts with the subject and student columns, total_marks, max_possible_marks,
+    average_percentage, competition_rank and dense_rank. One query.
+    """
+    sheets = ProgressSheet.objects.filter(exam_type=exam_type)
+    if subject_id:
+        sheets = sheets.filter(subject_id=subject_id)
+    return (
+        sheets
+        .values(
+            'subject_id', 'subject__name',
+            'student_id', 'student__full_name', 'student__roll_number', 'student__class_batch',
+        )
+        .annotate(
+            total_marks=Sum('marks_obtained'),
+            max_possible_marks=Sum('max_marks'),
+            average_percentage=average_percentage_expression('marks_obtained', 'max_marks'),
+        )
+        .filter(max_possible_marks__gt=0)
+        .annotate(**_partitioned_ranks(F('subject_id'), F('average_percentage').desc()))
+        .filter(competition_rank__lte=limit)
+        .order_by('subject__name', 'subject_id', 'competition_rank', 'student__roll_number')
+    )
+
+
+def grade_distribution(exam_type, subject_id=None):
+    """
+    How many progress sheets of an exam type fall in each grade, per subject.
+
+    Returns a list of {'subject': name, 'counts': [...], 'total': n} ordered by
+    subject name, with counts in GRADES order. The grade is a stored column, so
+    this is a single GROUP BY over the (exam_type, subject, grade) index.
+    """
+    sheets = ProgressSheet.objects.filter(exam_type=exam_type)
+    if subject_id:
+        sheets = sheets.filter(subject_id=subject_id)
+    rows = (
+        sheets
+        .values('subject_id', 'subject__name', 'grade')
+        .annotate(count=Count('pk'))
+        .order_by('subject__name', 'subject_id')
+    )
+    distribution = {}
+    for row in rows:
+        entry = distribution.setdefault(row['subject_id'], {
+            'subject': row['subject__name'],
+            'counts': dict.fromkeys(GRADES, 0),
+            'total': 0,
+        })
+        if row['grade'] in entry['counts']:
+            entry['counts'][row['grade']] = row['count']
+        entry['total'] += row['count']
+    for entry in distribution.values():
+        entry['counts'] = list(entry['counts'].values())
+    return list(distribution.values())
@@ -0,0 +1,143 @@
+import os
+import sqlite3
+import tempfile
+import time
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import Count, Max, Q
+
+from .models import Job
+
+
+REPORTING_DATABASE = 'reporting'
+
+# Session key holding when the user last submitted a change
+LAST_WRITE_SESSION_KEY = 'last_write_at'
+
+
+def snapshot_path():
+    return getattr(settings, 'REPORTING_SNAPSHOT_PATH', None)
+
+
+def snapshot_taken_at():
+    """
+    When the reporting snapshot was taken, as a timestamp, or None if there is none.
+    The snapshot file's modification time is set to when the copy started.
+    """
+    path = snapshot_path()
+    if not path or REPORTING_DATABASE not in settings.DATABASES:
+        return None
+    try:
+        return os.stat(path).st_mtime
+    except FileNotFoundError:
+        return None
+
+
+def refresh_snapshot():
+    """
+    Copy the default database into the reporting snapshot with SQLite's online
+    backup API and return when the copy started.
+
+    The copy is a single backup step, which reads the source in one read
+    transaction, so in WAL mode mark entry carries on while it runs. It is
+    written to a temporary file next to the snapshot and moved into place once
+    complete, so a crash mid-copy never leaves a partial snapshot behind and
+    readers are not blocked while it runs. Readers switch to the new file on
+    their next reporting request; see reopen_replaced_snapshot().
+    """
+    path = snapshot_path()
+    if not path:
+        raise ValueError('settings.REPORTING_SNAPSHOT_PATH is not set.')
+    source = connections['default']
+    source.ensure_connection()
+
+    started = time.time()
+    descriptor, temporary_path = tempfile.mkstemp(
+        dir=os.path.dirname(os.path.abspath(path)), prefix='.reporting-', suffix='.sqlite3'
+    )
+    os.close(descriptor)
+    try:
+        target = sqlite3.connect(temporary_path, timeout=source.settings_dict['OPTIONS'].get('timeout', 5))
+        try:
+            source.connection.backup(target)
+            # The copy inherits WAL mode from the source; a read-only connection
+            # cannot open a WAL database that has no -shm file next to it
+            target.execute('PRAGMA journal_mode = DELETE')
+        finally:
+            target.close()
+        os.utime(temporary_path, (started, started))
+        os.replace(temporary_path, path)
+    except BaseException:
+        os.unlink(temporary_path)
+        raise
+    return started
+
+
+def reopen_replaced_snapshot():
+    """
+    Close the reporting connection if the snapshot file was replaced since it
+    was opened. A connection kept open across requests (CONN_MAX_AGE) would
+    otherwise go on reading the copy it opened.
+    """
+    try:
+        inode = os.stat(snapshot_path()).st_ino
+    except FileNotFoundError:
+        return
+    connection = connections[REPORTING_DATABASE]
+    if connection.connection is not None and getattr(connection, 'snapshot_inode', None) != inode:
+        connection.close()
+    if connection.connection is None:
+        # Noted before the connection opens: if the file is replaced in between,
+        # the next request reopens it once more
+        connection.snapshot_inode = inode
+
+
+def record_write(request):
+    """
+    Note that the user has just changed data, so their reads skip any snapshot
+    taken before now.
+    """
+    request.session[LAST_WRITE_SESSION_KEY] = time.time()
+
+
+def last_job_write(user):
+    """
+    When the user's background jobs last changed data, as a timestamp: now while
+    one of them is running, otherwise when the latest of them finished. None if
+    they have no finished or running jobs.
+
+    A job such as a marks import writes after the request that queued it, so the
+    session's write time alone would let a snapshot taken before the job
+    finished hide its changes.
+    """
+    jobs = Job.objects.using('default').filter(created_by=user).aggregate(
+        running=Count('pk', filter=Q(status=Job.STATUS_RUNNING)),
+        finished_at=Max('finished_at'),
+    )
+    if jobs['running']:
+        return time.time()
+    return jobs['finished_at'].timestamp() if jobs['finished_at'] else None
+
+
+def snapshot_usable(request):
+    """
+    Whether the request can read from the reporting snapshot: there is one, it is
+    fresh enough, and it was taken after the user's last change, including the
+    changes made by their background jobs.
+    """
+    taken_at = snapshot_taken_at()
+    if taken_at is None:
+        return False
+    if time.time() - taken_at > getattr(settings, 'REPORTING_SNAPSHOT_MAX_AGE', 15 * 60):
+        return False
+    session = getattr(request, 'session', None)
+    last_write = session.get(LAST_WRITE_SESSION_KEY) if session is not None else None
+    if last_write is not None and last_write >= taken_at:
+        return False
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        job_write = last_job_write(user)
+        if job_write is not None and job_write >= taken_at:
+            return False
+    return True
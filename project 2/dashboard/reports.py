@@ -0,0 +1,159 @@
+import multiprocessing
+import os
+import time
+import zipfile
+from collections import defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.db import connections
+from django.template.loader import get_template
+
+from .models import ExamResult, ProgressSheet, Student
+
+
+# Students whose data is fetched and rendered together as one unit of work
+REPORT_CARD_BATCH_SIZE = 200
+
+EXAM_TYPE_LABELS = dict(ProgressSheet.EXAM_TYPE_CHOICES)
+
+
+def report_card_batches(class_batch=None, batch_size=REPORT_CARD_BATCH_SIZE):
+    """
+    Yield lists of report card data, one dict per student, built from two bulk
+    queries per batch of students instead of queries per student.
+    """
+    students = Student.objects.order_by('roll_number').values('id', 'full_name', 'roll_number', 'class_batch')
+    if class_batch:
+        students = students.filter(class_batch=class_batch)
+    class_labels = dict(Student.CLASS_CHOICES)
+
+    batch = []
+    for student in students.iterator(chunk_size=batch_size):
+        batch.append(student)
+        if len(batch) == batch_size:
+            yield _report_card_data(batch, class_labels)
+            batch = []
+    if batch:
+        yield _report_card_data(batch, class_labels)
+
+
+def _report_card_data(students, class_labels):
+    student_ids = [student['id'] for student in students]
+
+    sittings = defaultdict(dict)
+    for sheet in ProgressSheet.objects.filter(student_id__in=student_ids).order_by(
+        'student_id', 'exam_date', 'exam_type', 'subject__name'
+    ).values(
+        'student_id', 'exam_type', 'exam_date', 'subject__name',
+        'marks_obtained', 'max_marks', 'percentage', 'grade'
+    ):
+        key = (sheet['exam_type'], sheet['exam_date'])
+        sitting = sittings[sheet['student_id']].setdefault(key, {
+            'exam_type': EXAM_TYPE_LABELS.get(sheet['exam_type'], sheet['exam_type']),
+            'exam_date': sheet['exam_date'],
+            'subjects': [],
+            'result': None,
+        })
+        sitting['subjects'].append(sheet)
+
+    for result in ExamResult.objects.filter(student_id__in=student_ids).values(
+        'student_id', 'exam_type', 'exam_date', 'total_marks', 'max_possible_marks', 'average_percentage'
+    ):
+        sitting = sittings[result['student_id']].get((result['exam_type'], result['exam_date']))
+        if sitting is not None:
+            sitting['result'] = result
+
+    return [
+        {
+            'student': student,
+            'class_label': class_labels.get(student['class_batch'], student['class_batch']),
+            'sittings': list(sittings[student['id']].values()),
+        }
+        for student in students
+    ]
+
+
+def render_report_cards(cards):
+    """
+    Render a batch of report cards to (file name, HTML) pairs. Runs in worker
+    processes, so it only uses the data it is given.
+    """
+    template = get_template('dashboard/report_card.html')
+    return [(f"{card['student']['roll_number']}.html", template.render(card)) for card in cards]
+
+
+def report_card_workers(workers=None):
+    """
+    The number of rendering processes to use: as many as asked for, at most
+    REPORT_CARD_WORKERS, which is also the default.
+    """
+    limit = getattr(settings, 'REPORT_CARD_WORKERS', None) or min(4, os.cpu_count() or 1)
+    return min(workers or limit, limit)
+
+
+def _ready():
+    return True
+
+
+class _ZipStream:
+    """
+    Write-only, unseekable file object that hands what zipfile writes to the
+    caller in pieces, so an archive can be streamed while it is built.
+    """
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def take(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def report_card_archive(class_batch=None, workers=None, progress=None):
+    """
+    Yield a zip archive of HTML report cards, one per student, as byte chunks.
+
+    Batches are rendered across a pool of worker processes while the next
+    batches are fetched; only a few batches are in flight at a time, so memory
+    stays bounded however many students there are. If given, progress is
+    called with the number of cards written so far and the elapsed seconds.
+    """
+    workers = report_card_workers(workers)
+    started = time.monotonic()
+    written = 0
+    stream = _ZipStream()
+
+    # Workers are forked from this process and never query the database. A fork
+    # pool starts every worker on its first task, so run one and wait for it
+    # before the student query opens a cursor the workers would otherwise inherit
+    connections.close_all()
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('fork')) as pool, \
+            zipfile.ZipFile(stream, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        pool.submit(_ready).result()
+        pending = deque()
+        batches = report_card_batches(class_batch)
+        while True:
+            for cards in batches:
+                pending.append(pool.submit(render_report_cards, cards))
+                if len(pending) >= workers * 2:
+                    break
+            if not pending:
+                break
+            rendered = pending.popleft().result()
+            for name, html in rendered:
+                archive.writestr(name, html)
+            written += len(rendered)
+            if progress is not None:
+                progress(written, time.monotonic() - started)
+            yield stream.take()
+    # The archive's central directory is written when it is closed
+    yield stream.take()
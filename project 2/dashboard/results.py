@@ -0,0 +1,302 @@
+from decimal import Decimal
+from functools import reduce
+from operator import or_
+
+from django.db import transaction
+from django.db.models import Exists, F, FloatField, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Cast, NullIf, Round
+from django.utils import timezone
+
+from .caching import bump_ranking_version_on_commit
+from .database import delete_rows
+from .models import ExamResult, ProgressSheet
+from .ranking import average_percentage_expression
+
+
+REPAIR_BATCH_SIZE = 500
+
+_CENT = Decimal('0.01')
+
+# Correlates a progress sheet subquery with the ExamResult of the same sitting
+_SITTING = {
+    'student_id': OuterRef('student_id'),
+    'exam_type': OuterRef('exam_type'),
+    'exam_date': OuterRef('exam_date'),
+}
+
+
+def _quantize(value):
+    return None if value is None else Decimal(str(value)).quantize(_CENT)
+
+
+def recompute_exam_result(student_id, exam_type, exam_date):
+    """
+    Rebuild one ExamResult from its progress sheets, deleting it if none are left.
+    """
+    with transaction.atomic():
+        totals = ProgressSheet.objects.filter(
+            student_id=student_id, exam_type=exam_type, exam_date=exam_date
+        ).aggregate(
+            marks_total=Sum('marks_obtained'),
+            max_marks_total=Sum('max_marks'),
+            average=average_percentage_expression('marks_obtained', 'max_marks'),
+        )
+        results = ExamResult.objects.filter(student_id=student_id, exam_type=exam_type, exam_date=exam_date)
+        if not totals['max_marks_total']:
+            results.delete()
+            return None
+        result, _ = ExamResult.objects.update_or_create(
+            student_id=student_id,
+            exam_type=exam_type,
+            exam_date=exam_date,
+            defaults={
+                'total_marks': totals['marks_total'],
+                'max_possible_marks': totals['max_marks_total'],
+                'average_percentage': _quantize(totals['average']),
+            }
+        )
+        return result
+
+
+def apply_exam_result_delta(student_id, exam_type, exam_date, marks_delta, max_marks_delta):
+    """
+    Add a change in marks to the running totals of one ExamResult.
+
+    The totals and the average are updated in place by a single UPDATE rather
+    than re-summed from the progress sheets. A missing row is rebuilt from the
+    sheets instead, and a row whose max marks drop to zero is removed.
+    """
+    if not marks_delta and not max_marks_delta:
+        return
+    with transaction.atomic():
+        results = ExamResult.objects.filter(student_id=student_id, exam_type=exam_type, exam_date=exam_date)
+        total_marks = F('total_marks') + marks_delta
+        max_possible_marks = F('max_possible_marks') + max_marks_delta
+        updated = results.update(
+            total_marks=total_marks,
+            max_possible_marks=max_possible_marks,
+            average_percentage=Round(
+                Cast(total_marks, FloatField()) * 100 / NullIf(Cast(max_possible_marks, FloatField()), 0),
+                2
+            ),
+            updated_at=timezone.now(),
+        )
+        if not updated:
+            recompute_exam_result(student_id, exam_type, exam_date)
+        elif max_marks_delta < 0:
+            results.filter(max_possible_marks__lte=0).delete()
+
+
+def _sitting_totals(sheets):
+    """
+    ExamResult column values summed by correlated subqueries over `sheets`, a
+    progress sheet queryset filtered with _SITTING, for a set-based UPDATE.
+    """
+    def total(**aggregate):
+        name, = aggregate
+        return Subquery(sheets.order_by().values('student_id').annotate(**aggregate).values(name)[:1])
+
+    return {
+        'total_marks': total(total=Sum('marks_obtained')),
+        'max_possible_marks': total(total=Sum('max_marks')),
+        'average_percentage': total(average=average_percentage_expression('marks_obtained', 'max_marks')),
+        'updated_at': timezone.now(),
+    }
+
+
+def remove_from_exam_results(condition):
+    """
+    Take the progress sheets matching `condition` (a Q about to be deleted) out of
+    the ExamResults of their sittings, set-based: one DELETE for sittings left
+    without other sheets and one UPDATE re-summing the rest from their other
+    sheets. Neither sends signals, so the ranking versions of the affected exam
+    types are bumped once at the end. Returns (updated, deleted) counts.
+    """
+    removed = ProgressSheet.objects.filter(condition, **_SITTING)
+    remaining = ProgressSheet.objects.filter(**_SITTING).exclude(condition)
+
+    with transaction.atomic():
+        affected = ExamResult.objects.filter(Exists(removed))
+        exam_types = list(affected.order_by().values_list('exam_type', flat=True).distinct())
+        deleted = delete_rows(affected.filter(~Exists(remaining.filter(max_marks__gt=0))))
+        updated = affected.update(**_sitting_totals(remaining))
+        bump_ranking_version_on_commit(*exam_types)
+    return updated, deleted
+
+
+def refresh_exam_results(keys, batch_size=REPAIR_BATCH_SIZE):
+    """
+    Bring the ExamResults of (student_id, exam_type, exam_date) sittings in line
+    with their progress sheets, batch_size sittings at a time. Each batch is one
+    UPDATE re-summing the stored results, one DELETE of results left without
+    marks and one INSERT of the missing ones, so nothing outside the batch is
+    read and no row is loaded to be updated.
+    """
+    keys = sorted(set(keys))
+    for start in range(0, len(keys), batch_size):
+        batch = keys[start:start + batch_size]
+        # A superset of the batch's sittings at worst, which are refreshed too
+        scope = Q(student_id__in={student_id for student_id, _, _ in batch}) & reduce(or_, (
+            Q(exam_type=exam_type, exam_date=exam_date)
+            for exam_type, exam_date in {(exam_type, exam_date) for _, exam_type, exam_date in batch}
+        ))
+        sheets = ProgressSheet.objects.filter(max_marks__gt=0, **_SITTING)
+        with transaction.atomic():
+            results = ExamResult.objects.filter(scope)
+            delete_rows(results.filter(~Exists(sheets)))
+            results.filter(Exists(sheets)).update(**_sitting_totals(sheets))
+            missing = (
+                ProgressSheet.objects.filter(scope)
+                .filter(~Exists(ExamResult.objects.filter(**_SITTING)))
+                .values('student_id', 'exam_type', 'exam_date')
+                .annotate(
+                    total_marks=Sum('marks_obtained'),
+                    max_possible_marks=Sum('max_marks'),
+                    average_percentage=average_percentage_expression('marks_obtained', 'max_marks'),
+                )
+                .filter(max_possible_marks__gt=0)
+                .order_by()
+            )
+            ExamResult.objects.bulk_create(
+                [ExamResult(**dict(row, average_percentage=_quantize(row['average_percentage']))) for row in missing],
+                batch_size=batch_size,
+            )
+            bump_ranking_version_on_commit(*{exam_type for _, exam_type, _ in batch})
+
+
+def apply_progress_sheet_change(old, new):
+    """
+    Update ExamResult for a progress sheet going from `old` to `new`, each a
+    dict of ProgressSheet._tracked_values() or None for a created/deleted sheet.
+
+    Marks are taken as Decimal: a sheet assigned an int or float before saving
+    keeps that value on the instance, and float minus Decimal is a TypeError.
+    """
+    def key(values):
+        return values['student_id'], values['exam_type'], values['exam_date']
+
+    def marks(values):
+        return _quantize(values['marks_obtained']), _quantize(values['max_marks'])
+
+    if old and new and key(old) == key(new):
+        (old_marks, old_max_marks), (new_marks, new_max_marks) = marks(old), marks(new)
+        apply_exam_result_delta(*key(new), new_marks - old_marks, new_max_marks - old_max_marks)
+        return
+    if old:
+        old_marks, old_max_marks = marks(old)
+        apply_exam_result_delta(*key(old), -old_marks, -old_max_marks)
+    if new:
+        apply_exam_result_delta(*key(new), *marks(new))
+
+
+def _expected_exam_results(student_ids=None):
+    sheets = ProgressSheet.objects.all()
+    if student_ids is not None:
+        sheets = sheets.filter(student_id__in=student_ids)
+    return (
+        sheets
+        .values('student_id', 'exam_type', 'exam_date')
+        .annotate(
+            total_marks=Sum('marks_obtained'),
+            max_possible_marks=Sum('max_marks'),
+            average_percentage=average_percentage_expression('marks_obtained', 'max_marks'),
+        )
+        .filter(max_possible_marks__gt=0)
+        .order_by('student_id', 'exam_type', 'exam_date')
+        .iterator(chunk_size=2000)
+    )
+
+
+def _stored_exam_results(student_ids=None):
+    results = ExamResult.objects.all()
+    if student_ids is not None:
+        results = results.filter(student_id__in=student_ids)
+    return (
+        results
+        .values('id', 'student_id', 'exam_type', 'exam_date', 'total_marks', 'max_possible_marks', 'average_percentage')
+        .order_by('student_id', 'exam_type', 'exam_date')
+        .iterator(chunk_size=2000)
+    )
+
+
+def find_exam_result_drift(student_ids=None):
+    """
+    Yield (expected, stored) pairs for every ExamResult that does not match its
+    progress sheets. expected is None for a result with no sheets left and
+    stored is None for a missing result.
+
+    Both sides are streamed in key order and merge-joined, so memory use does not
+    grow with the number of results.
+    """
+    def key(row):
+        return row['student_id'], row['exam_type'], row['exam_date']
+
+    expected_rows = _expected_exam_results(student_ids)
+    stored_rows = _stored_exam_results(student_ids)
+    expected = next(expected_rows, None)
+    stored = next(stored_rows, None)
+    while expected is not None or stored is not None:
+        if stored is None or (expected is not None and key(expected) < key(stored)):
+            yield expected, None
+            expected = next(expected_rows, None)
+        elif expected is None or key(stored) < key(expected):
+            yield None, stored
+            stored = next(stored_rows, None)
+        else:
+            if (
+                _quantize(expected['total_marks']) != _quantize(stored['total_marks'])
+                or _quantize(expected['max_possible_marks']) != _quantize(stored['max_possible_marks'])
+                or _quantize(expected['average_percentage']) != _quantize(stored['average_percentage'])
+            ):
+                yield expected, stored
+            expected = next(expected_rows, None)
+            stored = next(stored_rows, None)
+
+
+def repair_exam_results(drift, batch_size=REPAIR_BATCH_SIZE):
+    """
+    Apply the (expected, stored) pairs from find_exam_result_drift in batches of
+    set-based writes. Returns (created, updated, deleted) counts.
+    """
+    # Collect the drift before writing so the streamed reads never see our own writes
+    drift = list(drift)
+    created = updated = deleted = 0
+    to_create, to_update, to_delete = [], [], []
+
+    def flush():
+        with transaction.atomic():
+            ExamResult.objects.bulk_create(to_create)
+            ExamResult.objects.bulk_update(
+                to_update, ['total_marks', 'max_possible_marks', 'average_percentage', 'updated_at']
+            )
+            ExamResult.objects.filter(id__in=to_delete).delete()
+        to_create.clear()
+        to_update.clear()
+        to_delete.clear()
+
+    now = timezone.now()
+    for expected, stored in drift:
+        if expected is None:
+            to_delete.append(stored['id'])
+            deleted += 1
+        else:
+            result = ExamResult(
+                id=stored['id'] if stored else None,
+                student_id=expected['student_id'],
+                exam_type=expected['exam_type'],
+                exam_date=expected['exam_date'],
+                total_marks=expected['total_marks'],
+                max_possible_marks=expected['max_possible_marks'],
+                average_percentage=_quantize(expected['average_percentage']),
+                updated_at=now,
+            )
+            if stored:
+                to_update.append(result)
+                updated += 1
+            else:
+                to_create.append(result)
+                created += 1
+        if len(to_create) + len(to_update) + len(to_delete) >= batch_size:
+            flush()
+    flush()
+    return created, updated, deleted
@@ -0,0 +1,78 @@
+from contextvars import ContextVar
+from functools import wraps
+
+from .replica import REPORTING_DATABASE, reopen_replaced_snapshot, snapshot_taken_at, snapshot_usable
+
+
+# Database the current reporting view reads from; None outside reporting views
+_read_database = ContextVar('read_database', default=None)
+
+
+class ReportingRouter:
+    """
+    Sends reads made inside reporting views to the database the view picked,
+    usually the reporting snapshot. Writes always go to the default database and
+    the snapshot is never migrated: it is a copy of the default database.
+    """
+
+    def db_for_read(self, model, **hints):
+        return _read_database.get()
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        if {obj1._state.db, obj2._state.db} <= {'default', REPORTING_DATABASE}:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db == REPORTING_DATABASE:
+            return False
+        return None
+
+
+def read_source():
+    """
+    Label for where the current reads come from, for keeping cached results
+    from the snapshot apart from ones read from the live database.
+    """
+    if _read_database.get() == REPORTING_DATABASE:
+        return f'snapshot@{snapshot_taken_at()}'
+    return 'default'
+
+
+def _iterate_reading_from(database, iterator):
+    # A streamed response is consumed after the view returns, so the database
+    # is set again around each chunk
+    iterator = iter(iterator)
+    while True:
+        token = _read_database.set(database)
+        try:
+            chunk = next(iterator)
+        except StopIteration:
+            return
+        finally:
+            _read_database.reset(token)
+        yield chunk
+
+
+def reporting_view(view):
+    """
+    Run a read-only view against the reporting snapshot when it is fresh and was
+    taken after the user's last change, and against the default database otherwise.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        database = REPORTING_DATABASE if snapshot_usable(request) else 'default'
+        if database == REPORTING_DATABASE:
+            reopen_replaced_snapshot()
+        token = _read_database.set(database)
+        try:
+            response = view(request, *args, **kwargs)
+        finally:
+            _read_database.reset(token)
+        if response.streaming:
+            response.streaming_content = _iterate_reading_from(database, response.streaming_content)
+        return response
+    return wrapper
@@ -0,0 +1,135 @@
+import re
+from bisect import bisect_left
+
+from django.db import connection
+from django.db.models import Max, Q
+
+from .models import Student
+
+
+SEARCH_RESULT_LIMIT = 20
+
+AUTOCOMPLETE_LIMIT = 10
+
+# Created by migration 0007 on SQLite builds with FTS5
+STUDENT_SEARCH_TABLE = 'dashboard_student_fts'
+
+_SEARCH_TERM = re.compile(r'\w+')
+
+
+def student_search_index_available():
+    return connection.vendor == 'sqlite' and STUDENT_SEARCH_TABLE in connection.introspection.table_names()
+
+
+def _match_expression(query):
+    """
+    FTS5 query matching every word of the search as a prefix, e.g. "ash ku"
+    becomes "ash"* "ku"*. Punctuation is dropped, so user input can never be
+    read as FTS5 query syntax.
+    """
+    return ' '.join(f'"{term}"*' for term in _SEARCH_TERM.findall(query))
+
+
+def search_students(query, limit=SEARCH_RESULT_LIMIT):
+    """
+    Students whose name, email or roll number contain words starting with each
+    word of the query, best matches first.
+
+    Uses the FTS5 index where it exists and falls back to a (slower) prefix
+    match on the plain columns elsewhere.
+    """
+    expression = _match_expression(query)
+    if not expression:
+        return []
+
+    if not student_search_index_available():
+        students = Student.objects.all()
+        for term in _SEARCH_TERM.findall(query):
+            students = students.filter(
+                Q(full_name__istartswith=term)
+                | Q(full_name__icontains=f' {term}')
+                | Q(email__istartswith=term)
+                | Q(roll_number__istartswith=term)
+            )
+        return list(students[:limit])
+
+    with connection.cursor() as cursor:
+        # Every match is scored so the best ones are never cut off; FTS5 keeps only
+        # the top `limit` while sorting
+        cursor.execute(
+            f'SELECT rowid FROM {STUDENT_SEARCH_TABLE} WHERE {STUDENT_SEARCH_TABLE} MATCH %s ORDER BY rank LIMIT %s',
+            [expression, limit]
+        )
+        ids = [row[0] for row in cursor.fetchall()]
+    students = Student.objects.in_bulk(ids)
+    return [students[student_id] for student_id in ids if student_id in students]
+
+
+class StudentPrefixIndex:
+    """
+    Sorted in-memory index of lowercased roll numbers and name suffixes
+    ("asha kumar", "kumar") for prefix lookups by bisection.
+    """
+
+    def __init__(self, students):
+        self.labels = {}
+        keys = []
+        for student_id, roll_number, full_name in students:
+            self.labels[student_id] = f'{full_name} ({roll_number})'
+            keys.append((roll_number.lower(), student_id))
+            words = full_name.lower().split()
+            for start in range(len(words)):
+                keys.append((' '.join(words[start:]), student_id))
+        keys.sort()
+        self.keys = keys
+
+    def search(self, prefix, limit=AUTOCOMPLETE_LIMIT):
+        """
+        (student id, label) for up to limit students with a roll number or name
+        word starting with prefix, in key order.
+        """
+        prefix = ' '.join(prefix.lower().split())
+        if not prefix:
+            return []
+        results = []
+        seen = set()
+        position = bisect_left(self.keys, (prefix,))
+        while position < len(self.keys) and len(results) < limit:
+            key, student_id = self.keys[position]
+            if not key.startswith(prefix):
+                break
+            if student_id not in seen:
+                seen.add(student_id)
+                results.append((student_id, self.labels[student_id]))
+            position += 1
+        return results
+
+
+def student_roster_version():
+    """
+    (student count, latest updated_at), read from the database so every process
+    sees changes made by any other. Adding or deleting a student changes the
+    count; saving one, including through bulk_create, moves updated_at.
+    """
+    students = Student.objects.order_by()
+    return students.count(), students.aggregate(latest=Max('updated_at'))['latest']
+
+
+# (roster version, index) for this process
+_prefix_index = (None, None)
+
+
+def student_prefix_index():
+    """
+    The process's StudentPrefixIndex, rebuilt from the database only after the
+    roster has changed.
+    """
+    global _prefix_index
+    version = student_roster_version()
+    built_for, index = _prefix_index
+    if built_for != version or index is None:
+        index = StudentPrefixIndex(
+            Student.objects.order_by().values_list('id', 'roll_number', 'full_name').iterator(chunk_size=5000)
+        )
+        _prefix_index = (version, index)
+    return index
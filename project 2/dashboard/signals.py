@@ -0,0 +1,98 @@
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from .caching import bump_grading_version_on_commit, bump_ranking_version_on_commit
+from .grading import assign_grades, grading_schemes, regrade
+from .models import ExamResult, GradeThreshold, GradingScheme, ProgressSheet, Student, Subject
+from .ranking import refresh_rankings, remove_ranked_row
+from .results import apply_progress_sheet_change, recompute_exam_result
+
+
+def _exam_keys(instance):
+    """
+    (student_id, exam_type, exam_date) sittings affected by a progress sheet write,
+    including the one the sheet was loaded with if it has since been moved.
+    """
+    keys = {(instance.student_id, instance.exam_type, instance.exam_date)}
+    loaded = getattr(instance, '_loaded_values', None) or {}
+    if all(field in loaded for field in ('student_id', 'exam_type', 'exam_date')):
+        keys.add((loaded['student_id'], loaded['exam_type'], loaded['exam_date']))
+    return keys
+
+
+def _loaded_values(instance):
+    loaded = getattr(instance, '_loaded_values', None) or {}
+    tracked = instance._tracked_values()
+    if all(field in loaded for field in tracked):
+        return {field: loaded[field] for field in tracked}
+    return None
+
+
+@receiver(pre_save, sender=ProgressSheet)
+def progress_sheet_grading(sender, instance, raw=False, **kwargs):
+    if not raw:
+        assign_grades([instance])
+
+
+@receiver(post_save, sender=ProgressSheet)
+def progress_sheet_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    old = _loaded_values(instance)
+    if created or old is not None:
+        apply_progress_sheet_change(old, instance._tracked_values())
+    else:
+        # Saved over an existing row without knowing its previous marks
+        recompute_exam_result(instance.student_id, instance.exam_type, instance.exam_date)
+    refresh_rankings(_exam_keys(instance))
+
+
+@receiver(post_delete, sender=ProgressSheet)
+def progress_sheet_deleted(sender, instance, **kwargs):
+    apply_progress_sheet_change(_loaded_values(instance) or instance._tracked_values(), None)
+    refresh_rankings(_exam_keys(instance))
+
+
+@receiver(post_save, sender=ExamResult)
+@receiver(post_delete, sender=ExamResult)
+def exam_result_changed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        bump_ranking_version_on_commit(instance.exam_type)
+
+
+@receiver(pre_delete, sender=Student)
+def student_deleting(sender, instance, **kwargs):
+    # Close the gaps before the cascade removes the rows without signals
+    rows = [*instance.rankings.all(), *instance.rank_history.all()]
+    for row in rows:
+        remove_ranked_row(row)
+    bump_ranking_version_on_commit(*(row.exam_type for row in rows))
+
+
+@receiver(post_save, sender=Student)
+@receiver(post_save, sender=Subject)
+def ranking_labels_changed(sender, instance, raw=False, **kwargs):
+    # Leaderboards are partitioned by class/batch and labelled by subject name
+    if not raw:
+        bump_ranking_version_on_commit(*(choice[0] for choice in ProgressSheet.EXAM_TYPE_CHOICES))
+
+
+@receiver(post_save, sender=Student)
+def student_class_batch_grading(sender, instance, created, raw=False, **kwargs):
+    # A move to another class/batch can put the student's sheets under another
+    # scheme; other edits leave the grades alone
+    if raw or created:
+        return
+    moved = getattr(instance, '_loaded_class_batch', None) != instance.class_batch
+    if moved and grading_schemes().by_class_batch:
+        regrade(student_ids=[instance.id])
+
+
+@receiver(post_save, sender=GradingScheme)
+@receiver(post_delete, sender=GradingScheme)
+@receiver(post_save, sender=GradeThreshold)
+@receiver(post_delete, sender=GradeThreshold)
+def grading_scheme_changed(sender, instance, raw=False, **kwargs):
+    # Reload the grade tables on next use; existing grades are rewritten by regrade()
+    if not raw:
+        bump_grading_version_on_commit()
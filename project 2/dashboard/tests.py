@@ -1,3 +1,1673 @@
-from django.test import TestCase
+import csv
+import datetime
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+import zipfile
+from unittest import mock
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.core.cache.backends.base import memcache_key_warnings
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.db import OperationalError, connection, connections
+from django.db.models.signals import post_delete
+from django.test import TestCase, TransactionTestCase
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from auth_module.models import CustomUser
+from .archive import academic_year, archive_academic_years
+from .bulk import upsert_progress_sheets
+from .caching import cached_ranking, ranking_cache_key
+from .database import apply_sqlite_profile
+from .forms import BulkProgressSheetForm, StudentAutocompleteWidget
+from .deletion import delete_students, delete_subjects
+from .grading import regrade
+from .importers import import_progress_sheets
+from .jobs import (
+    JOB_HANDLERS, JOB_LEASE_TIMEOUT, JOB_MAX_ATTEMPTS, claim_next_job, heartbeat_jobs, requeue_stale_jobs, run_job,
+)
+from .models import (
+    ArchivedExamResult, ArchivedProgressSheet, ExamResult, GradeThreshold, GradingScheme, Job, ProgressSheet,
+    RankHistory, Student, StudentRanking, Subject, prefix_upper_bound,
+)
+from .ranking import (
+    GRADES, class_batch_leaderboard, decode_ranking_cursor, grade_distribution, rank_movement, rebuild_rankings,
+    student_rankings, subject_leaderboard,
+)
+from .replica import refresh_snapshot
+from .reports import report_card_archive, report_card_batches, report_card_workers
+from .results import find_exam_result_drift
+from .search import StudentPrefixIndex, search_students, student_prefix_index, student_search_index_available
+
+
+@unittest.skipUnless(connection.vendor == 'sqlite', 'Query plans are checked with SQLite EXPLAIN QUERY PLAN')
+class QueryPlanTests(TestCase):
+    """
+    Every query the main dashboard views run must reach the larger tables through
+    an index, never by scanning them in full.
+    """
+    GUARDED_TABLES = {
+        'dashboard_student',
+        'dashboard_progresssheet',
+        'dashboard_examresult',
+        'dashboard_studentranking',
+        'dashboard_rankhistory',
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(
+            email='staff@example.com', username='staff', password='password', is_staff=True
+        )
+        cls.subjects = [Subject.objects.create(name=f'Subject {i}', code=f'SUB{i}') for i in range(4)]
+        cls.students = [
+            Student.objects.create(
+                full_name=f'Student {i}',
+                email=f'student{i}@example.com',
+                roll_number=f'R{i:04d}',
+                class_batch='FY' if i % 2 else 'SY',
+                date_of_birth=datetime.date(2005, 1, 1)
+            )
+            for i in range(30)
+        ]
+        upsert_progress_sheets(
+            ProgressSheet(
+                student=student,
+                subject=subject,
+                exam_type=exam_type,
+                exam_date=exam_date,
+                marks_obtained=Decimal((student.id * 7 + subject.id * 3) % 100),
+                max_marks=Decimal(100)
+            )
+            for student in cls.students
+            for subject in cls.subjects
+            for exam_type, exam_date in [
+                ('quarterly', datetime.date(2025, 1, 10)),
+                ('quarterly', datetime.date(2025, 4, 10)),
+                ('midterm', datetime.date(2025, 6, 10)),
+            ]
+        )
+
+    def setUp(self):
+        # Cached rankings would hide the queries under test
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def full_scans(self, url, data=None):
+        """
+        (query, plan line) for each full scan of a guarded table while serving url.
+        """
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, data)
+        self.assertEqual(response.status_code, 200)
+
+        scans = []
+        with connection.cursor() as cursor:
+            for query in queries.captured_queries:
+                if not query['sql'].startswith('SELECT'):
+                    continue
+                cursor.execute(f"EXPLAIN QUERY PLAN {query['sql']}")
+                for row in cursor.fetchall():
+                    detail = row[-1].split()
+                    if detail[0] == 'SCAN' and detail[1] in self.GUARDED_TABLES:
+                        scans.append((query['sql'], row[-1]))
+        return scans
+
+    def assertNoFullScans(self, url, data=None):
+        self.assertEqual(self.full_scans(url, data), [])
+
+    def test_student_ranking(self):
+        self.assertNoFullScans(reverse('dashboard:student_ranking'), {'exam_type': 'quarterly'})
+
+    def test_student_ranking_next_page(self):
+        self.assertNoFullScans(reverse('dashboard:student_ranking'), {'exam_type': 'quarterly', 'after': '50.00_3'})
+
+    def test_leaderboards(self):
+        url = reverse('dashboard:leaderboard')
+        self.assertNoFullScans(url, {'exam_type': 'quarterly'})
+        self.assertNoFullScans(url, {'exam_type': 'quarterly', 'group': 'FY'})
+        self.assertNoFullScans(url, {'exam_type': 'quarterly', 'partition': 'subject'})
+        self.assertNoFullScans(url, {'exam_type': 'quarterly', 'partition': 'subject', 'group': self.subjects[0].id})
+
+    def test_progress_sheet_list(self):
+        self.assertNoFullScans(reverse('dashboard:progress_sheet_list', args=[self.students[0].id]))
+
+    def test_rank_history(self):
+        self.assertNoFullScans(reverse('dashboard:rank_history', args=[self.students[0].id]))
+
+    def test_mark_entry_grid(self):
+        self.assertNoFullScans(reverse('dashboard:mark_entry_grid'), {
+            'class_batch': 'FY', 'exam_type': 'quarterly', 'exam_date': '2025-01-10'
+        })
+
+    def test_student_list_filters(self):
+        url = reverse('dashboard:student_list')
+        self.assertNoFullScans(url, {'after': 'R0010'})
+        self.assertNoFullScans(url, {'class_batch': 'FY'})
+        self.assertNoFullScans(url, {'name': 'stud'})
+
+    def test_full_scans_are_detected(self):
+        # Guard against the check silently passing: the admin dashboard counts rows
+        self.assertTrue(self.full_scans(reverse('dashboard:admin_dashboard')))
+
+
+class GradingTests(TestCase):
+    """
+    Grades follow the most specific grading scheme on every write path, and
+    regrade() rewrites them with one UPDATE per scheme.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = Student.objects.create(
+            full_name='Student', email='student@example.com', roll_number='R0001',
+            class_batch='FY', date_of_birth=datetime.date(2005, 1, 1)
+        )
+        cls.other_student = Student.objects.create(
+            full_name='Other Student', email='other@example.com', roll_number='R0002',
+            class_batch='SY', date_of_birth=datetime.date(2005, 1, 1)
+        )
+        cls.subject = Subject.objects.create(name='Subject', code='SUB')
+        cls.other_subject = Subject.objects.create(name='Other Subject', code='OTH')
+
+    def setUp(self):
+        # Grade tables cached by other tests must not leak in
+        cache.clear()
+
+    def create_sheet(self, marks, max_marks=100, student=None, subject=None):
+        return ProgressSheet.objects.create(
+            student=student or self.student, subject=subject or self.subject, exam_type='quarterly',
+            exam_date=datetime.date(2025, 1, 10), marks_obtained=Decimal(marks), max_marks=Decimal(max_marks)
+        )
+
+    def create_scheme(self, name, thresholds, **scope):
+        scheme = GradingScheme.objects.create(name=name, **scope)
+        GradeThreshold.objects.bulk_create(
+            GradeThreshold(scheme=scheme, grade=grade, min_percentage=minimum) for minimum, grade in thresholds
+        )
+        return scheme
+
+    def test_grade_boundaries(self):
+        sheet = self.create_sheet(0)
+        for marks, max_marks, grade in [
+            ('45', '50', 'A+'), ('89.99', '100', 'A'), ('70', '100', 'B+'), ('18', '30', 'B'),
+            ('50', '100', 'C'), ('39.99', '100', 'F'), ('40', '100', 'D'), ('0', '100', 'F'),
+            # Exactly on a boundary, but not in binary floating point
+            ('0.99', '1.10', 'A+'), ('1.16', '1.45', 'A'), ('1.14', '1.90', 'B'), ('0.98', '1.40', 'B+'),
+        ]:
+            # queryset.update() skips save() and the signals; the database grades the row
+            ProgressSheet.objects.filter(pk=sheet.pk).update(marks_obtained=Decimal(marks), max_marks=Decimal(max_marks))
+            sheet.refresh_from_db()
+            self.assertEqual(sheet.grade, grade, (marks, max_marks))
+            self.assertEqual(sheet.percentage, (Decimal(marks) * 100 / Decimal(max_marks)).quantize(Decimal('0.01')))
+            sheet.marks_obtained, sheet.max_marks = Decimal(marks), Decimal(max_marks)
+            sheet.save()
+            self.assertEqual(sheet.grade, grade, (marks, max_marks))
+            # The SQL used by regrade() agrees with the Python lookup
+            ProgressSheet.objects.filter(pk=sheet.pk).update(grade='')
+            regrade()
+            sheet.refresh_from_db()
+            self.assertEqual(sheet.grade, grade, (marks, max_marks))
+
+    @unittest.skipUnless(connection.vendor == 'sqlite', 'The database grades rows with SQLite triggers')
+    def test_triggers_exist_after_migrating(self):
+        # A later migration that rebuilds either table would silently drop them
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT tbl_name, name FROM sqlite_master WHERE type = 'trigger'")
+            triggers = set(cursor.fetchall())
+        self.assertLessEqual({
+            ('dashboard_progresssheet', 'dashboard_progresssheet_grade_insert'),
+            ('dashboard_progresssheet', 'dashboard_progresssheet_grade_update'),
+        }, triggers)
+        if student_search_index_available():
+            self.assertLessEqual({
+                ('dashboard_student', 'dashboard_student_fts_insert'),
+                ('dashboard_student', 'dashboard_student_fts_delete'),
+                ('dashboard_student', 'dashboard_student_fts_update'),
+            }, triggers)
+
+    def test_save_and_upsert(self):
+        sheet = self.create_sheet('81')
+        self.assertEqual((sheet.percentage, sheet.grade), (Decimal('81.00'), 'A'))
+
+        sheet.marks_obtained = Decimal('92')
+        sheet.save()
+        self.assertEqual((sheet.percentage, sheet.grade), (Decimal('92.00'), 'A+'))
+
+        upsert_progress_sheets([ProgressSheet(
+            student=self.student, subject=self.subject, exam_type='quarterly',
+            exam_date=datetime.date(2025, 1, 10), marks_obtained=Decimal('33'), max_marks=Decimal(100)
+        )])
+        sheet.refresh_from_db()
+        self.assertEqual((sheet.percentage, sheet.grade), (Decimal('33.00'), 'F'))
+        self.assertEqual(grade_distribution('quarterly'), [
+            {'subject': 'Subject', 'counts': [int(grade == 'F') for grade in GRADES], 'total': 1}
+        ])
+
+    def test_most_specific_scheme_applies(self):
+        sheets = [
+            self.create_sheet('55', student=student, subject=subject)
+            for student in (self.student, self.other_student)
+            for subject in (self.subject, self.other_subject)
+        ]
+        # Scheme changes reach the cached grade tables once committed
+        with self.captureOnCommitCallbacks(execute=True):
+            default = GradingScheme.objects.get(class_batch='', subject=None)
+            default.failing_grade = 'NP'
+            default.save()
+            default.thresholds.all().delete()
+            default.thresholds.create(grade='P', min_percentage=50)
+            self.create_scheme('First year', [(60, 'S')], failing_grade='U', class_batch='FY')
+            self.create_scheme('Subject', [(55, 'OK')], subject=self.subject)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(regrade(), 4)
+        # One UPDATE per scheme
+        self.assertEqual(sum(query['sql'].startswith('UPDATE') for query in queries.captured_queries), 3)
+        grades = dict(ProgressSheet.objects.values_list('id', 'grade'))
+        self.assertEqual([grades[sheet.id] for sheet in sheets], ['OK', 'U', 'OK', 'P'])
+        self.assertEqual(regrade(), 0)
+
+        # New writes use the same schemes
+        sheets[3].marks_obtained = Decimal('10')
+        sheets[3].save()
+        self.assertEqual(sheets[3].grade, 'NP')
+
+        # So do writes that skip the model
+        ProgressSheet.objects.filter(pk=sheets[0].pk).update(marks_obtained=Decimal('54'))
+        ProgressSheet.objects.filter(pk=sheets[1].pk).update(marks_obtained=Decimal('61'))
+        grades = dict(ProgressSheet.objects.values_list('id', 'grade'))
+        self.assertEqual([grades[sheets[0].id], grades[sheets[1].id]], ['F', 'S'])
+
+        # Other edits of the student leave the grades alone
+        student = Student.objects.get(pk=self.other_student.pk)
+        student.full_name = 'Renamed Student'
+        with CaptureQueriesContext(connection) as queries:
+            student.save()
+        self.assertFalse([query for query in queries.captured_queries if 'dashboard_gradingscheme' in query['sql']])
+
+        # Moving to another class/batch regrades the student's sheets
+        self.other_student.class_batch = 'FY'
+        self.other_student.save()
+        self.assertEqual(ProgressSheet.objects.get(pk=sheets[3].pk).grade, 'U')
+
+
+class DeletionTests(TestCase):
+    """
+    Set-based deletes leave exam results and rankings as if the deleted rows
+    had never been entered.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.students = Student.objects.bulk_create(
+            Student(
+                full_name=f'Student {i}', email=f'student{i}@example.com', roll_number=f'R{i:04d}',
+                class_batch='FY' if i % 2 else 'SY', date_of_birth=datetime.date(2005, 1, 1)
+            )
+            for i in range(30)
+        )
+        cls.subjects = Subject.objects.bulk_create(
+            Subject(name=f'Subject {i}', code=f'SUB{i}') for i in range(3)
+        )
+        upsert_progress_sheets(
+            ProgressSheet(
+                student=student, subject=subject, exam_type='quarterly', exam_date=datetime.date(2025, 1, 10),
+                marks_obtained=Decimal((student.pk * 7 + subject.pk * 13) % 100), max_marks=Decimal(100)
+            )
+            for student in cls.students
+            for subject in cls.subjects
+        )
+
+    def assertRanksConsecutive(self):
+        ranks = list(StudentRanking.objects.filter(exam_type='quarterly').order_by('rank').values_list('rank', flat=True))
+        self.assertEqual(ranks, list(range(1, ExamResult.objects.filter(exam_type='quarterly').count() + 1)))
+
+    def test_delete_class_batch(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            deleted = delete_students(Student.objects.filter(class_batch='FY'))
+        self.assertEqual(deleted, 15)
+        self.assertFalse(ProgressSheet.objects.filter(student__class_batch='FY').exists())
+        self.assertEqual(ExamResult.objects.count(), 15)
+        self.assertEqual(list(find_exam_result_drift()), [])
+        self.assertRanksConsecutive()
+
+    def test_delete_subject(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            deleted = delete_subjects(Subject.objects.filter(pk=self.subjects[0].pk))
+        self.assertEqual(deleted, 1)
+        self.assertEqual(ExamResult.objects.filter(max_possible_marks=200).count(), 30)
+        self.assertEqual(list(find_exam_result_drift()), [])
+        self.assertRanksConsecutive()
+
+    def test_delete_every_subject_removes_results(self):
+        signalled = []
+        def record(sender, instance, **kwargs):
+            signalled.append(instance)
+        for model in (ProgressSheet, ExamResult):
+            post_delete.connect(record, sender=model)
+        try:
+            with self.captureOnCommitCallbacks(execute=True):
+                delete_subjects(Subject.objects.all())
+        finally:
+            for model in (ProgressSheet, ExamResult):
+                post_delete.disconnect(record, sender=model)
+        # Nothing was loaded and deleted row by row
+        self.assertEqual(signalled, [])
+        self.assertFalse(ExamResult.objects.exists())
+        self.assertFalse(StudentRanking.objects.exists())
+
+
+@override_settings(ACADEMIC_YEAR_START_MONTH=6)
+class ArchiveTests(TestCase):
+    """
+    Archival moves old academic years out of the live tables whole, and the
+    archived years stay readable.
+    """
+    OLD_DATE = datetime.date(2023, 3, 10)
+    NEW_DATE = datetime.date(2024, 9, 10)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.students = Student.objects.bulk_create(
+            Student(
+                full_name=f'Student {i}', email=f'student{i}@example.com', roll_number=f'R{i:04d}',
+                class_batch='FY', date_of_birth=datetime.date(2005, 1, 1)
+            )
+            for i in range(5)
+        )
+        cls.subjects = Subject.objects.bulk_create(
+            Subject(name=f'Subject {i}', code=f'SUB{i}') for i in range(2)
+        )
+        upsert_progress_sheets(
+            ProgressSheet(
+                student=student, subject=subject, exam_type='quarterly', exam_date=exam_date,
+                marks_obtained=Decimal(40 + student.pk * 5 + subject.pk), max_marks=Decimal(100)
+            )
+            for exam_date in (cls.OLD_DATE, cls.NEW_DATE)
+            for student in cls.students
+            for subject in cls.subjects
+        )
+
+    def test_academic_year(self):
+        self.assertEqual(academic_year(datetime.date(2023, 5, 31)), 2022)
+        self.assertEqual(academic_year(datetime.date(2023, 6, 1)), 2023)
+
+    def test_archive_moves_old_years(self):
+        old_ranks = dict(RankHistory.objects.filter(exam_date=self.OLD_DATE).values_list('student_id', 'rank'))
+        with self.captureOnCommitCallbacks(execute=True):
+            archived = archive_academic_years(2024, batch_size=2)
+
+        self.assertEqual(archived, {'students': 5, 'progress_sheets': 10, 'exam_results': 5})
+        self.assertFalse(ProgressSheet.objects.filter(exam_date=self.OLD_DATE).exists())
+        self.assertFalse(ExamResult.objects.filter(exam_date=self.OLD_DATE).exists())
+        self.assertFalse(RankHistory.objects.filter(exam_date=self.OLD_DATE).exists())
+        self.assertEqual(list(find_exam_result_drift()), [])
+        # Rankings now only cover the live year
+        self.assertEqual(
+            set(StudentRanking.objects.values_list('max_marks', flat=True)), {Decimal(200)}
+        )
+
+        result = ArchivedExamResult.objects.get(student=self.students[0])
+        self.assertEqual(result.academic_year, 2022)
+        self.assertEqual(result.subject_count, 2)
+        self.assertEqual(result.max_possible_marks, Decimal(200))
+        self.assertEqual(result.rank, old_ranks[self.students[0].pk])
+        self.assertEqual(ArchivedProgressSheet.objects.filter(academic_year=2022).count(), 10)
+
+        # Nothing is left to move on a second run
+        self.assertEqual(archive_academic_years(2024)['progress_sheets'], 0)
+
+    def test_archived_marks_survive_subject_deletion(self):
+        archive_academic_years(2024)
+        delete_subjects(Subject.objects.filter(pk=self.subjects[0].pk))
+        sheet = ArchivedProgressSheet.objects.filter(subject_name='Subject 0').first()
+        self.assertIsNone(sheet.subject)
+        delete_students(Student.objects.filter(pk=self.students[0].pk))
+        self.assertFalse(ArchivedExamResult.objects.filter(student_id=self.students[0].pk).exists())
+
+    def test_archived_progress_view(self):
+        archive_academic_years(2024)
+        user = CustomUser.objects.create_user(username='teacher', email='teacher@example.com', password='pass12345')
+        self.client.force_login(user)
+        student = self.students[0]
+
+        response = self.client.get(reverse('dashboard:progress_sheet_list', args=[student.id]))
+        self.assertContains(response, reverse('dashboard:archived_progress', args=[student.id]))
+        response = self.client.get(reverse('dashboard:archived_progress', args=[student.id]))
+        self.assertEqual(response.context['year_label'], '2022-23')
+        self.assertEqual(len(response.context['exams']), 1)
+        self.assertEqual(len(response.context['exams'][0]['sheets']), 2)
+
+
+@unittest.skipUnless(connection.vendor == 'sqlite', 'SQLite profiles only apply to SQLite')
+class SQLiteProfileTests(TestCase):
+    def pragma(self, name):
+        with connection.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_profile_applied_to_new_connections(self):
+        # The test database is in memory, so journal_mode and mmap_size do not apply
+        with self.settings(SQLITE_PROFILE={'cache_size': -4096, 'temp_store': 'MEMORY'}):
+            apply_sqlite_profile(sender=None, connection=connection)
+        self.assertEqual(self.pragma('cache_size'), -4096)
+        self.assertEqual(self.pragma('temp_store'), 2)
+
+
+class ReportingRoutingTests(TransactionTestCase):
+    """
+    Reporting views read from the snapshot unless the user changed data after it
+    was taken. The reporting alias mirrors the default test database through its
+    own connection, which only sees committed data, hence TransactionTestCase.
+    """
+    databases = {'default', 'reporting'}
+    # Keep the grading scheme created by the migrations for later tests
+    serialized_rollback = True
+
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            email='staff@example.com', username='staff', password='password', is_staff=True
+        )
+        self.student = Student.objects.create(
+            full_name='Student', email='student@example.com', roll_number='R0001',
+            class_batch='FY', date_of_birth=datetime.date(2005, 1, 1)
+        )
+        self.subject = Subject.objects.create(name='Subject', code='SUB')
+        self.sheet = ProgressSheet.objects.create(
+            student=self.student, subject=self.subject, exam_type='quarterly',
+            exam_date=datetime.date(2025, 1, 10), marks_obtained=Decimal(50), max_marks=Decimal(100)
+        )
+        self.client.force_login(self.user)
+        self.url = reverse('dashboard:progress_sheet_list', args=[self.student.id])
+
+    def read_database(self):
+        return self.client.get(self.url).context['student']._state.db
+
+    def read_marks(self):
+        response = self.client.get(self.url)
+        marks = [sheet.marks_obtained for sheet in response.context['progress_sheets']]
+        return response.context['student']._state.db, marks
+
+    def test_without_snapshot_reads_default(self):
+        with mock.patch('dashboard.replica.snapshot_taken_at', return_value=None):
+            self.assertEqual(self.read_database(), 'default')
+
+    def test_stale_snapshot_reads_default(self):
+        with mock.patch('dashboard.replica.snapshot_taken_at', return_value=time.time() - 24 * 60 * 60):
+            self.assertEqual(self.read_database(), 'default')
+
+    def test_reads_own_writes(self):
+        with mock.patch('dashboard.replica.snapshot_taken_at', return_value=time.time()):
+            self.assertEqual(self.read_database(), 'reporting')
+            response = self.client.post(reverse('dashboard:update_progress_sheet', args=[self.sheet.id]), {
+                'student': self.student.id, 'subject': self.subject.id, 'exam_type': 'quarterly',
+                'exam_date': '2025-01-10', 'marks_obtained': '60', 'max_marks': '100',
+            })
+            self.assertEqual(response.status_code, 302)
+            # The snapshot predates the change
+            self.assertEqual(self.read_database(), 'default')
+
+        with mock.patch('dashboard.replica.snapshot_taken_at', return_value=time.time() + 1):
+            self.assertEqual(self.read_database(), 'reporting')
+
+    def test_background_job_writes(self):
+        job = Job.objects.create(kind='import_marks', created_by=self.user, status=Job.STATUS_RUNNING)
+        with mock.patch('dashboard.replica.snapshot_taken_at', return_value=time.time()):
+            # The job may have written since the snapshot was taken
+            self.assertEqual(self.read_database(), 'default')
+            Job.objects.filter(pk=job.pk).update(status=Job.STATUS_SUCCEEDED, finished_at=timezone.now())
+            self.assertEqual(self.read_database(), 'default')
+        with mock.patch('dashboard.replica.snapshot_taken_at', return_value=time.time() + 1):
+            self.assertEqual(self.read_database(), 'reporting')
+
+        # Other users' jobs do not matter
+        Job.objects.filter(pk=job.pk).update(status=Job.STATUS_RUNNING, created_by=None)
+        with mock.patch('dashboard.replica.snapshot_taken_at', return_value=time.time()):
+            self.assertEqual(self.read_database(), 'reporting')
+
+    def test_refreshed_snapshot_is_read_through_reporting_alias(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, 'reporting.sqlite3')
+        reporting = connections['reporting']
+        # Point the alias at a real read-only snapshot instead of the test database;
+        # its open connection is closed once the name no longer looks in-memory
+        with override_settings(REPORTING_SNAPSHOT_PATH=path), \
+                mock.patch.dict(reporting.settings_dict, {'NAME': f'file:{path}?mode=ro'}):
+            reporting.close()
+            try:
+                refresh_snapshot()
+                self.assertEqual(self.read_marks(), ('reporting', [Decimal(50)]))
+                with self.assertRaisesMessage(OperationalError, 'readonly'):
+                    Subject.objects.using('reporting').filter(pk=self.subject.pk).update(name='Changed')
+
+                # Later changes reach the snapshot's readers once it is refreshed,
+                # although their connection stays open between requests
+                ProgressSheet.objects.filter(pk=self.sheet.pk).update(marks_obtained=Decimal(70))
+                self.assertEqual(self.read_marks(), ('reporting', [Decimal(50)]))
+                refresh_snapshot()
+                self.assertEqual(self.read_marks(), ('reporting', [Decimal(70)]))
+                self.assertEqual(os.listdir(directory.name), ['reporting.sqlite3'])
+
+                # A failed copy leaves the previous snapshot in place
+                with mock.patch('dashboard.replica.os.utime', side_effect=OSError):
+                    with self.assertRaises(OSError):
+                        refresh_snapshot()
+                self.assertEqual(os.listdir(directory.name), ['reporting.sqlite3'])
+                self.assertEqual(self.read_marks(), ('reporting', [Decimal(70)]))
+            finally:
+                reporting.close()
+
+
+class RankingCursorTests(TestCase):
+    """
+    Malformed ranking cursors are rejected and the ranking page falls back to
+    its first page instead of failing.
+    """
+    BAD_CURSORS = [
+        'NaN_1', 'Infinity_1', '-Infinity_1', 'sNaN_1', 'abc_1', '12.5_x', '12.5', '_',
+        '50_99999999999999999999999', '50_-9223372036854775809', '50_9223372036854775808',
+    ]
+
+    def test_decode(self):
+        self.assertEqual(decode_ranking_cursor('87.50_12'), (Decimal('87.50'), 12))
+        for cursor in self.BAD_CURSORS:
+            with self.assertRaises(ValueError, msg=cursor):
+                decode_ranking_cursor(cursor)
+
+    def test_bad_cursor_shows_first_page(self):
+        user = CustomUser.objects.create_user(email='teacher@example.com', username='teacher', password='password')
+        self.client.force_login(user)
+        for cursor in self.BAD_CURSORS:
+            response = self.client.get(reverse('dashboard:student_ranking'), {'after': cursor})
+            self.assertEqual(response.status_code, 200, cursor)
+            self.assertTrue(response.context['is_first_page'], cursor)
+
+    def test_cache_keys_stay_portable(self):
+        # Raw cursors can be long or contain spaces and control characters
+        for variant in ['default:page:' + '9' * 500 + '_1', 'default:page:1 2\n3']:
+            key = ranking_cache_key('quarterly', variant)
+            self.assertEqual(list(memcache_key_warnings(key)), [])
+
+
+class RankingCacheTests(TestCase):
+    """
+    Workers that miss the same ranking at once wait for a single recompute.
+    """
+
+    def setUp(self):
+        cache.clear()
+
+    def test_concurrent_misses_compute_once(self):
+        calls = []
+        barrier = threading.Barrier(2)
+
+        def compute():
+            calls.append(threading.get_ident())
+            # Long enough for the other worker to miss and find the lock taken
+            time.sleep(0.3)
+            return ['ranking']
+
+        results = []
+
+        def worker():
+            barrier.wait()
+            results.append(cached_ranking('quarterly', 'page', compute))
+
+        threads = [threading.Thread(target=worker) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [['ranking'], ['ranking']])
+        self.assertEqual(cached_ranking('quarterly', 'page', mock.Mock()), ['ranking'])
+
+    def test_failed_compute_releases_lock(self):
+        with self.assertRaises(ZeroDivisionError):
+            cached_ranking('quarterly', 'page', lambda: 1 / 0)
+        compute = mock.Mock(return_value=['ranking'])
+        with mock.patch('dashboard.caching.RANKING_LOCK_WAIT', 0):
+            self.assertEqual(cached_ranking('quarterly', 'page', compute), ['ranking'])
+        self.assertFalse(cache.get(f"{ranking_cache_key('quarterly', 'page')}:lock"))
+
+    def test_computes_itself_when_the_lock_holder_is_slow(self):
+        cache.add(f"{ranking_cache_key('quarterly', 'page')}:lock", True)
+        compute = mock.Mock(return_value=['ranking'])
+        with mock.patch('dashboard.caching.RANKING_LOCK_WAIT', 0.1):
+            self.assertEqual(cached_ranking('quarterly', 'page', compute), ['ranking'])
+        compute.assert_called_once_with()
+
+
+class RankingEngineTests(TestCase):
+    """
+    The ranking is computed in one aggregated query, and the ranking page costs
+    the same number of queries however many students there are.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(email='staff@example.com', username='staff', password='password')
+        cls.subjects = Subject.objects.bulk_create(Subject(name=f'Subject {i}', code=f'SUB{i}') for i in range(2))
+
+    def setUp(self):
+        cache.clear()
+
+    def add_students(self, marks_list, start=0):
+        for offset, marks in enumerate(marks_list):
+            student = Student.objects.create(
+                full_name=f'Student {start + offset}', email=f'student{start + offset}@example.com',
+                roll_number=f'R{start + offset:04d}', class_batch='FY', date_of_birth=datetime.date(2005, 1, 1)
+            )
+            upsert_progress_sheets(
+                ProgressSheet(
+                    student=student, subject=subject, exam_type='quarterly', exam_date=datetime.date(2025, 1, 10),
+                    marks_obtained=Decimal(subject_marks), max_marks=Decimal(50)
+                )
+                for subject, subject_marks in zip(self.subjects, marks)
+            )
+
+    def ranking_queries(self):
+        self.client.force_login(self.user)
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('dashboard:student_ranking'), {'exam_type': 'quarterly'})
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_single_query_ranking(self):
+        self.add_students([(45, 45), (40, 30), (30, 40), (10, 0)])
+        with self.assertNumQueries(1):
+            rows = student_rankings('quarterly')
+        self.assertEqual(
+            [
+                (row['student'].roll_number, row['total_marks'], row['max_marks'], row['subject_count'],
+                 row['average_percentage'], row['rank'])
+                for row in rows
+            ],
+            [
+                ('R0000', 90, 100, 2, 90.0, 1),
+                ('R0001', 70, 100, 2, 70.0, 2),
+                ('R0002', 70, 100, 2, 70.0, 2),
+                ('R0003', 10, 100, 2, 10.0, 4),
+            ]
+        )
+        self.assertEqual(list(student_rankings('midterm')), [])
+
+    def test_query_count_does_not_grow_with_cohort(self):
+        self.add_students([(45, 45), (20, 30)])
+        small = self.ranking_queries()
+        self.add_students([(i, 50 - i) for i in range(40)], start=2)
+        self.assertEqual(self.ranking_queries(), small)
+        with self.assertNumQueries(1):
+            self.assertEqual(len(student_rankings('quarterly')), 42)
+
+
+class LeaderboardTests(TestCase):
+    """
+    Leaderboards rank within each class/batch and subject, giving tied students
+    the same competition and dense rank.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(email='staff@example.com', username='staff', password='password')
+        cls.subjects = Subject.objects.bulk_create(Subject(name=f'Subject {i}', code=f'SUB{i}') for i in range(2))
+        # Per-subject marks out of 50; the FY averages are 90, 80, 80, 70
+        results = [
+            ('FY', 45, 45), ('FY', 40, 40), ('FY', 35, 45), ('FY', 35, 35), ('SY', 25, 25),
+        ]
+        for i, (class_batch, *marks) in enumerate(results):
+            student = Student.objects.create(
+                full_name=f'Student {i}', email=f'student{i}@example.com', roll_number=f'R{i:04d}',
+                class_batch=class_batch, date_of_birth=datetime.date(2005, 1, 1)
+            )
+            upsert_progress_sheets(
+                ProgressSheet(
+                    student=student, subject=subject, exam_type='quarterly', exam_date=datetime.date(2025, 1, 10),
+                    marks_obtained=Decimal(subject_marks), max_marks=Decimal(50)
+                )
+                for subject, subject_marks in zip(cls.subjects, marks)
+            )
+        rebuild_rankings()
+
+    def setUp(self):
+        cache.clear()
+
+    def test_class_batch_ranks(self):
+        rows = [
+            (row.class_batch, row.student.roll_number, row.competition_rank, row.dense_rank)
+            for row in class_batch_leaderboard('quarterly')
+        ]
+        self.assertEqual(rows, [
+            ('FY', 'R0000', 1, 1),
+            ('FY', 'R0001', 2, 2),
+            ('FY', 'R0002', 2, 2),
+            ('FY', 'R0003', 4, 3),
+            ('SY', 'R0004', 1, 1),
+        ])
+
+    def test_subject_ranks(self):
+        rows = [
+            (row['subject__name'], row['student__roll_number'], row['competition_rank'], row['dense_rank'])
+            for row in subject_leaderboard('quarterly', self.subjects[1].pk)
+        ]
+        self.assertEqual(rows, [
+            ('Subject 1', 'R0000', 1, 1),
+            ('Subject 1', 'R0002', 1, 1),
+            ('Subject 1', 'R0001', 3, 2),
+            ('Subject 1', 'R0003', 4, 3),
+            ('Subject 1', 'R0004', 5, 4),
+        ])
+
+    def test_limit_keeps_ties(self):
+        self.assertEqual(
+            [row.student.roll_number for row in class_batch_leaderboard('quarterly', 'FY', limit=2)],
+            ['R0000', 'R0001', 'R0002']
+        )
+        self.assertEqual(
+            [row['student__roll_number'] for row in subject_leaderboard('quarterly', self.subjects[1].pk, limit=1)],
+            ['R0000', 'R0002']
+        )
+
+    def test_view(self):
+        self.client.force_login(self.user)
+        response = self.client.get(
+            reverse('dashboard:leaderboard'), {'partition': 'subject', 'group': self.subjects[0].pk, 'limit': 2}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [(row['roll_number'], row['competition_rank'], row['dense_rank']) for row in response.context['rows']],
+            [('R0000', 1, 1), ('R0001', 2, 2)]
+        )
+
+
+class RankMovementTests(TestCase):
+    """
+    Each exam in a student's rank history carries the rank of the exam before it.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(email='staff@example.com', username='staff', password='password')
+        subject = Subject.objects.create(name='Mathematics', code='MATH')
+        cls.students = [
+            Student.objects.create(
+                full_name=f'Student {i}', email=f'student{i}@example.com', roll_number=f'R{i:04d}',
+                class_batch='FY', date_of_birth=datetime.date(2005, 1, 1)
+            )
+            for i in range(3)
+        ]
+        # The first student comes 3rd, then 1st, then 2nd; the midterm shares the
+        # quarterly's date, so only the exam type orders them
+        exams = [
+            ('end_term', datetime.date(2025, 3, 10), (40, 50, 10)),
+            ('midterm', datetime.date(2025, 1, 10), (50, 10, 20)),
+            ('quarterly', datetime.date(2025, 1, 10), (5, 10, 20)),
+        ]
+        upsert_progress_sheets(
+            ProgressSheet(
+                student=student, subject=subject, exam_type=exam_type, exam_date=exam_date,
+                marks_obtained=Decimal(marks), max_marks=Decimal(50)
+            )
+            for exam_type, exam_date, all_marks in exams
+            for student, marks in zip(cls.students, all_marks)
+        )
+        rebuild_rankings()
+
+    def test_previous_rank(self):
+        with self.assertNumQueries(1):
+            history = [(row.exam_type, row.rank, row.previous_rank) for row in rank_movement(self.students[0].pk)]
+        self.assertEqual(history, [('quarterly', 3, None), ('midterm', 1, 3), ('end_term', 2, 1)])
+
+    def test_history_is_per_student(self):
+        self.assertEqual(
+            [(row.rank, row.previous_rank) for row in rank_movement(self.students[2].pk)],
+            [(1, None), (2, 1), (3, 2)]
+        )
+
+    def test_view(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('dashboard:rank_history', args=[self.students[0].pk]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([record.rank_change for record in response.context['history']], [None, 2, -1])
+
+
+class ProgressSheetListTests(TestCase):
+    """
+    A student's progress sheet page sums each exam in the database and costs the
+    same number of queries however many sheets the student has.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(email='staff@example.com', username='staff', password='password')
+        cls.subjects = Subject.objects.bulk_create(Subject(name=f'Subject {i}', code=f'SUB{i}') for i in range(6))
+        cls.few, cls.many = [
+            Student.objects.create(
+                full_name=f'Student {i}', email=f'student{i}@example.com', roll_number=f'R{i:04d}',
+                class_batch='FY', date_of_birth=datetime.date(2005, 1, 1)
+            )
+            for i in range(2)
+        ]
+        upsert_progress_sheets([
+            ProgressSheet(
+                student=cls.few, subject=cls.subjects[0], exam_type='quarterly',
+                exam_date=datetime.date(2025, 1, 10), marks_obtained=Decimal(30), max_marks=Decimal(50)
+            ),
+            *(
+                ProgressSheet(
+                    student=cls.many, subject=subject, exam_type=exam_type, exam_date=exam_date,
+                    marks_obtained=Decimal(10 + i), max_marks=Decimal(50)
+                )
+                for exam_type, exam_date in [
+                    ('quarterly', datetime.date(2025, 1, 10)), ('midterm', datetime.date(2025, 2, 10)),
+                ]
+                for i, subject in enumerate(cls.subjects)
+            ),
+        ])
+
+    def get(self, student):
+        self.client.force_login(self.user)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('dashboard:progress_sheet_list', args=[student.pk]))
+        self.assertEqual(response.status_code, 200)
+        return response, len(queries)
+
+    def test_query_count_does_not_grow_with_sheets(self):
+        _, few_queries = self.get(self.few)
+        _, many_queries = self.get(self.many)
+        self.assertEqual(few_queries, many_queries)
+
+    def test_exam_summary(self):
+        response, _ = self.get(self.many)
+        summary = response.context['exam_summary']
+        self.assertEqual(list(summary), ['midterm', 'quarterly'])
+        for exam_type in summary:
+            self.assertEqual(summary[exam_type]['total_marks'], 75)
+            self.assertEqual(summary[exam_type]['max_marks'], 300)
+            self.assertEqual(summary[exam_type]['subjects_count'], 6)
+            self.assertEqual(summary[exam_type]['average_percentage'], 25)
+            self.assertEqual(len(summary[exam_type]['sheets']), 6)
+
+
+def ranking_tables():
+    """
+    The stored rankings in a form comparable with a fresh rebuild_rankings().
+    """
+    return (
+        sorted(StudentRanking.objects.values_list(
+            'student_id', 'exam_type', 'rank', 'average_percentage', 'total_marks', 'max_marks', 'subject_count'
+        )),
+        sorted(RankHistory.objects.values_list(
+            'student_id', 'exam_type', 'exam_date', 'rank', 'average_percentage', 'total_marks', 'max_marks', 'subject_count'
+        )),
+    )
+
+
+class RebuildComparisonMixin:
+    """
+    Forty students and three subjects, and a check that the derived tables match
+    the progress sheets exactly.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.students = Student.objects.bulk_create(
+            Student(
+                full_name=f'Student {i}', email=f'student{i}@example.com', roll_number=f'R{i:04d}',
+                class_batch='FY', date_of_birth=datetime.date(2005, 1, 1)
+            )
+            for i in range(40)
+        )
+        cls.subjects = Subject.objects.bulk_create(
+            Subject(name=f'Subject {i}', code=f'SUB{i}') for i in range(3)
+        )
+
+    def sheets(self, students, exam_date, marks, exam_type='quarterly'):
+        return [
+            ProgressSheet(
+                student=student, subject=subject, exam_type=exam_type, exam_date=exam_date,
+                # Multiples of ten give plenty of ties
+                marks_obtained=Decimal(marks(student, subject) % 11 * 10), max_marks=Decimal(100)
+            )
+            for student in students
+            for subject in self.subjects
+        ]
+
+    def assertMatchesRebuild(self):
+        self.assertEqual(list(find_exam_result_drift()), [])
+        stored = ranking_tables()
+        rebuild_rankings()
+        self.assertEqual(stored, ranking_tables())
+
+
+class IncrementalRankingTests(RebuildComparisonMixin, TestCase):
+    """
+    Saving and deleting single progress sheets shifts only the affected stored
+    ranks, leaving them exactly as a full rebuild would.
+    """
+
+    def setUp(self):
+        self.first = datetime.date(2025, 1, 10)
+        upsert_progress_sheets(self.sheets(self.students[:10], self.first, lambda st, su: st.pk * 3 + su.pk))
+        self.assertMatchesRebuild()
+
+    def sheet(self, student, subject=0):
+        return ProgressSheet.objects.get(
+            student=student, subject=self.subjects[subject], exam_type='quarterly', exam_date=self.first
+        )
+
+    def ranks(self):
+        return list(StudentRanking.objects.filter(exam_type='quarterly').order_by('rank').values_list('rank', flat=True))
+
+    def test_tie_shares_rank_and_skips_the_next(self):
+        for student in self.students[:2]:
+            for subject in range(3):
+                sheet = self.sheet(student, subject)
+                sheet.marks_obtained = Decimal(100)
+                sheet.save()
+        self.assertEqual(self.ranks()[:3], [1, 1, 3])
+        self.assertMatchesRebuild()
+
+        sheet = self.sheet(self.students[0])
+        sheet.marks_obtained = Decimal(90)
+        sheet.save()
+        self.assertEqual(
+            StudentRanking.objects.get(student=self.students[1], exam_type='quarterly').rank, 1
+        )
+        self.assertMatchesRebuild()
+
+    def test_insert(self):
+        for marks in (100, 0, 50):
+            student = self.students[20 + marks // 50]
+            for subject in self.subjects:
+                ProgressSheet.objects.create(
+                    student=student, subject=subject, exam_type='quarterly', exam_date=self.first,
+                    marks_obtained=Decimal(marks), max_marks=Decimal(100)
+                )
+            self.assertMatchesRebuild()
+        self.assertEqual(len(self.ranks()), 13)
+
+    def test_delete(self):
+        for student in self.students[:3]:
+            for subject in range(3):
+                self.sheet(student, subject).delete()
+                self.assertMatchesRebuild()
+        self.assertFalse(StudentRanking.objects.filter(student__in=self.students[:3]).exists())
+        self.assertEqual(len(self.ranks()), 7)
+
+    def test_move(self):
+        sheet = self.sheet(self.students[4])
+        for marks in (100, 0, 40, 40, 70):
+            sheet.marks_obtained = Decimal(marks)
+            sheet.save()
+            self.assertMatchesRebuild()
+        # To another sitting, which takes it out of this sitting's rank history
+        sheet.exam_date = datetime.date(2025, 3, 10)
+        sheet.save()
+        self.assertMatchesRebuild()
+        self.assertEqual(RankHistory.objects.get(student=self.students[4], exam_date=sheet.exam_date).rank, 1)
+
+
+class ExamResultDeltaTests(RebuildComparisonMixin, TestCase):
+    """
+    Single progress sheet writes adjust ExamResult by the change in marks, and
+    verify_exam_results finds and repairs results written around the models.
+    """
+
+    def setUp(self):
+        self.first = datetime.date(2025, 1, 10)
+        upsert_progress_sheets(self.sheets(self.students[:5], self.first, lambda st, su: st.pk + su.pk))
+
+    def result(self, student, exam_date=None):
+        return ExamResult.objects.get(student=student, exam_type='quarterly', exam_date=exam_date or self.first)
+
+    def test_writes_apply_deltas(self):
+        sheet = ProgressSheet.objects.filter(student=self.students[0]).first()
+        before = self.result(self.students[0])
+        with mock.patch('dashboard.signals.recompute_exam_result') as signal_recompute, \
+                mock.patch('dashboard.results.recompute_exam_result') as delta_recompute:
+            sheet.marks_obtained += 5
+            sheet.max_marks += 10
+            sheet.save()
+            ProgressSheet.objects.create(
+                student=self.students[0], subject=Subject.objects.create(name='Extra', code='EXT'),
+                exam_type='quarterly', exam_date=self.first, marks_obtained=Decimal(30), max_marks=Decimal(50)
+            )
+        self.assertFalse(signal_recompute.called or delta_recompute.called)
+        after = self.result(self.students[0])
+        self.assertEqual(after.total_marks, before.total_marks + 35)
+        self.assertEqual(after.max_possible_marks, before.max_possible_marks + 60)
+        self.assertMatchesRebuild()
+
+    def test_float_and_int_marks(self):
+        sheet = ProgressSheet.objects.filter(student=self.students[2]).first()
+        before = self.result(self.students[2])
+        sheet.marks_obtained = float(sheet.marks_obtained) + 2.25
+        sheet.save()
+        # The instance keeps its float, so the next change subtracts from it
+        sheet.marks_obtained = int(sheet.marks_obtained) + 1
+        sheet.max_marks = 120.5
+        sheet.save()
+        after = self.result(self.students[2])
+        self.assertEqual(after.total_marks, before.total_marks + 3)
+        self.assertEqual(after.max_possible_marks, before.max_possible_marks + Decimal('20.5'))
+        self.assertMatchesRebuild()
+
+    def test_moving_and_deleting_sheets(self):
+        sheet = ProgressSheet.objects.filter(student=self.students[1]).first()
+        sheet.exam_date = datetime.date(2025, 3, 10)
+        sheet.save()
+        self.assertEqual(self.result(self.students[1], sheet.exam_date).total_marks, sheet.marks_obtained)
+        self.assertMatchesRebuild()
+
+        sheet.delete()
+        self.assertFalse(ExamResult.objects.filter(exam_date=sheet.exam_date).exists())
+        for sheet in ProgressSheet.objects.filter(student=self.students[2]):
+            sheet.delete()
+        self.assertFalse(ExamResult.objects.filter(student=self.students[2]).exists())
+        self.assertMatchesRebuild()
+
+    def test_missing_result_is_recomputed(self):
+        ExamResult.objects.filter(student=self.students[3]).delete()
+        sheet = ProgressSheet.objects.filter(student=self.students[3]).first()
+        sheet.marks_obtained += 1
+        sheet.save()
+        self.assertEqual(
+            self.result(self.students[3]).total_marks,
+            sum(ProgressSheet.objects.filter(student=self.students[3]).values_list('marks_obtained', flat=True))
+        )
+        self.assertMatchesRebuild()
+
+    def test_verify_command_repairs_drift(self):
+        ExamResult.objects.filter(student=self.students[0]).update(total_marks=0)
+        ExamResult.objects.filter(student=self.students[1]).delete()
+        ExamResult.objects.create(
+            student=self.students[30], exam_type='quarterly', exam_date=self.first,
+            total_marks=1, max_possible_marks=1, average_percentage=100
+        )
+
+        output = io.StringIO()
+        call_command('verify_exam_results', stdout=output)
+        self.assertIn('3 exam results have drifted', output.getvalue())
+        call_command('verify_exam_results', '--repair', stdout=output)
+        self.assertIn('1 created, 1 updated, 1 deleted', output.getvalue())
+        self.assertEqual(list(find_exam_result_drift()), [])
+
+
+class BulkWriteTests(RebuildComparisonMixin, TestCase):
+    """
+    Upserts refresh exam results and rankings to exactly what a full rebuild
+    produces, on both the per-student and the set-based path.
+    """
+
+    def test_upserts_match_rebuild(self):
+        first, second = datetime.date(2025, 1, 10), datetime.date(2025, 3, 10)
+        self.assertEqual(upsert_progress_sheets(self.sheets(self.students, first, lambda st, su: st.pk + su.pk)), 120)
+        self.assertMatchesRebuild()
+        # Set-based path: more students than INCREMENTAL_REFRESH_LIMIT, new and changed sittings
+        upsert_progress_sheets(
+            self.sheets(self.students[:30], first, lambda st, su: st.pk * 3 + su.pk)
+            + self.sheets(self.students[10:35], second, lambda st, su: st.pk * 7)
+        )
+        self.assertMatchesRebuild()
+        # Per-student path
+        upsert_progress_sheets(self.sheets(self.students[:3], second, lambda st, su: su.pk))
+        self.assertMatchesRebuild()
+        self.assertEqual(ProgressSheet.objects.count(), 120 + 28 * 3)
+
+    def test_set_based_refresh_reads_only_the_written_students(self):
+        first = datetime.date(2025, 1, 10)
+        upsert_progress_sheets(self.sheets(self.students, first, lambda st, su: st.pk + su.pk))
+        with CaptureQueriesContext(connection) as queries:
+            upsert_progress_sheets(self.sheets(self.students[:25], first, lambda st, su: st.pk * 5))
+        unfiltered = [
+            query['sql'] for query in queries.captured_queries
+            if 'FROM "dashboard_progresssheet"' in query['sql'] and 'student_id" IN' not in query['sql']
+        ]
+        self.assertEqual(unfiltered, [])
+        self.assertMatchesRebuild()
+
+
+class MarkEntryGridTests(RebuildComparisonMixin, TestCase):
+    """
+    The class mark entry grid validates every cell before saving any, and
+    resubmitting it updates the same sheets.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.user = CustomUser.objects.create_user(email='staff@example.com', username='staff', password='password')
+
+    def test_mark_entry_grid(self):
+        self.client.force_login(self.user)
+        url = reverse('dashboard:mark_entry_grid')
+        data = {
+            'class_batch': 'FY', 'exam_type': 'quarterly', 'exam_date': '2025-01-10',
+            f'max_marks_{self.subjects[2].pk}': '50',
+        }
+        for student in self.students:
+            for subject in self.subjects[:2] if student.pk % 4 else self.subjects:
+                data[f'marks_{student.pk}_{subject.pk}'] = str((student.pk + subject.pk) % 11 * 5)
+
+        # One bad cell saves nothing
+        response = self.client.post(url, dict(data, **{f'marks_{self.students[0].pk}_{self.subjects[2].pk}': '51'}))
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(ProgressSheet.objects.exists())
+
+        self.assertEqual(self.client.post(url, data).status_code, 302)
+        self.assertEqual(ProgressSheet.objects.count(), 40 * 2 + 10)
+        self.assertEqual(
+            set(ProgressSheet.objects.filter(subject=self.subjects[2]).values_list('max_marks', flat=True)), {50}
+        )
+        self.assertMatchesRebuild()
+
+        # Resubmitting changed marks updates the same sheets
+        data[f'marks_{self.students[1].pk}_{self.subjects[0].pk}'] = '99'
+        self.client.post(url, data)
+        self.assertEqual(ProgressSheet.objects.count(), 40 * 2 + 10)
+        self.assertEqual(
+            ProgressSheet.objects.get(student=self.students[1], subject=self.subjects[0]).marks_obtained, 99
+        )
+        self.assertMatchesRebuild()
+
+
+class BulkProgressSheetFormTests(TestCase):
+    """
+    The bulk entry form keeps each subject's marks and max marks fields together.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = Student.objects.create(
+            full_name='Student', email='student@example.com', roll_number='R0001', class_batch='FY',
+            date_of_birth=datetime.date(2005, 1, 1)
+        )
+        cls.subjects = list(Subject.objects.bulk_create(
+            Subject(name=f'Subject {i}', code=f'SUB{i}') for i in range(3)
+        ))
+
+    def form(self, marks):
+        data = {'student': self.student.pk, 'exam_type': 'quarterly', 'exam_date': '2025-01-10'}
+        for subject, (subject_marks, max_marks) in zip(self.subjects, marks):
+            data[f'marks_{subject.pk}'] = subject_marks
+            data[f'max_marks_{subject.pk}'] = max_marks
+        return BulkProgressSheetForm(data, subjects=self.subjects)
+
+    def test_subject_groups(self):
+        form = BulkProgressSheetForm(subjects=self.subjects)
+        self.assertEqual(
+            [(subject, marks.name, max_marks.name) for subject, marks, max_marks in form.subject_groups()],
+            [(subject, f'marks_{subject.pk}', f'max_marks_{subject.pk}') for subject in self.subjects]
+        )
+
+    def test_pairs_marks_with_their_subject(self):
+        form = self.form([('40', '50'), ('', '100'), ('12.5', '25')])
+        self.assertTrue(form.is_valid(), form.errors)
+        self.assertEqual(form.subject_marks, [
+            (self.subjects[0], Decimal('40'), Decimal('50')),
+            (self.subjects[2], Decimal('12.5'), Decimal('25')),
+        ])
+
+    def test_marks_above_their_own_max_marks(self):
+        # 60 is within the first subject's max marks but not the second's
+        form = self.form([('60', '100'), ('60', '50')])
+        self.assertFalse(form.is_valid())
+        self.assertEqual(form.subject_marks, [(self.subjects[0], Decimal('60'), Decimal('100'))])
+
+
+class ExportTests(TestCase):
+    """
+    Exports stream every row in pieces, quoting CSV values as needed.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(
+            email='staff@example.com', username='staff', password='password', is_staff=True
+        )
+        cls.students = Student.objects.bulk_create(
+            Student(
+                full_name=f'Student, "{i}"', email=f'student{i}@example.com', roll_number=f'R{i:04d}',
+                class_batch='FY', date_of_birth=datetime.date(2005, 1, 1)
+            )
+            for i in range(5)
+        )
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def expected_rows(self):
+        return [
+            [str(student.pk), student.roll_number, student.full_name, student.email, 'FY', '2005-01-01']
+            for student in Student.objects.order_by('pk')
+        ]
+
+    def test_csv(self):
+        with mock.patch('dashboard.exports.EXPORT_ROWS_PER_WRITE', 2):
+            response = self.client.get(reverse('dashboard:export_data', args=['students', 'csv']))
+            self.assertTrue(response.streaming)
+            chunks = [chunk.decode() for chunk in response.streaming_content]
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="students.csv"')
+        # The header and five rows, two lines at a time
+        self.assertEqual(len(chunks), 3)
+        rows = list(csv.reader(io.StringIO(''.join(chunks))))
+        self.assertEqual(rows[0], ['id', 'roll_number', 'full_name', 'email', 'class_batch', 'date_of_birth'])
+        self.assertEqual(rows[1:], self.expected_rows())
+
+    def test_jsonl(self):
+        response = self.client.get(reverse('dashboard:export_data', args=['students', 'jsonl']))
+        records = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual(
+            [list(record.values()) for record in records],
+            [[int(row[0]), *row[1:]] for row in self.expected_rows()]
+        )
+
+    def test_unknown_export(self):
+        for args in (['teachers', 'csv'], ['students', 'xlsx']):
+            self.assertEqual(self.client.get(reverse('dashboard:export_data', args=args)).status_code, 404)
+
+
+class ReportCardTests(TestCase):
+    """
+    The report card archive holds one rendered card per student of the batch.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.subjects = Subject.objects.bulk_create(Subject(name=f'Subject {i}', code=f'SUB{i}') for i in range(2))
+        cls.students = Student.objects.bulk_create(
+            Student(
+                full_name=f'Student {i}', email=f'student{i}@example.com', roll_number=f'R{i:04d}',
+                class_batch='SY' if i == 3 else 'FY', date_of_birth=datetime.date(2005, 1, 1)
+            )
+            for i in range(4)
+        )
+        # The last FY student has no marks yet
+        upsert_progress_sheets(
+            ProgressSheet(
+                student=student, subject=subject, exam_type='quarterly', exam_date=datetime.date(2025, 1, 10),
+                marks_obtained=Decimal(30 + i), max_marks=Decimal(50)
+            )
+            for i, student in enumerate(cls.students)
+            if i != 2
+            for subject in cls.subjects
+        )
+
+    def archive(self, class_batch=None):
+        progress = mock.Mock()
+        data = b''.join(report_card_archive(class_batch, workers=2, progress=progress))
+        with zipfile.ZipFile(io.BytesIO(data)) as archive:
+            self.assertIsNone(archive.testzip())
+            return {name: archive.read(name).decode() for name in archive.namelist()}, progress
+
+    def test_archive_contents(self):
+        cards, progress = self.archive('FY')
+        self.assertEqual(sorted(cards), ['R0000.html', 'R0001.html', 'R0002.html'])
+        self.assertEqual(progress.call_args.args[0], 3)
+
+        card = cards['R0001.html']
+        self.assertIn('<h1>Student 1</h1>', card)
+        self.assertIn('Class/Batch: First Year', card)
+        self.assertIn('<td>Subject 0</td>', card)
+        self.assertIn('<td>Subject 1</td>', card)
+        self.assertIn('<td>31.00</td>', card)
+        # The exam result's totals
+        self.assertIn('<td>62.00</td>', card)
+        self.assertIn('No marks have been recorded yet.', cards['R0002.html'])
+
+    def test_every_batch(self):
+        cards, _ = self.archive()
+        self.assertEqual(sorted(cards), ['R0000.html', 'R0001.html', 'R0002.html', 'R0003.html'])
+
+    def test_queries_per_batch(self):
+        # The student query, and the progress sheets and exam results of each batch
+        with self.assertNumQueries(5):
+            batches = list(report_card_batches(batch_size=2))
+        self.assertEqual([len(batch) for batch in batches], [2, 2])
+
+    @override_settings(REPORT_CARD_WORKERS=3)
+    def test_workers(self):
+        self.assertEqual(report_card_workers(), 3)
+        self.assertEqual(report_card_workers(2), 2)
+        self.assertEqual(report_card_workers(8), 3)
+
+
+class MarksImportTests(RebuildComparisonMixin, TestCase):
+    """
+    CSV imports are written and refreshed chunk by chunk.
+    """
+
+    def csv_lines(self, rows):
+        yield 'roll_number,subject_code,exam_type,exam_date,marks,max_marks\n'
+        for row in rows:
+            yield ','.join(str(value) for value in row) + '\n'
+
+    def test_import_in_chunks(self):
+        rows = [
+            (student.roll_number, subject.code, 'quarterly', '2025-01-10', (student.pk * 3 + subject.pk) % 11 * 10, 100)
+            for student in self.students
+            for subject in self.subjects
+        ]
+        rows[5] = ('R9999', 'SUB0', 'quarterly', '2025-01-10', 50, 100)
+        rows[7] = (self.students[2].roll_number, 'SUB1', 'quarterly', '2025-01-10', 120, 100)
+        progress = []
+        result = import_progress_sheets(self.csv_lines(rows), chunk_size=25, progress=lambda result: progress.append(
+            # Each chunk is refreshed before the next is read
+            (result.saved, ExamResult.objects.count())
+        ))
+
+        self.assertEqual((result.rows, result.saved, result.error_count), (120, 118, 2))
+        self.assertEqual([line for line, _ in result.errors], [7, 9])
+        self.assertEqual(len(progress), 5)
+        self.assertEqual(progress[0], (23, 9))
+        self.assertMatchesRebuild()
+
+    def test_unreadable_rest_keeps_written_chunks(self):
+        def lines():
+            yield from self.csv_lines(
+                (student.roll_number, 'SUB0', 'quarterly', '2025-01-10', 70, 100) for student in self.students[:30]
+            )
+            yield '"unterminated\n'
+            raise UnicodeDecodeError('utf-8', b'\xff', 0, 1, 'invalid start byte')
+
+        result = import_progress_sheets(lines(), chunk_size=10)
+        self.assertEqual(result.saved, 30)
+        self.assertEqual(result.error_count, 1)
+        self.assertMatchesRebuild()
+
+
+class StudentSearchTests(TestCase):
+    """
+    Full-text student search ranks every match, however common the term.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        Student.objects.bulk_create(
+            Student(
+                full_name=f'Student Number {i}', email=f'student{i}@example.com', roll_number=f'R{i:05d}',
+                class_batch='FY', date_of_birth=datetime.date(2005, 1, 1)
+            )
+            for i in range(1200)
+        )
+        cls.best = Student.objects.create(
+            full_name='Stu Stuart', email='stu@stu.example.com', roll_number='STU1',
+            class_batch='FY', date_of_birth=datetime.date(2005, 1, 1)
+        )
+
+    @unittest.skipUnless(connection.vendor == 'sqlite', 'Full-text search uses SQLite FTS5')
+    def test_best_match_beyond_the_first_thousand(self):
+        if not student_search_index_available():
+            self.skipTest('SQLite was built without FTS5')
+        self.assertEqual(search_students('stu', limit=5)[0], self.best)
+
+
+class StudentAutocompleteTests(TestCase):
+    """
+    The student picker's prefix index, its JSON endpoint and its widget.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(email='staff@example.com', username='staff', password='password')
+        cls.asha = Student.objects.create(
+            full_name='Asha Kumar', email='asha@example.com', roll_number='FY001',
+            class_batch='FY', date_of_birth=datetime.date(2005, 1, 1)
+        )
+        cls.ravi = Student.objects.create(
+            full_name='Ravi Kumar Shah', email='ravi@example.com', roll_number='FY002',
+            class_batch='FY', date_of_birth=datetime.date(2005, 1, 1)
+        )
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def search(self, query):
+        response = self.client.get(reverse('dashboard:student_autocomplete'), {'q': query})
+        return [result['text'] for result in response.json()['results']]
+
+    def test_index_matches_roll_numbers_and_name_words(self):
+        index = StudentPrefixIndex([
+            (1, 'FY001', 'Asha Kumar'), (2, 'FY002', 'Ravi Kumar Shah'), (3, 'SY001', 'Kumari Das'),
+        ])
+        self.assertEqual([student_id for student_id, _ in index.search('fy0')], [1, 2])
+        self.assertEqual([student_id for student_id, _ in index.search('KUMAR')], [1, 2, 3])
+        self.assertEqual([student_id for student_id, _ in index.search('kumar  shah')], [2])
+        self.assertEqual(index.search('kumar', limit=1), [(1, 'Asha Kumar (FY001)')])
+        self.assertEqual(index.search('  '), [])
+
+    def test_sees_roster_changes_made_without_signals(self):
+        self.assertEqual(self.search('kumar'), ['Asha Kumar (FY001)', 'Ravi Kumar Shah (FY002)'])
+        # As another process would, with nothing invalidated in this one
+        Student.objects.bulk_create([Student(
+            full_name='Kumari Das', email='kumari@example.com', roll_number='SY001',
+            class_batch='SY', date_of_birth=datetime.date(2005, 1, 1)
+        )])
+        self.assertEqual(self.search('kumar'), ['Asha Kumar (FY001)', 'Ravi Kumar Shah (FY002)', 'Kumari Das (SY001)'])
+
+        self.asha.full_name = 'Asha Patel'
+        self.asha.save()
+        self.assertEqual(self.search('asha'), ['Asha Patel (FY001)'])
+        delete_students(Student.objects.filter(pk=self.ravi.pk))
+        self.assertEqual(self.search('kumar'), ['Kumari Das (SY001)'])
+        index = student_prefix_index()
+        self.assertIs(student_prefix_index(), index)
+
+    def test_widget_renders_chosen_student_only(self):
+        widget = StudentAutocompleteWidget()
+        html = widget.render('student', self.ravi.pk, attrs={'id': 'id_student'})
+        self.assertIn(f'value="{self.ravi.pk}"', html)
+        self.assertIn('value="Ravi Kumar Shah (FY002)"', html)
+        self.assertIn(f'data-search-url="{reverse("dashboard:student_autocomplete")}"', html)
+        self.assertNotIn('Asha', html)
+        for value in (None, '', 'abc', 999999):
+            self.assertIn('value="" class="form-control student-autocomplete-input"', widget.render('student', value))
+
+
+class StudentNameFilterTests(TestCase):
+    """
+    The student list's name filter matches prefixes case-insensitively, accented
+    letters included.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(email='staff@example.com', username='staff', password='password')
+        for roll_number, full_name in [('R1', 'Émile Zola'), ('R2', 'Emma Stone'), ('R3', 'Ōtani Shōhei')]:
+            Student.objects.create(
+                full_name=full_name, email=f'{roll_number}@example.com', roll_number=roll_number,
+                class_batch='FY', date_of_birth=datetime.date(2005, 1, 1)
+            )
+
+    def names(self, name):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('dashboard:student_list'), {'name': name})
+        return [student.full_name for student in response.context['students']]
+
+    def test_non_ascii_prefix(self):
+        for name in ['é', 'émi', 'ÉMI', 'Émile z']:
+            self.assertEqual(self.names(name), ['Émile Zola'], name)
+        self.assertEqual(self.names('ōtani'), ['Ōtani Shōhei'])
+        self.assertEqual(self.names('em'), ['Emma Stone'])
+
+    def test_prefix_ending_in_last_code_points(self):
+        self.assertEqual(self.names('\U0010ffff'), [])
+        self.assertEqual(self.names('\U0010ffff\U0010ffff'), [])
+        self.assertEqual(self.names('Émile\U0010ffff'), [])
+        self.assertEqual(self.names('\ud7ff'), [])
+        self.assertEqual(prefix_upper_bound('ab\U0010ffff'), 'ac')
+        self.assertEqual(prefix_upper_bound('a\ud7ff'), 'a\ue000')
+        self.assertIsNone(prefix_upper_bound('\U0010ffff'))
+
+    def test_name_key_follows_renames(self):
+        student = Student.objects.get(roll_number='R2')
+        student.full_name = 'Élodie Stone'
+        student.save()
+        self.assertEqual(self.names('él'), ['Élodie Stone'])
+
+
+@mock.patch('dashboard.jobs.close_old_connections')
+class JobQueueTests(TestCase):
+    """
+    Claiming, retrying and lease expiry of background jobs.
+    """
+
+    def setUp(self):
+        self.handler = mock.Mock(return_value={'ok': True})
+        patcher = mock.patch.dict(JOB_HANDLERS, {'test': lambda job, report_progress: self.handler(job)})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def expire_lease(self, job):
+        Job.objects.filter(pk=job.pk).update(
+            heartbeat_at=timezone.now() - datetime.timedelta(seconds=JOB_LEASE_TIMEOUT + 1)
+        )
+
+    def test_claim_oldest_runnable_job_once(self, close_old_connections):
+        later = Job.objects.create(kind='test')
+        Job.objects.filter(pk=later.pk).update(run_after=timezone.now() + datetime.timedelta(hours=1))
+        due = Job.objects.create(kind='test')
+
+        job = claim_next_job()
+        self.assertEqual((job.pk, job.status, job.attempts), (due.pk, Job.STATUS_RUNNING, 1))
+        self.assertIsNotNone(job.heartbeat_at)
+        self.assertIsNone(claim_next_job())
+
+        self.assertEqual(run_job(job.pk), Job.STATUS_SUCCEEDED)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.result), (Job.STATUS_SUCCEEDED, {'ok': True}))
+
+    def test_locked_database_requeues_until_attempts_run_out(self, close_old_connections):
+        self.handler.side_effect = OperationalError('database is locked')
+        job = Job.objects.create(kind='test')
+        for attempt in range(1, JOB_MAX_ATTEMPTS + 1):
+            Job.objects.filter(pk=job.pk).update(run_after=timezone.now())
+            self.assertEqual(claim_next_job().pk, job.pk)
+            status = run_job(job.pk)
+            job.refresh_from_db()
+            self.assertEqual(job.attempts, attempt)
+            if attempt < JOB_MAX_ATTEMPTS:
+                self.assertEqual(status, Job.STATUS_QUEUED)
+                self.assertGreater(job.run_after, timezone.now())
+        self.assertEqual(job.status, Job.STATUS_FAILED)
+
+    def test_expired_lease_requeues_job(self, close_old_connections):
+        job = Job.objects.create(kind='test')
+        claim_next_job()
+        heartbeat_jobs([job.pk])
+        self.assertIsNone(claim_next_job())
+
+        self.expire_lease(job)
+        reclaimed = claim_next_job()
+        self.assertEqual((reclaimed.pk, reclaimed.attempts), (job.pk, 2))
+        self.assertIn('stopped responding', reclaimed.error)
+
+    def test_expired_lease_fails_job_out_of_attempts(self, close_old_connections):
+        job = Job.objects.create(kind='test', attempts=JOB_MAX_ATTEMPTS - 1)
+        claim_next_job()
+        self.expire_lease(job)
+        self.assertIsNone(claim_next_job())
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.STATUS_FAILED)
+
+    def test_expired_claim_cannot_record_outcome(self, close_old_connections):
+        def lose_lease(job):
+            self.expire_lease(job)
+            claim_next_job()
+            return {'stale': True}
+        self.handler.side_effect = lose_lease
+
+        job = Job.objects.create(kind='test')
+        claim_next_job()
+        run_job(job.pk)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts, job.result), (Job.STATUS_RUNNING, 2, None))
+
+
+@mock.patch('dashboard.jobs.close_old_connections')
+class JobUploadTests(TestCase):
+    """
+    A queued import's upload is deleted once its job has finished, however it
+    finished, and kept while another attempt may read it.
+    """
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        media = override_settings(MEDIA_ROOT=directory.name)
+        media.enable()
+        self.addCleanup(media.disable)
+        self.handler = mock.Mock(return_value={'ok': True})
+        patcher = mock.patch.dict(JOB_HANDLERS, {'test': lambda job, report_progress: self.handler(job)})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def claimed_job(self, **fields):
+        path = default_storage.save('imports/upload.csv', io.BytesIO(b'roll_number\n'))
+        job = Job.objects.create(kind='test', payload={'path': path}, **fields)
+        self.assertEqual(claim_next_job().pk, job.pk)
+        return job, path
+
+    def test_deleted_after_success_or_failure(self, close_old_connections):
+        job, path = self.claimed_job()
+        self.assertEqual(run_job(job.pk), Job.STATUS_SUCCEEDED)
+        self.assertFalse(default_storage.exists(path))
+
+        self.handler.side_effect = ValueError('bad file')
+        job, path = self.claimed_job()
+        self.assertEqual(run_job(job.pk), Job.STATUS_FAILED)
+        self.assertFalse(default_storage.exists(path))
+
+    def test_kept_for_a_retry(self, close_old_connections):
+        self.handler.side_effect = OperationalError('database is locked')
+        job, path = self.claimed_job()
+        self.assertEqual(run_job(job.pk), Job.STATUS_QUEUED)
+        self.assertTrue(default_storage.exists(path))
+
+    def test_kept_for_the_attempt_that_took_over(self, close_old_connections):
+        def lose_lease(job):
+            Job.objects.filter(pk=job.pk).update(
+                heartbeat_at=timezone.now() - datetime.timedelta(seconds=JOB_LEASE_TIMEOUT + 1)
+            )
+            claim_next_job()
+        self.handler.side_effect = lose_lease
+        job, path = self.claimed_job()
+        run_job(job.pk)
+        self.assertTrue(default_storage.exists(path))
+
+    def test_deleted_when_abandoned(self, close_old_connections):
+        job, path = self.claimed_job(attempts=JOB_MAX_ATTEMPTS - 1)
+        Job.objects.filter(pk=job.pk).update(
+            heartbeat_at=timezone.now() - datetime.timedelta(seconds=JOB_LEASE_TIMEOUT + 1)
+        )
+        self.assertEqual(requeue_stale_jobs(), (0, 1))
+        self.assertFalse(default_storage.exists(path))
+
+    def test_each_upload_is_named_apart(self, close_old_connections):
+        user = CustomUser.objects.create_user(
+            email='staff@example.com', username='staff', password='password', is_staff=True
+        )
+        self.client.force_login(user)
+        for _ in range(2):
+            upload = io.BytesIO(b'roll_number,subject_code,exam_type,exam_date,marks,max_marks\n')
+            upload.name = 'marks.csv'
+            response = self.client.post(reverse('dashboard:import_marks'), {'file': upload, 'background': 'on'})
+            self.assertEqual(response.status_code, 302)
+        paths = [job.payload['path'] for job in Job.objects.filter(kind='import_marks')]
+        self.assertEqual(len(set(paths)), 2)
+        self.assertTrue(all(path.startswith('imports/') and default_storage.exists(path) for path in paths))
 
-# Create your tests here.
@@ -1,15 +1,22 @@
 from django.urls import path
 from . import views
 
+app_name = 'dashboard'
+
 urlpatterns = [
     path('', views.dashboard, name='dashboard'),
     path('admin/', views.admin_dashboard, name='admin_dashboard'),
     path('students/', views.student_list, name='student_list'),
+    path('students/search/', views.student_search, name='student_search'),
+    path('students/autocomplete/', views.student_autocomplete, name='student_autocomplete'),
     path('students/add/', views.add_student, name='add_student'),
     path('students/update/<int:student_id>/', views.update_student, name='update_student'),
     path('students/delete/<int:student_id>/', views.delete_student, name='delete_student'),
+    path('students/delete-class/', views.delete_class_batch, name='delete_class_batch'),
     path('students/<int:student_id>/progress/', views.progress_sheet_list, name='progress_sheet_list'),
     path('students/<int:student_id>/progress/add/', views.add_progress_sheet, name='add_progress_sheet'),
+    path('students/<int:student_id>/progress/archive/', views.archived_progress, name='archived_progress'),
+    path('students/<int:student_id>/rank-history/', views.rank_history, name='rank_history'),
     path('progress/update/<int:progress_sheet_id>/', views.update_progress_sheet, name='update_progress_sheet'),
     path('progress/delete/<int:progress_sheet_id>/', views.delete_progress_sheet, name='delete_progress_sheet'),
     path('subjects/', views.subject_list, name='subject_list'),
@@ -17,5 +24,13 @@ urlpatterns = [
     path('subjects/update/<int:subject_id>/', views.update_subject, name='update_subject'),
     path('subjects/delete/<int:subject_id>/', views.delete_subject, name='delete_subject'),
     path('progress/bulk/', views.bulk_progress_sheet_entry, name='bulk_progress_sheet_entry'),
+    path('progress/grid/', views.mark_entry_grid, name='mark_entry_grid'),
+    path('progress/import/', views.import_marks, name='import_marks'),
+    path('export/<str:dataset>.<str:export_format>', views.export_data, name='export_data'),
+    path('jobs/start/', views.start_job, name='start_job'),
+    path('jobs/<int:job_id>/', views.job_detail, name='job_detail'),
+    path('jobs/<int:job_id>/status/', views.job_status, name='job_status'),
+    path('jobs/<int:job_id>/download/', views.job_download, name='job_download'),
     path('ranking/', views.student_ranking, name='student_ranking'),
+    path('ranking/leaderboard/', views.leaderboard, name='leaderboard'),
 ]
\ No newline at end of file
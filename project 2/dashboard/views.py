@@ -1,11 +1,42 @@
+import io
+import uuid
+
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib import messages
+from django.core.files.storage import default_storage
+from django.http import FileResponse, Http404, JsonResponse, StreamingHttpResponse
+from django.urls import reverse
+from django.views.decorators.http import require_POST
 from django.db.models import Sum, Avg, Count
 from django.db.models import Q
-from .models import Student, ProgressSheet, Subject, ExamResult
-from .forms import StudentForm, ProgressSheetForm, SubjectForm, BulkProgressSheetForm
+from .models import Student, ProgressSheet, Subject, ExamResult, Job, ArchivedExamResult, ArchivedProgressSheet, fold_name, prefix_upper_bound
+from .forms import StudentForm, ProgressSheetForm, SubjectForm, BulkProgressSheetForm, MarkGridForm, MarksImportForm
+from .archive import academic_year_label, archived_academic_years, default_archive_before
+from .bulk import upsert_progress_sheets
+from .caching import cached_ranking
+from .deletion import delete_students, delete_subjects
+from .exports import EXPORT_FORMATS, EXPORTS, export_chunks
+from .importers import IMPORT_COLUMNS, import_progress_sheets
+from .jobs import enqueue_job
+from .routers import read_source, reporting_view
+from .search import AUTOCOMPLETE_LIMIT, search_students, student_prefix_index
+from .ranking import (
+    GRADES,
+    LEADERBOARD_SIZE,
+    average_percentage_expression,
+    class_batch_leaderboard,
+    decode_ranking_cursor,
+    grade_distribution,
+    rank_movement,
+    ranking_page,
+    subject_leaderboard,
+    top_rankings,
+)
+
+
+STUDENT_PAGE_SIZE = 50
 
 
 @login_required
@@ -33,6 +64,15 @@ def admin_dashboard(request):
     progress_sheet_count = ProgressSheet.objects.count()
     subject_count = Subject.objects.count()
     
+    # Top students per exam type, each read straight off the ranking index
+    top_students = [
+        (
+            label,
+            cached_ranking(exam_type, 'top:5', lambda exam_type=exam_type: top_rankings(exam_type, k=5))
+        )
+        for exam_type, label in ProgressSheet.EXAM_TYPE_CHOICES
+    ]
+    
     context = {
         'user_count': user_count,
         'verified_count': verified_count,
@@ -40,6 +80,9 @@ def admin_dashboard(request):
         'student_count': student_count,
         'progress_sheet_count': progress_sheet_count,
         'subject_count': subject_count,
+        'top_students': top_students,
+        'class_choices': Student.CLASS_CHOICES,
+        'archive_before': academic_year_label(default_archive_before()),
     }
     return render(request, 'dashboard/admin_dashboard.html', context)
 
@@ -47,10 +90,75 @@ def admin_dashboard(request):
 @login_required
 def student_list(request):
     """
-    View to list all students.
+    View to list students a page at a time, optionally filtered by class/batch and
+    name prefix.
+    """
+    class_batch = request.GET.get('class_batch', '')
+    if class_batch not in dict(Student.CLASS_CHOICES):
+        class_batch = ''
+    name = request.GET.get('name', '').strip()
+    after = request.GET.get('after') or None
+    
+    students = Student.objects.only(
+        'full_name', 'email', 'roll_number', 'class_batch', 'date_of_birth'
+    ).order_by('roll_number')
+    if class_batch:
+        students = students.filter(class_batch=class_batch)
+    if name:
+        # A range on the folded name rather than LIKE, so the index is used
+        prefix = fold_name(name)
+        students = students.filter(name_key__gte=prefix)
+        upper_bound = prefix_upper_bound(prefix)
+        if upper_bound is not None:
+            students = students.filter(name_key__lt=upper_bound)
+    if after:
+        # Keyset pagination: seek past the last roll number shown instead of OFFSET
+        students = students.filter(roll_number__gt=after)
+    
+    students = list(students[:STUDENT_PAGE_SIZE + 1])
+    next_cursor = students[STUDENT_PAGE_SIZE - 1].roll_number if len(students) > STUDENT_PAGE_SIZE else None
+    
+    return render(request, 'dashboard/student_list.html', {
+        'students': students[:STUDENT_PAGE_SIZE],
+        'class_choices': Student.CLASS_CHOICES,
+        'selected_class_batch': class_batch,
+        'name': name,
+        'next_cursor': next_cursor,
+        'is_first_page': after is None,
+    })
+
+
+@login_required
+def student_search(request):
+    """
+    JSON search over student names, emails and roll numbers, best matches first.
+    """
+    students = search_students(request.GET.get('q', ''))
+    return JsonResponse({
+        'results': [
+            {
+                'id': student.id,
+                'full_name': student.full_name,
+                'email': student.email,
+                'roll_number': student.roll_number,
+                'class_batch': student.class_batch,
+                'progress_url': reverse('dashboard:progress_sheet_list', args=[student.id]),
+            }
+            for student in students
+        ]
+    })
+
+
+@login_required
+def student_autocomplete(request):
+    """
+    JSON prefix search over roll numbers and names for the student picker, served
+    from an in-memory index.
     """
-    students = Student.objects.all()
-    return render(request, 'dashboard/student_list.html', {'students': students})
+    matches = student_prefix_index().search(request.GET.get('q', ''), AUTOCOMPLETE_LIMIT)
+    return JsonResponse({
+        'results': [{'id': student_id, 'text': label} for student_id, label in matches]
+    })
 
 
 @login_required
@@ -100,13 +208,39 @@ def delete_student(request, student_id):
     student = get_object_or_404(Student, id=student_id)
     
     if request.method == 'POST':
-        student.delete()
+        delete_students(Student.objects.filter(pk=student.pk))
         messages.success(request, 'Student deleted successfully.')
         return redirect('dashboard:student_list')
     
     return render(request, 'dashboard/student_confirm_delete.html', {'student': student})
 
 
+@staff_member_required
+def delete_class_batch(request):
+    """
+    View to delete every student of a class/batch, e.g. a graduating class, with
+    all their marks, in one operation.
+    """
+    class_labels = dict(Student.CLASS_CHOICES)
+    class_batch = request.POST.get('class_batch') or request.GET.get('class_batch')
+    if class_batch not in class_labels:
+        messages.error(request, 'Choose a class/batch to delete.')
+        return redirect('dashboard:admin_dashboard')
+    students = Student.objects.filter(class_batch=class_batch)
+    
+    if request.method == 'POST':
+        deleted = delete_students(students)
+        messages.success(request, f'Deleted {deleted} students of {class_labels[class_batch]}.')
+        return redirect('dashboard:admin_dashboard')
+    
+    return render(request, 'dashboard/class_batch_confirm_delete.html', {
+        'class_batch': class_batch,
+        'class_label': class_labels[class_batch],
+        'student_count': students.count(),
+        'progress_sheet_count': ProgressSheet.objects.filter(student__class_batch=class_batch).count(),
+    })
+
+
 @login_required
 def subject_list(request):
     """
@@ -163,7 +297,7 @@ def delete_subject(request, subject_id):
     subject = get_object_or_404(Subject, id=subject_id)
     
     if request.method == 'POST':
-        subject.delete()
+        delete_subjects(Subject.objects.filter(pk=subject.pk))
         messages.success(request, 'Subject deleted successfully.')
         return redirect('dashboard:subject_list')
     
@@ -171,41 +305,98 @@ def delete_subject(request, subject_id):
 
 
 @login_required
+@reporting_view
 def progress_sheet_list(request, student_id):
     """
     View to list all progress sheets for a specific student.
     """
     student = get_object_or_404(Student, id=student_id)
-    progress_sheets = ProgressSheet.objects.filter(student=student).order_by('-exam_date', 'exam_type', 'subject__name')
+    progress_sheets = ProgressSheet.objects.filter(student=student).select_related('subject').order_by(
+        '-exam_date', 'exam_type', 'subject__name'
+    )
+    
+    # Totals and averages per exam type are computed by the database
+    totals = {
+        row['exam_type']: row
+        for row in ProgressSheet.objects.filter(student=student).values('exam_type').annotate(
+            total_marks=Sum('marks_obtained'),
+            max_possible_marks=Sum('max_marks'),
+            subjects_count=Count('id'),
+            average_percentage=average_percentage_expression('marks_obtained', 'max_marks'),
+        ).order_by()
+    }
     
-    # Calculate totals and averages per exam type
     exam_summary = {}
     for sheet in progress_sheets:
-        exam_type = sheet.exam_type
-        if exam_type not in exam_summary:
-            exam_summary[exam_type] = {
-                'total_marks': 0,
-                'max_marks': 0,
-                'subjects_count': 0,
+        if sheet.exam_type not in exam_summary:
+            row = totals[sheet.exam_type]
+            exam_summary[sheet.exam_type] = {
+                'total_marks': row['total_marks'],
+                'max_marks': row['max_possible_marks'],
+                'subjects_count': row['subjects_count'],
+                'average_percentage': row['average_percentage'] or 0,
                 'sheets': []
             }
-        
-        exam_summary[exam_type]['total_marks'] += float(sheet.marks_obtained)
-        exam_summary[exam_type]['max_marks'] += float(sheet.max_marks)
-        exam_summary[exam_type]['subjects_count'] += 1
-        exam_summary[exam_type]['sheets'].append(sheet)
-    
-    # Calculate average percentage for each exam type
-    for exam_type, data in exam_summary.items():
-        if data['max_marks'] > 0:
-            data['average_percentage'] = round((data['total_marks'] / data['max_marks']) * 100, 2)
-        else:
-            data['average_percentage'] = 0
+        exam_summary[sheet.exam_type]['sheets'].append(sheet)
     
     return render(request, 'dashboard/progress_sheet_list.html', {
         'student': student,
         'progress_sheets': progress_sheets,
-        'exam_summary': exam_summary
+        'exam_summary': exam_summary,
+        'has_archive': ArchivedExamResult.objects.filter(student=student).exists(),
+    })
+
+
+@login_required
+@reporting_view
+def archived_progress(request, student_id):
+    """
+    View to show a student's marks from one archived academic year, the newest
+    archived year unless ?year= picks another.
+    """
+    student = get_object_or_404(Student, id=student_id)
+    years = archived_academic_years(student.id)
+    try:
+        year = int(request.GET.get('year') or years[0])
+    except (IndexError, ValueError):
+        year = None
+
+    exams = []
+    if year in years:
+        sheets = {}
+        for sheet in ArchivedProgressSheet.objects.filter(student=student, academic_year=year):
+            sheets.setdefault((sheet.exam_type, sheet.exam_date), []).append(sheet)
+        results = ArchivedExamResult.objects.filter(student=student, academic_year=year).order_by('-exam_date', 'exam_type')
+        exams = [
+            {'result': result, 'sheets': sheets.get((result.exam_type, result.exam_date), [])}
+            for result in results
+        ]
+
+    return render(request, 'dashboard/archived_progress.html', {
+        'student': student,
+        'years': [(value, academic_year_label(value)) for value in years],
+        'year': year,
+        'year_label': academic_year_label(year) if year in years else None,
+        'exams': exams,
+    })
+
+
+@login_required
+def rank_history(request, student_id):
+    """
+    View to show how a student's rank moved from one exam to the next.
+    """
+    student = get_object_or_404(Student, id=student_id)
+    
+    # Ranks and the previous rank are read from the precomputed history in one query
+    history = list(rank_movement(student.id))
+    for record in history:
+        # Positive when the student moved up the ranking
+        record.rank_change = None if record.previous_rank is None else record.previous_rank - record.rank
+    
+    return render(request, 'dashboard/rank_history.html', {
+        'student': student,
+        'history': history,
     })
 
 
@@ -286,54 +477,25 @@ def bulk_progress_sheet_entry(request):
             exam_type = form.cleaned_data['exam_type']
             exam_date = form.cleaned_data['exam_date']
             
-            # Process each subject's marks
-            total_marks = 0
-            max_possible_marks = 0
-            
-            for field_name, value in form.cleaned_data.items():
-                if field_name.startswith('marks_'):
-                    subject_id = field_name.split('_')[1]  # Extract subject ID from field name
-                    marks_field = f'marks_{subject_id}'
-                    max_marks_field = f'max_marks_{subject_id}'
-                    
-                    marks = form.cleaned_data.get(marks_field)
-                    max_marks = form.cleaned_data.get(max_marks_field)
-                    
-                    if marks is not None and max_marks is not None:
-                        # Create or update progress sheet
-                        ProgressSheet.objects.update_or_create(
-                            student=student,
-                            subject_id=subject_id,
-                            exam_type=exam_type,
-                            exam_date=exam_date,
-                            defaults={
-                                'marks_obtained': marks,
-                                'max_marks': max_marks
-                            }
-                        )
-                        
-                        total_marks += float(marks)
-                        max_possible_marks += float(max_marks)
-            
-            # Calculate and save exam result summary
-            if max_possible_marks > 0:
-                average_percentage = round((total_marks / max_possible_marks) * 100, 2)
-                
-                ExamResult.objects.update_or_create(
+            # Collect each subject's marks and write them all in one transaction
+            sheets = [
+                ProgressSheet(
                     student=student,
+                    subject=subject,
                     exam_type=exam_type,
                     exam_date=exam_date,
-                    defaults={
-                        'total_marks': total_marks,
-                        'max_possible_marks': max_possible_marks,
-                        'average_percentage': average_percentage
-                    }
+                    marks_obtained=marks,
+                    max_marks=max_marks
                 )
+                for subject, marks, max_marks in form.subject_marks
+            ]
+            
+            upsert_progress_sheets(sheets)
             
             messages.success(request, f'Progress sheets added for {student.full_name}.')
             return redirect('dashboard:progress_sheet_list', student_id=student.id)
     else:
-        form = BulkProgressSheetForm()
+        form = BulkProgressSheetForm(initial={'student': request.GET.get('student')})
     
     return render(request, 'dashboard/bulk_progress_sheet_form.html', {
         'form': form,
@@ -342,6 +504,216 @@ def bulk_progress_sheet_entry(request):
 
 
 @login_required
+def mark_entry_grid(request):
+    """
+    View for entering one exam's marks for a whole class/batch at once, as a grid
+    of students against subjects
+    """
+    # The class/batch and exam are picked first; the grid is only built once they are valid
+    selection = MarkGridForm(request.POST if request.method == 'POST' else (request.GET or None))
+    if not selection.is_valid():
+        return render(request, 'dashboard/mark_entry_grid.html', {
+            'form': selection,
+            'title': 'Class Mark Entry',
+        })
+    
+    class_batch = selection.cleaned_data['class_batch']
+    exam_type = selection.cleaned_data['exam_type']
+    exam_date = selection.cleaned_data['exam_date']
+    students = Student.objects.filter(class_batch=class_batch).only('full_name', 'roll_number').order_by('roll_number')
+    subjects = Subject.objects.only('name').order_by('name')
+    
+    if request.method == 'POST':
+        form = MarkGridForm(request.POST, students=students, subjects=subjects)
+        if form.is_valid():
+            # One transaction for the whole grid; ExamResult and rankings follow in the same write
+            saved = upsert_progress_sheets([
+                ProgressSheet(
+                    student=student,
+                    subject=subject,
+                    exam_type=exam_type,
+                    exam_date=exam_date,
+                    marks_obtained=marks,
+                    max_marks=max_marks
+                )
+                for student, subject, marks, max_marks in form.cells
+            ])
+            messages.success(request, f'Saved {saved} marks for {class_batch}.')
+            return redirect(
+                f"{request.path}?class_batch={class_batch}&exam_type={exam_type}&exam_date={exam_date.isoformat()}"
+            )
+    else:
+        # Marks already stored for this exam, fetched in a single query to prefill the grid
+        stored = ProgressSheet.objects.filter(
+            student__class_batch=class_batch,
+            exam_type=exam_type,
+            exam_date=exam_date
+        ).values_list('student_id', 'subject_id', 'marks_obtained', 'max_marks')
+        form = MarkGridForm(
+            initial=selection.cleaned_data,
+            students=students,
+            subjects=subjects,
+            initial_marks={
+                (student_id, subject_id): (marks, max_marks)
+                for student_id, subject_id, marks, max_marks in stored
+            }
+        )
+    
+    return render(request, 'dashboard/mark_entry_grid.html', {
+        'form': form,
+        'title': 'Class Mark Entry',
+        'show_grid': True,
+    })
+
+
+@login_required
+def import_marks(request):
+    """
+    View for importing marks from an uploaded CSV file, with a report of the rows
+    that could not be imported.
+    """
+    result = None
+    if request.method == 'POST':
+        form = MarksImportForm(request.POST, request.FILES)
+        if form.is_valid() and form.cleaned_data['background']:
+            # Keep the upload under a name of its own and hand it to the run_jobs
+            # worker, which deletes it once the job has finished
+            path = default_storage.save(f'imports/{uuid.uuid4().hex}.csv', form.cleaned_data['file'])
+            try:
+                job = enqueue_job('import_marks', {'path': path}, user=request.user)
+            except BaseException:
+                default_storage.delete(path)
+                raise
+            messages.success(request, 'Import queued. This page updates as it runs.')
+            return redirect('dashboard:job_detail', job_id=job.id)
+        if form.is_valid():
+            # Decode the upload lazily so large files are parsed as a stream
+            lines = io.TextIOWrapper(form.cleaned_data['file'].file, encoding='utf-8-sig', newline='')
+            result = import_progress_sheets(lines)
+            if result.saved:
+                messages.success(request, f'Imported {result.saved} of {result.rows} rows.')
+            if result.error_count:
+                messages.warning(request, f'{result.error_count} rows could not be imported.')
+            form = MarksImportForm()
+    else:
+        form = MarksImportForm()
+    
+    return render(request, 'dashboard/import_marks.html', {
+        'form': form,
+        'result': result,
+        'columns': IMPORT_COLUMNS,
+        'title': 'Import Marks'
+    })
+
+
+@staff_member_required
+@reporting_view
+def export_data(request, dataset, export_format):
+    """
+    Stream a dataset as CSV or JSON lines. Bytes start flowing as soon as the
+    first rows are read, and memory use does not grow with the export size.
+    """
+    if dataset not in EXPORTS or export_format not in EXPORT_FORMATS:
+        raise Http404('No such export.')
+    response = StreamingHttpResponse(
+        export_chunks(dataset, export_format),
+        content_type=EXPORT_FORMATS[export_format]
+    )
+    response['Content-Disposition'] = f'attachment; filename="{dataset}.{export_format}"'
+    return response
+
+
+# Jobs staff can start from the admin dashboard
+DASHBOARD_JOBS = {
+    'rebuild_rankings': 'Ranking rebuild',
+    'repair_exam_results': 'Exam result repair',
+    'regrade': 'Regrade',
+    'archive_academic_years': 'Academic year archival',
+    'report_cards': 'Report card generation',
+}
+
+
+def _job_download_url(job):
+    if job.status == Job.STATUS_SUCCEEDED and (job.result or {}).get('path'):
+        return reverse('dashboard:job_download', args=[job.id])
+    return None
+
+
+def _visible_job(request, job_id):
+    jobs = Job.objects.all() if request.user.is_staff else Job.objects.filter(created_by=request.user)
+    return get_object_or_404(jobs, pk=job_id)
+
+
+@staff_member_required
+@require_POST
+def start_job(request):
+    """
+    View for queueing a maintenance job from the admin dashboard.
+    """
+    kind = request.POST.get('kind')
+    if kind not in DASHBOARD_JOBS:
+        messages.error(request, 'Unknown job.')
+        return redirect('dashboard:admin_dashboard')
+    payload = {}
+    if kind == 'report_cards' and request.POST.get('class_batch') in dict(Student.CLASS_CHOICES):
+        payload['class_batch'] = request.POST['class_batch']
+    job = enqueue_job(kind, payload, user=request.user)
+    messages.success(request, f'{DASHBOARD_JOBS[kind]} queued.')
+    return redirect('dashboard:job_detail', job_id=job.id)
+
+
+@login_required
+def job_detail(request, job_id):
+    """
+    View showing a background job's progress, polling job_status until it finishes.
+    """
+    job = _visible_job(request, job_id)
+    return render(request, 'dashboard/job_detail.html', {
+        'job': job,
+        'download_url': _job_download_url(job),
+        'title': f'Job #{job.id}'
+    })
+
+
+@login_required
+def job_download(request, job_id):
+    """
+    Download the file a finished job produced, such as a report card archive.
+    """
+    job = _visible_job(request, job_id)
+    path = (job.result or {}).get('path') if job.status == Job.STATUS_SUCCEEDED else None
+    if not path or not default_storage.exists(path):
+        raise Http404('This job has no file to download.')
+    return FileResponse(default_storage.open(path, 'rb'), as_attachment=True, filename=path.rsplit('/', 1)[-1])
+
+
+@login_required
+def job_status(request, job_id):
+    """
+    JSON status of a background job, for polling.
+    """
+    job = _visible_job(request, job_id)
+    return JsonResponse({
+        'id': job.id,
+        'kind': job.kind,
+        'status': job.status,
+        'status_display': job.get_status_display(),
+        'finished': job.is_finished,
+        'progress': job.progress,
+        'total': job.total,
+        'percent': job.percent,
+        'attempts': job.attempts,
+        'result': job.result,
+        'error': job.error if job.status == Job.STATUS_FAILED else '',
+        'download_url': _job_download_url(job),
+        'created_at': job.created_at,
+        'started_at': job.started_at,
+        'finished_at': job.finished_at,
+    })
+
+
+@login_required
+@reporting_view
 def student_ranking(request):
     """
     View to display student rankings based on exam scores with filtering options.
@@ -353,45 +725,124 @@ def student_ranking(request):
     if exam_type not in exam_types:
         exam_type = 'quarterly'
     
-    # Get all students with their average scores for the selected exam type
-    students_with_scores = []
-    
-    for student in Student.objects.all():
-        # Get all progress sheets for this student and exam type
-        sheets = ProgressSheet.objects.filter(
-            student=student,
-            exam_type=exam_type
-        )
-        
-        if sheets.exists():
-            # Calculate total marks and average percentage for this exam type
-            total_marks = sum(float(sheet.marks_obtained) for sheet in sheets)
-            max_marks = sum(float(sheet.max_marks) for sheet in sheets)
-            
-            if max_marks > 0:
-                average_percentage = round((total_marks / max_marks) * 100, 2)
-            else:
-                average_percentage = 0
-            
-            students_with_scores.append({
-                'student': student,
-                'total_marks': total_marks,
-                'max_marks': max_marks,
-                'average_percentage': average_percentage,
-                'subject_count': len(sheets)
-            })
-    
-    # Sort students by average percentage in descending order (highest first)
-    students_with_scores.sort(key=lambda x: x['average_percentage'], reverse=True)
+    after = request.GET.get('after') or None
+    if after:
+        try:
+            decode_ranking_cursor(after)
+        except ValueError:
+            after = None
     
-    # Add rank to each student
-    for i, record in enumerate(students_with_scores, start=1):
-        record['rank'] = i
+    # Rankings are maintained incrementally on every progress sheet write, so a
+    # page is a single keyset read of the ranking index, cached until marks for
+    # this exam type change
+    students_with_scores, next_cursor = cached_ranking(
+        exam_type,
+        f'{read_source()}:page:{after or ""}',
+        lambda: ranking_page(exam_type, after)
+    )
     
     context = {
         'students_with_scores': students_with_scores,
         'selected_exam_type': exam_type,
         'exam_types': exam_types,
+        'next_cursor': next_cursor,
+        'is_first_page': after is None,
     }
     
-    return render(request, 'dashboard/student_ranking.html', context)
\ No newline at end of file
+    return render(request, 'dashboard/student_ranking.html', context)
+
+
+def _leaderboard_rows(exam_type, partition, group, limit):
+    """
+    Leaderboard rows flattened to plain dicts, grouped by partition label.
+    """
+    if partition == 'subject':
+        return [
+            {
+                'group': row['subject__name'],
+                'competition_rank': row['competition_rank'],
+                'dense_rank': row['dense_rank'],
+                'student_id': row['student_id'],
+                'full_name': row['student__full_name'],
+                'roll_number': row['student__roll_number'],
+                'total_marks': row['total_marks'],
+                'max_marks': row['max_possible_marks'],
+                'average_percentage': row['average_percentage'],
+            }
+            for row in subject_leaderboard(exam_type, group, limit)
+        ]
+    
+    class_labels = dict(Student.CLASS_CHOICES)
+    return [
+        {
+            'group': class_labels.get(row.class_batch, row.class_batch),
+            'competition_rank': row.competition_rank,
+            'dense_rank': row.dense_rank,
+            'student_id': row.student_id,
+            'full_name': row.student.full_name,
+            'roll_number': row.student.roll_number,
+            'total_marks': row.total_marks,
+            'max_marks': row.max_marks,
+            'average_percentage': row.average_percentage,
+        }
+        for row in class_batch_leaderboard(exam_type, group, limit)
+    ]
+
+
+@login_required
+@reporting_view
+def leaderboard(request):
+    """
+    View to display rankings within each class/batch or each subject, with tied
+    students sharing a rank.
+    """
+    exam_type = request.GET.get('exam_type', 'quarterly')
+    exam_types = [choice[0] for choice in ProgressSheet.EXAM_TYPE_CHOICES]
+    if exam_type not in exam_types:
+        exam_type = 'quarterly'
+    
+    partition = request.GET.get('partition', 'class_batch')
+    if partition not in ('class_batch', 'subject'):
+        partition = 'class_batch'
+    
+    # Optionally narrow down to a single class/batch or subject
+    group = request.GET.get('group') or None
+    if partition == 'class_batch':
+        groups = Student.CLASS_CHOICES
+        if group not in dict(groups):
+            group = None
+    else:
+        groups = [(str(pk), name) for pk, name in Subject.objects.values_list('id', 'name').order_by('name')]
+        if group not in dict(groups):
+            group = None
+    
+    try:
+        limit = min(max(int(request.GET.get('limit', LEADERBOARD_SIZE)), 1), 100)
+    except ValueError:
+        limit = LEADERBOARD_SIZE
+    
+    rows = cached_ranking(
+        exam_type,
+        f'{read_source()}:leaderboard:{partition}:{group or ""}:{limit}',
+        lambda: _leaderboard_rows(exam_type, partition, group, limit)
+    )
+    
+    grades = None
+    if partition == 'subject':
+        grades = cached_ranking(
+            exam_type,
+            f'{read_source()}:grades:{group or ""}',
+            lambda: grade_distribution(exam_type, group)
+        )
+    
+    return render(request, 'dashboard/leaderboard.html', {
+        'rows': rows,
+        'selected_exam_type': exam_type,
+        'exam_types': exam_types,
+        'partition': partition,
+        'groups': groups,
+        'selected_group': group,
+        'limit': limit,
+        'grades': grades,
+        'grade_labels': GRADES,
+    })
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -47,6 +48,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'dashboard.middleware.ReadYourWritesMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -80,7 +82,69 @@ DATABASES = {
         'NAME': BASE_DIR / 'db.sqlite3',
         'OPTIONS': {
             'timeout': 20,
+            # Take the write lock when a transaction starts. A deferred transaction
+            # that reads and then writes cannot wait for a busy writer and fails
+            # with "database is locked" straight away instead.
+            'transaction_mode': 'IMMEDIATE',
         },
+        # Keep connections open across requests, checking they still work
+        # before each request reuses one
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+    },
+    # Read-only copy of the default database for the ranking, progress sheet and
+    # export views, refreshed by "manage.py refresh_reporting_snapshot --every 300"
+    'reporting': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': f"file:{BASE_DIR / 'reporting.sqlite3'}?mode=ro",
+        'OPTIONS': {
+            'timeout': 20,
+        },
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+        'SQLITE_PROFILE': 'snapshot',
+        # Tests have no snapshot; reads fall back to the default database
+        'TEST': {
+            'MIRROR': 'default',
+        },
+    },
+}
+
+DATABASE_ROUTERS = ['dashboard.routers.ReportingRouter']
+
+REPORTING_SNAPSHOT_PATH = BASE_DIR / 'reporting.sqlite3'
+# Older snapshots are ignored and reports read the default database instead
+REPORTING_SNAPSHOT_MAX_AGE = 15 * 60
+
+# Pragmas run on every new SQLite connection: a name from
+# dashboard.database.SQLITE_PROFILES or a dict of pragmas. "production" turns
+# on WAL journaling so readers and the writer stop blocking each other.
+SQLITE_PROFILE = os.environ.get('SQLITE_PROFILE', 'production')
+
+# Academic years start on the first of this month. "manage.py archive_academic_years"
+# moves marks from academic years before the last ARCHIVE_KEEP_ACADEMIC_YEARS out
+# of the live tables into the archive tables.
+ACADEMIC_YEAR_START_MONTH = 6
+ARCHIVE_KEEP_ACADEMIC_YEARS = 2
+
+# Most processes one report card run renders with. A run inside a run_jobs
+# worker adds to that command's own --workers processes.
+REPORT_CARD_WORKERS = min(4, os.cpu_count() or 1)
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Rankings are cached here. LocMemCache is private to each process, so its
+# version bumps and the ranking stampede lock (dashboard.caching.cached_ranking)
+# only cover the threads of one process: with several worker processes each one
+# recomputes a missed ranking itself and can serve rankings another process has
+# invalidated. Deployments running more than one process need a shared backend
+# here (e.g. Redis or Memcached).
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'student-platform',
     }
 }
 
@@ -129,6 +193,10 @@ STATICFILES_DIRS = [
 # Directory where collected static files will be stored
 STATIC_ROOT = BASE_DIR / 'staticfiles'
 
+# Uploaded files, such as mark imports waiting for the background job worker
+MEDIA_URL = '/media/'
+MEDIA_ROOT = BASE_DIR / 'media'
+
 # Custom User model
 AUTH_USER_MODEL = 'auth_module.CustomUser'
 